@@ -0,0 +1,240 @@
+"""Retries, rate limiting and adaptive concurrency of GCP API calls."""
+# Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import contextlib
+import logging
+import random
+import threading
+import time
+
+LOG = logging.getLogger(__name__)
+
+# Requests per second to every API, 0 for no limit
+DEFAULT_RATE = 50.0
+# Maximum number of concurrent requests to every API
+DEFAULT_MAX_CONCURRENCY = 64
+# Attempts of every request, including the first one
+DEFAULT_MAX_ATTEMPTS = 6
+# Seconds the backoff starts from and is capped at
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 30.0
+
+# HTTP statuses of the errors worth retrying. google.api_core exceptions
+# carry them in 'code', kubernetes ones in 'status'.
+THROTTLED = 429
+RETRYABLE_STATUSES = {THROTTLED, 500, 502, 503, 504}
+
+_CALLERS = {}
+_SETTINGS = {}
+_CALLERS_LOCK = threading.Lock()
+
+
+def get_status(error):
+    """Returns the HTTP status of an API error, or None."""
+    for name in ('code', 'status'):
+        status = getattr(error, name, None)
+        if isinstance(status, int):
+            return status
+    return None
+
+
+class TokenBucket():
+    """Allows up to rate acquisitions per second on average, and bursts of
+    up to burst acquisitions."""
+
+    def __init__(self, rate: float, burst: float = None) -> None:
+        self.rate = rate
+        self.burst = burst or max(rate, 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Takes a token, waiting for one if there is none."""
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (
+                    now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveLimiter():
+    """Limits the number of concurrent calls. The limit is halved when the
+    API throttles calls, and grows back by one for every limit calls which
+    succeed (additive increase, multiplicative decrease)."""
+
+    def __init__(self, max_limit: int) -> None:
+        self.max_limit = max(max_limit, 1)
+        self.limit = float(self.max_limit)
+        self._running = 0
+        self._decreased = 0.0
+        self._condition = threading.Condition()
+
+    def __enter__(self):
+        with self._condition:
+            while self._running >= int(self.limit):
+                self._condition.wait()
+            self._running += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        with self._condition:
+            self._running -= 1
+            self._condition.notify()
+
+    def on_success(self) -> None:
+        """Grows the limit back after a successful call."""
+        with self._condition:
+            if self.limit < self.max_limit:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                self._condition.notify()
+
+    def on_throttled(self, window: float) -> None:
+        """Halves the limit, at most once per window seconds, as the calls
+        already running when the API started throttling fail too."""
+        with self._condition:
+            now = time.monotonic()
+            if now - self._decreased >= window:
+                self._decreased = now
+                self.limit = max(1.0, self.limit / 2)
+                LOG.debug("Throttled, lowering concurrency to %d",
+                          self.limit)
+
+
+class ApiCaller():
+    """Calls the methods of a single API: at most rate requests per second,
+    at most max_concurrency at a time, lowered while the API throttles, and
+    retrying throttled and transient errors with jittered exponential
+    backoff.
+    """
+
+    def __init__(self, name, rate=DEFAULT_RATE,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS,
+                 base_delay=DEFAULT_BASE_DELAY,
+                 max_delay=DEFAULT_MAX_DELAY) -> None:
+        """Constructor.
+        :param name: Name of the API, for the logs.
+        :param rate: Requests per second, 0 for no limit.
+        :param max_concurrency: Maximum number of concurrent requests.
+        :param max_attempts: Attempts of every request, including the first
+            one.
+        :param base_delay: Seconds the backoff starts from.
+        :param max_delay: Seconds the backoff is capped at.
+        """
+        self.name = name
+        self.bucket = TokenBucket(rate)
+        self.limiter = AdaptiveLimiter(max_concurrency)
+        self.max_attempts = max(max_attempts, 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def get_delay(self, attempt: int) -> float:
+        """Returns the seconds to wait before retrying after attempt
+        (starting from 1): a random time up to the exponential backoff
+        ("full jitter"), so retries of concurrent calls spread out."""
+        return random.uniform(0, min(self.max_delay,
+                                     self.base_delay * 2 ** (attempt - 1)))
+
+    def call(self, func, *args, **kwargs):
+        """Calls func with the arguments, retrying it on throttled and
+        transient errors.
+        :return: What func returns.
+        :raises: The error of the last attempt.
+        """
+        attempt = 1
+        while True:
+            self.bucket.acquire()
+            with self.limiter:
+                try:
+                    result = func(*args, **kwargs)
+                except Exception as ex:  # pylint: disable=broad-except
+                    error = ex
+                else:
+                    self.limiter.on_success()
+                    return result
+            status = get_status(error)
+            if status not in RETRYABLE_STATUSES or \
+                    attempt >= self.max_attempts:
+                raise error
+            if status == THROTTLED:
+                with self._lock:
+                    self.throttled += 1
+                self.limiter.on_throttled(window=self.base_delay)
+            with self._lock:
+                self.retries += 1
+            delay = self.get_delay(attempt)
+            LOG.debug("%s call failed with %s, retrying in %.2fs (attempt "
+                      "%d of %d)", self.name, status, delay, attempt + 1,
+                      self.max_attempts)
+            time.sleep(delay)
+            attempt += 1
+
+
+def get_api_name(client) -> str:
+    """Returns the name of the API of a client, e.g.
+    cloudresourcemanager.googleapis.com. Clients of the same API share
+    its quota."""
+    return getattr(client, 'DEFAULT_ENDPOINT', None) or \
+        type(client).__name__
+
+
+def get_api_caller(client) -> ApiCaller:
+    """Returns the caller of the API of a client, shared by the whole
+    process."""
+    name = get_api_name(client)
+    with _CALLERS_LOCK:
+        if name not in _CALLERS:
+            _CALLERS[name] = ApiCaller(name, **_SETTINGS)
+        return _CALLERS[name]
+
+
+def configure_api_callers(**kwargs) -> None:
+    """Sets the ApiCaller arguments, e.g. rate, of the callers of every
+    API. Callers created before are replaced."""
+    with _CALLERS_LOCK:
+        _SETTINGS.clear()
+        _SETTINGS.update(kwargs)
+        _CALLERS.clear()
+
+
+@contextlib.contextmanager
+def api_callers_configured(**kwargs):
+    """Within the block, the callers of every API use the given ApiCaller
+    arguments, e.g. rate. The callers used before are used again
+    afterwards."""
+    with _CALLERS_LOCK:
+        settings, callers = dict(_SETTINGS), dict(_CALLERS)
+        _SETTINGS.clear()
+        _SETTINGS.update(kwargs)
+        _CALLERS.clear()
+    try:
+        yield
+    finally:
+        with _CALLERS_LOCK:
+            _SETTINGS.clear()
+            _SETTINGS.update(settings)
+            _CALLERS.clear()
+            _CALLERS.update(callers)
@@ -0,0 +1,290 @@
+"""Measures how the get and exec commands scale, against fake GCP and
+Kubernetes APIs.
+
+Usage: python -m gcpctl.benchmarks.commands [--sizes 10 1k 10k]
+    [--latency SECONDS] [--error-rate RATE]
+"""
+# Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import argparse
+import contextlib
+import importlib
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import List
+
+from gcpctl.api_caller import configure_api_callers, get_api_caller
+from gcpctl.benchmarks.fakes import (ORG_SIZES, FakeAPIError,
+                                     FakeClusterManagerClient, FakeCoreV1Api,
+                                     FakeFoldersClient, FakeOrg,
+                                     FakeProjectsClient, make_pods)
+from gcpctl.printer import Printer
+
+COMMANDS = ('get-projects', 'get-gke-clusters', 'get-pods', 'pod-exec',
+            'cluster-exec')
+# Commands whose cost depends on the size of the organization
+ORG_COMMANDS = ('get-projects', 'get-gke-clusters')
+# Modules the commands import lazily. They are imported before a command is
+# timed, so its first run doesn't pay for loading them.
+COMMAND_MODULES = {
+    'get-projects': ('gcpctl.discovery.crawl', 'gcpctl.projects.manager'),
+    'get-gke-clusters': ('gcpctl.discovery.crawl',
+                         'gcpctl.gke_clusters.manager'),
+    'get-pods': ('gcpctl.kubernetes.manager',),
+    'pod-exec': ('gcpctl.kubernetes.manager', 'gcpctl.utils.executor'),
+    'cluster-exec': ('gcpctl.gke_clusters.cluster',
+                     'gcpctl.kubernetes.kubeconfig', 'gcpctl.utils.process'),
+}
+
+
+@dataclass
+class Measurement():
+    """The outcome of running a command, once or more."""
+
+    items: int = 0
+    durations: List[float] = field(default_factory=list)
+    # For listings, seconds from the start until every item was obtained.
+    # For execs, the duration of every exec.
+    latencies: List[float] = field(default_factory=list)
+    calls: int = 0
+    errors: int = 0
+    retries: int = 0
+    # Peak resident set size of the process, in KiB
+    max_rss: int = 0
+
+
+def arrivals(items):
+    """Yields the seconds from now until every item was obtained."""
+    start = time.perf_counter()
+    for _ in items:
+        yield time.perf_counter() - start
+
+
+def percentile(values, share) -> float:
+    """Returns the value share (0-1) of the values are lower than."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class Scenarios():
+    """Runs the commands against fake APIs. Every command is a generator
+    of latencies, see Measurement."""
+
+    def __init__(self, args) -> None:
+        self.args = args
+        self.apis = []
+        self.org = FakeOrg(**ORG_SIZES[args.size]) if args.size else None
+
+    def _api(self, api_class, *api_args, **kwargs):
+        """Returns a fake API configured from the arguments."""
+        api = api_class(*api_args, latency=self.args.latency,
+                        page_size=self.args.page_size,
+                        error_rate=self.args.error_rate, seed=len(self.apis),
+                        quota=self.args.quota, **kwargs)
+        self.apis.append(api)
+        return api
+
+    def _crawl_backend(self):
+        # pylint: disable=import-outside-toplevel
+        from gcpctl.discovery.crawl import CrawlBackend
+        return CrawlBackend(
+            parallelism=self.args.parallelism,
+            folders_client=self._api(FakeFoldersClient, self.org),
+            projects_client=self._api(FakeProjectsClient, self.org),
+            clusters_client=self._api(FakeClusterManagerClient, self.org))
+
+    def _kubernetes_manager(self, pods):
+        # pylint: disable=import-outside-toplevel
+        from gcpctl.kubernetes.manager import KubernetesManager
+        return KubernetesManager(core_v1=self._api(
+            FakeCoreV1Api, make_pods(pods),
+            output_lines=self.args.output_lines))
+
+    def get_projects(self):
+        """get projects -r of the whole organization."""
+        # pylint: disable=import-outside-toplevel
+        from gcpctl.projects.manager import ProjectManager
+        manager = ProjectManager(folder_ids=[self.org.root_folder_id],
+                                 recursive=True,
+                                 backend=self._crawl_backend())
+        yield from arrivals(manager.iter_projects())
+
+    def get_gke_clusters(self):
+        """get gke-clusters -r of the whole organization."""
+        # pylint: disable=import-outside-toplevel
+        from gcpctl.gke_clusters.manager import GKEManager
+        manager = GKEManager(recursive=True, backend=self._crawl_backend())
+        yield from arrivals(manager.iter_clusters(
+            folder_ids=[self.org.root_folder_id]))
+
+    def get_pods(self):
+        """Listing of all the pods of a cluster."""
+        yield from arrivals(self._kubernetes_manager(
+            self.args.pods).iter_pods())
+
+    def pod_exec(self):
+        """pod-exec on exec_pods pods of a single cluster."""
+        # pylint: disable=import-outside-toplevel
+        from functools import partial
+        from gcpctl.utils.executor import ExecEngine, ExecTask
+        manager = self._kubernetes_manager(self.args.exec_pods)
+        tasks = [ExecTask(prefix=pod.metadata.name, group="cluster",
+                          func=partial(manager.exec_pod, pod.metadata.name,
+                                       pod.metadata.namespace, ["true"]))
+                 for pod in manager.iter_pods()]
+        with open(os.devnull, 'w', encoding='utf-8') as devnull:
+            engine = ExecEngine(stdout=devnull, stderr=devnull)
+            for result in engine.run(tasks):
+                yield result.duration
+
+    def cluster_exec(self):
+        """cluster-exec of 'true' on exec_clusters clusters."""
+        # pylint: disable=import-outside-toplevel
+        from gcpctl.gke_clusters.cluster import GKECluster
+        from gcpctl.kubernetes.kubeconfig import get_cluster_kubeconfig
+        from gcpctl.utils.process import AsyncExecutor, Command
+        clusters = [GKECluster(name=f"cluster-{index}", project_id="project",
+                               zone="zone", endpoint="10.0.0.1",
+                               ca_certificate="Q0E=")
+                    for index in range(self.args.exec_clusters)]
+        with open(os.devnull, 'w', encoding='utf-8') as devnull:
+            executor = AsyncExecutor(stdout=devnull, stderr=devnull)
+            for result in executor.run([
+                    Command(prefix=cluster.name,
+                            args=["true"], env=dict(
+                                os.environ, KUBECONFIG=get_cluster_kubeconfig(
+                                    cluster)))
+                    for cluster in clusters]):
+                yield result.duration
+
+    def run(self, command) -> Measurement:
+        """Runs a command repeat times."""
+        for module in COMMAND_MODULES[command]:
+            importlib.import_module(module)
+        measurement = Measurement()
+        for _ in range(self.args.repeat):
+            start = time.perf_counter()
+            latencies = []
+            try:
+                for latency in getattr(self, command.replace('-', '_'))():
+                    latencies.append(latency)
+            except FakeAPIError:
+                measurement.errors += 1
+            measurement.durations.append(time.perf_counter() - start)
+            measurement.latencies.extend(latencies)
+            measurement.items = len(latencies)
+        measurement.calls = sum(api.calls for api in self.apis)
+        measurement.errors += sum(api.errors + api.throttled
+                                  for api in self.apis)
+        measurement.retries = sum({id(caller): caller.retries for caller in (
+            get_api_caller(api) for api in self.apis)}.values())
+        measurement.max_rss = resource.getrusage(
+            resource.RUSAGE_SELF).ru_maxrss
+        return measurement
+
+
+def _run_in_child(args, command, conn) -> None:
+    configure_api_callers(rate=args.api_rate)
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, \
+            contextlib.redirect_stdout(devnull):
+        conn.send(Scenarios(args).run(command))
+    conn.close()
+
+
+def measure(args, command) -> Measurement:
+    """Runs a command in a process of its own, so its peak memory usage
+    isn't affected by the commands run before it."""
+    context = multiprocessing.get_context('fork')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_run_in_child,
+                              args=(args, command, sender))
+    process.start()
+    sender.close()
+    try:
+        measurement = receiver.recv()
+    except EOFError as ex:
+        raise RuntimeError(f"{command} failed, see the traceback above") \
+            from ex
+    finally:
+        process.join()
+    return measurement
+
+
+def main():
+    """Benchmark entry."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--commands', nargs='+', choices=COMMANDS,
+                        default=list(COMMANDS))
+    parser.add_argument('--sizes', nargs='+', choices=ORG_SIZES,
+                        default=['10', '1k'],
+                        help='Number of projects of the organization')
+    parser.add_argument('--latency', type=float, default=0.01,
+                        help='Seconds every API call takes')
+    parser.add_argument('--page-size', type=int, default=500)
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Share of the API calls which fail')
+    parser.add_argument('--quota', type=int, default=0,
+                        help='Calls per second every API allows, beyond \
+which calls are throttled, 0 for no quota')
+    parser.add_argument('--api-rate', type=float, default=0.0,
+                        help='Calls per second gcpctl makes to every API, \
+0 for no limit')
+    parser.add_argument('--parallelism', type=int, default=16)
+    parser.add_argument('--pods', type=int, default=10000,
+                        help='Pods of the cluster of get-pods')
+    parser.add_argument('--exec-pods', type=int, default=1000,
+                        help='Pods pod-exec executes in')
+    parser.add_argument('--exec-clusters', type=int, default=100,
+                        help='Clusters cluster-exec executes on')
+    parser.add_argument('--output-lines', type=int, default=10,
+                        help='Lines every pod exec writes')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Times every command is run')
+    args = parser.parse_args()
+
+    Printer.print_headers(["Command", "Scale", "Items", "Seconds",
+                           "Items/s", "p50", "p99", "API calls", "Errors",
+                           "Retries", "Peak RSS"])
+    for command in args.commands:
+        if command in ORG_COMMANDS:
+            scales = [(size, f"{size} projects") for size in args.sizes]
+        elif command == 'get-pods':
+            scales = [(None, f"{args.pods} pods")]
+        elif command == 'pod-exec':
+            scales = [(None, f"{args.exec_pods} pods")]
+        else:
+            scales = [(None, f"{args.exec_clusters} clusters")]
+        for size, scale in scales:
+            args.size = size
+            result = measure(args, command)
+            seconds = statistics.median(result.durations)
+            print(Printer.get_row_str([
+                command, scale, result.items, f"{seconds:.3f}",
+                f"{result.items / seconds:.0f}" if seconds else "-",
+                f"{percentile(result.latencies, 0.5):.4f}",
+                f"{percentile(result.latencies, 0.99):.4f}",
+                result.calls, result.errors, result.retries,
+                f"{result.max_rss / 1024:.0f}MiB"]))
+            sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Compares the discovery backends against a fake organization.
+
+Usage: python -m gcpctl.benchmarks.discovery [--latency SECONDS]
+"""
+# Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import argparse
+import time
+
+from gcpctl.api_caller import configure_api_callers
+from gcpctl.benchmarks.fakes import (FakeAssetServiceClient,
+                                     FakeClusterManagerClient,
+                                     FakeFoldersClient, FakeOrg,
+                                     FakeProjectsClient)
+from gcpctl.discovery.crawl import CrawlBackend
+from gcpctl.discovery.search import SearchBackend
+from gcpctl.printer import Printer
+
+
+def run(org, latency, parallelism):
+    """Finds all the clusters under the root folder with every backend.
+    :return: (backend, API calls, clusters found, seconds) tuples.
+    """
+    results = []
+    crawl_clients = {
+        'folders_client': FakeFoldersClient(org, latency),
+        'projects_client': FakeProjectsClient(org, latency),
+        'clusters_client': FakeClusterManagerClient(org, latency)}
+    search_client = FakeAssetServiceClient(org, latency)
+    backends = (
+        ('crawl', CrawlBackend(parallelism=parallelism, **crawl_clients),
+         crawl_clients.values()),
+        ('search', SearchBackend(parallelism=parallelism,
+                                 client=search_client), [search_client]))
+    for name, backend, clients in backends:
+        start = time.perf_counter()
+        clusters = list(backend.get_clusters(
+            folder_ids=[org.root_folder_id], recursive=True))
+        elapsed = time.perf_counter() - start
+        results.append((name, sum(client.calls for client in clients),
+                        len(clusters), elapsed))
+    return results
+
+
+def main():
+    """Benchmark entry."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='Seconds every API call takes')
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--projects-per-folder', type=int, default=10)
+    parser.add_argument('--parallelism', type=int, default=16)
+    args = parser.parse_args()
+    # Measure the backends rather than the rate limit
+    configure_api_callers(rate=0)
+
+    org = FakeOrg(depth=args.depth,
+                  projects_per_folder=args.projects_per_folder)
+    Printer.print_headers(["Backend", "API calls", "Clusters", "Seconds"])
+    for name, calls, clusters, elapsed in run(org, args.latency,
+                                              args.parallelism):
+        print(Printer.get_row_str([name, calls, clusters,
+                                   f"{elapsed:.3f}"]))
+
+
+if __name__ == '__main__':
+    main()
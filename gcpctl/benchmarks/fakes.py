@@ -0,0 +1,583 @@
+"""In-process fakes of the GCP and Kubernetes APIs used by gcpctl."""
+# Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import datetime
+import queue
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+# FakeOrg arguments creating organizations of about 10, 1k and 10k projects
+ORG_SIZES = {
+    '10': {'depth': 1, 'folders_per_folder': 1, 'projects_per_folder': 5},
+    '1k': {'depth': 2, 'folders_per_folder': 10, 'projects_per_folder': 9},
+    '10k': {'depth': 3, 'folders_per_folder': 10, 'projects_per_folder': 9},
+}
+POD_PHASES = ('Running',) * 8 + ('Pending', 'Succeeded')
+
+
+class FakeAPIError(Exception):
+    """Error injected by the fake APIs. Like the google.api_core ones, it
+    carries the HTTP status in code: 503 for transient errors and 429 for
+    calls beyond the quota."""
+
+    def __init__(self, message, code=503) -> None:
+        super().__init__(message)
+        self.code = code
+
+
+@dataclass
+class FakeFolder():
+    """resourcemanager_v3 Folder look-alike."""
+
+    name: str
+    display_name: str
+    parent: str
+
+
+@dataclass
+class FakeProject():
+    """resourcemanager_v3 Project look-alike."""
+
+    name: str
+    project_id: str
+    display_name: str
+    parent: str
+    etag: str = ""
+    update_time: Optional[datetime.datetime] = None
+
+
+@dataclass
+class FakeMasterAuth():
+    """container_v1 MasterAuth look-alike."""
+
+    cluster_ca_certificate: str = ""
+
+
+@dataclass
+class FakeCluster():
+    """container_v1 Cluster look-alike."""
+
+    name: str
+    zone: str
+    location: str
+    endpoint: str = ""
+    master_auth: FakeMasterAuth = field(default_factory=FakeMasterAuth)
+    etag: str = ""
+
+
+@dataclass
+class FakeVersionedResource():
+    """asset_v1 VersionedResource look-alike."""
+
+    resource: dict
+
+
+@dataclass
+class FakeSearchResult():
+    """asset_v1 ResourceSearchResult look-alike."""
+
+    name: str
+    asset_type: str
+    display_name: str
+    location: str = ""
+    parent_full_resource_name: str = ""
+    additional_attributes: dict = field(default_factory=dict)
+    folders: List[str] = field(default_factory=list)
+    update_time: Optional[datetime.datetime] = None
+    versioned_resources: List[FakeVersionedResource] = field(
+        default_factory=list)
+
+
+@dataclass
+class FakeListClustersResponse():
+    """container_v1 ListClustersResponse look-alike."""
+
+    clusters: List[FakeCluster]
+
+
+class FakeOrg():
+    """In-memory organization: a tree of folders, projects in every folder
+    and GKE clusters in every project.
+    """
+
+    def __init__(self, root_folder_id="1000", depth=2, folders_per_folder=3,
+                 projects_per_folder=5, clusters_per_project=1) -> None:
+        """Constructor.
+        :param root_folder_id: ID of the folder everything is created under.
+        :param depth: Levels of sub-folders under the root folder.
+        :param folders_per_folder: Sub-folders of every folder.
+        :param projects_per_folder: Projects of every folder.
+        :param clusters_per_project: GKE clusters of every project.
+        """
+        self.root_folder_id = root_folder_id
+        self.folders = {}
+        self.projects = {}
+        self.clusters = {}
+        self.ancestors = {}
+        self._counter = int(root_folder_id)
+        self._populate(f"folders/{root_folder_id}", [], depth,
+                       folders_per_folder, projects_per_folder,
+                       clusters_per_project)
+
+    def _next_id(self) -> int:
+        self._counter += 1
+        return self._counter
+
+    def _populate(self, parent, ancestors, depth, folders_per_folder,
+                  projects_per_folder, clusters_per_project) -> None:
+        ancestors = ancestors + [parent]
+        self.ancestors[parent] = ancestors
+        self.projects[parent] = []
+        for _ in range(projects_per_folder):
+            number = self._next_id()
+            project = FakeProject(name=f"projects/{number}",
+                                  project_id=f"project-{number}",
+                                  display_name=f"Project {number}",
+                                  parent=parent)
+            self.projects[parent].append(project)
+            self.clusters[project.project_id] = [
+                FakeCluster(name=f"cluster-{index}", zone="us-central1-a",
+                            location="us-central1-a")
+                for index in range(clusters_per_project)]
+        self.folders[parent] = []
+        if depth <= 0:
+            return
+        for _ in range(folders_per_folder):
+            number = self._next_id()
+            folder = FakeFolder(name=f"folders/{number}",
+                                display_name=f"Folder {number}",
+                                parent=parent)
+            self.folders[parent].append(folder)
+            self._populate(folder.name, ancestors, depth - 1,
+                           folders_per_folder, projects_per_folder,
+                           clusters_per_project)
+
+    def iter_projects(self, folder):
+        """Yields all the projects under the folder, at any depth."""
+        yield from self.projects.get(folder, [])
+        for sub_folder in self.folders.get(folder, []):
+            yield from self.iter_projects(sub_folder.name)
+
+    def all_projects(self) -> List[FakeProject]:
+        """Returns all the projects of the organization."""
+        return list(self.iter_projects(f"folders/{self.root_folder_id}"))
+
+
+def _get_field(request, name):
+    """Returns a field of a request given either as a dict or a message."""
+    if isinstance(request, dict):
+        return request.get(name)
+    return getattr(request, name, None)
+
+
+class FakePage():
+    """A single response of a paginated API method."""
+
+    def __init__(self, field_name, items, next_page_token="") -> None:
+        setattr(self, field_name, items)
+        self.next_page_token = next_page_token
+
+
+class FakePager():
+    """Google API pager look-alike. Pages are only obtained when iterated,
+    and obtaining every page is a round trip. Page tokens are offsets.
+    """
+
+    def __init__(self, api, field_name, items, page_size,
+                 page_token=None) -> None:
+        self.api = api
+        self.field_name = field_name
+        self.items = items
+        self.page_size = page_size
+        self.start = int(page_token or 0)
+
+    @property
+    def pages(self):
+        """Yields the responses, one per page."""
+        for start in range(self.start, max(len(self.items), 1),
+                           self.page_size):
+            self.api.round_trip()
+            end = start + self.page_size
+            yield FakePage(self.field_name, self.items[start:end],
+                           str(end) if end < len(self.items) else "")
+
+    def __iter__(self):
+        for page in self.pages:
+            yield from getattr(page, self.field_name)
+
+
+class FakeAPI():
+    """Base class of the fake API clients. Every round trip sleeps for
+    latency seconds, to simulate the network, and is counted. A share of
+    the round trips, error_rate, fails with a transient FakeAPIError, and
+    round trips beyond quota per second fail with a throttling one.
+    """
+
+    def __init__(self, org: FakeOrg, latency: float = 0.0,
+                 page_size: int = 500, error_rate: float = 0.0,
+                 seed: Optional[int] = None, quota: int = 0) -> None:
+        self.org = org
+        self.latency = latency
+        self.page_size = page_size
+        self.error_rate = error_rate
+        self.quota = quota
+        self.calls = 0
+        self.errors = 0
+        self.throttled = 0
+        self._random = random.Random(seed)
+        self._window = (0, 0)
+        self._lock = threading.Lock()
+
+    def round_trip(self) -> None:
+        """Simulates a request and its response.
+        :raises FakeAPIError: For error_rate of the calls, and the calls
+            beyond the quota.
+        """
+        with self._lock:
+            self.calls += 1
+            second = int(time.monotonic())
+            calls = self._window[1] + 1 if self._window[0] == second else 1
+            self._window = (second, calls)
+            throttled = bool(self.quota) and calls > self.quota
+            failed = not throttled and \
+                self._random.random() < self.error_rate
+            self.throttled += throttled
+            self.errors += failed
+        if throttled:
+            raise FakeAPIError("Quota exceeded", code=429)
+        if self.latency:
+            time.sleep(self.latency)
+        if failed:
+            raise FakeAPIError("The service is currently unavailable")
+
+    def pager(self, field_name, items, request) -> FakePager:
+        """Returns a pager over the items, from the request's page."""
+        return FakePager(self, field_name, list(items),
+                         _get_field(request, 'page_size') or self.page_size,
+                         _get_field(request, 'page_token'))
+
+
+class FakeFoldersClient(FakeAPI):
+    """resourcemanager_v3 FoldersClient look-alike."""
+
+    def list_folders(self, request, retry=None):
+        """Returns the direct sub-folders of the request's parent."""
+        # pylint: disable=unused-argument
+        return self.pager('folders', self.org.folders.get(
+            _get_field(request, 'parent'), []), request)
+
+
+class FakeProjectsClient(FakeAPI):
+    """resourcemanager_v3 ProjectsClient look-alike."""
+
+    def list_projects(self, request, retry=None):
+        """Returns the direct projects of the request's parent."""
+        # pylint: disable=unused-argument
+        return self.pager('projects', self.org.projects.get(
+            _get_field(request, 'parent'), []), request)
+
+
+class FakeClusterManagerClient(FakeAPI):
+    """container_v1 ClusterManagerClient look-alike."""
+
+    def list_clusters(self, parent, retry=None):
+        """Returns the clusters of a projects/P/locations/- parent."""
+        # pylint: disable=unused-argument
+        self.round_trip()
+        project_id = parent.split("/")[1]
+        return FakeListClustersResponse(
+            clusters=list(self.org.clusters.get(project_id, [])))
+
+
+class FakeAssetServiceClient(FakeAPI):
+    """asset_v1 AssetServiceClient look-alike."""
+
+    PROJECT_ASSET_TYPE = "cloudresourcemanager.googleapis.com/Project"
+    CLUSTER_ASSET_TYPE = "container.googleapis.com/Cluster"
+
+    def _search_results(self, scope, asset_types, read_mask=()):
+        if scope.startswith("projects/"):
+            projects = [project for projects in self.org.projects.values()
+                        for project in projects
+                        if project.project_id == scope.split("/")[1]]
+        else:
+            projects = self.org.iter_projects(scope)
+        for project in projects:
+            folders = self.org.ancestors[project.parent]
+            if self.PROJECT_ASSET_TYPE in asset_types:
+                yield FakeSearchResult(
+                    name=f"//cloudresourcemanager.googleapis.com/\
+{project.name}",
+                    asset_type=self.PROJECT_ASSET_TYPE,
+                    display_name=project.display_name,
+                    parent_full_resource_name=f"//cloudresourcemanager.\
+googleapis.com/{project.parent}",
+                    additional_attributes={"projectId": project.project_id},
+                    folders=folders)
+            if self.CLUSTER_ASSET_TYPE in asset_types:
+                for cluster in self.org.clusters[project.project_id]:
+                    # Only returned when requested, like the real search
+                    versioned_resources = [FakeVersionedResource({
+                        "endpoint": cluster.endpoint,
+                        "masterAuth": {
+                            "clusterCaCertificate":
+                                cluster.master_auth.cluster_ca_certificate},
+                    })] if "versionedResources" in read_mask else []
+                    yield FakeSearchResult(
+                        name=f"//container.googleapis.com/projects/\
+{project.project_id}/locations/{cluster.location}/clusters/{cluster.name}",
+                        asset_type=self.CLUSTER_ASSET_TYPE,
+                        display_name=cluster.name,
+                        location=cluster.location,
+                        folders=folders,
+                        versioned_resources=versioned_resources)
+
+    def search_all_resources(self, request, retry=None):
+        """Returns the resources of the requested types under the scope."""
+        # pylint: disable=unused-argument
+        read_mask = _get_field(request, 'read_mask')
+        return self.pager('results', self._search_results(
+            _get_field(request, 'scope'),
+            _get_field(request, 'asset_types'),
+            _get_field(read_mask, 'paths') if read_mask else []), request)
+
+
+@dataclass
+class FakeOwnerReference():
+    """kubernetes V1OwnerReference look-alike."""
+
+    kind: str
+    name: str
+    uid: str
+
+
+@dataclass
+class FakeObjectMeta():
+    """kubernetes V1ObjectMeta look-alike."""
+
+    name: str
+    namespace: str
+    labels: Dict[str, str] = field(default_factory=dict)
+    owner_references: List[FakeOwnerReference] = field(default_factory=list)
+    resource_version: str = "1"
+    uid: str = ""
+
+
+@dataclass
+class FakePodStatus():
+    """kubernetes V1PodStatus look-alike."""
+
+    phase: str = "Running"
+
+
+@dataclass
+class FakePod():
+    """kubernetes V1Pod look-alike."""
+
+    metadata: FakeObjectMeta
+    status: FakePodStatus = field(default_factory=FakePodStatus)
+
+
+@dataclass
+class FakeListMeta():
+    """kubernetes V1ListMeta look-alike."""
+
+    _continue: Optional[str] = None
+    resource_version: str = "1"
+
+
+@dataclass
+class FakePodList():
+    """kubernetes V1PodList look-alike."""
+
+    items: List[FakePod]
+    metadata: FakeListMeta = field(default_factory=FakeListMeta)
+
+
+def make_pods(count, namespaces=10, apps=50, replicas=5) -> List[FakePod]:
+    """Returns pods spread across namespaces, owned by the ReplicaSets of
+    apps, with replicas pods each and a few of them not running.
+    """
+    pods = []
+    for index in range(count):
+        replica_set = index // replicas
+        app = f"app-{replica_set % apps}"
+        owner = FakeOwnerReference(kind="ReplicaSet",
+                                   name=f"{app}-{replica_set}",
+                                   uid=f"rs-{replica_set}")
+        pods.append(FakePod(
+            metadata=FakeObjectMeta(
+                name=f"{app}-{replica_set}-{index % replicas}",
+                namespace=f"ns-{replica_set % namespaces}",
+                labels={"app": app}, owner_references=[owner],
+                resource_version=str(index + 1), uid=f"pod-{index}"),
+            status=FakePodStatus(
+                phase=POD_PHASES[index % len(POD_PHASES)])))
+    return pods
+
+
+def _get_path(obj, path):
+    """Returns the value of a dotted field path, e.g. 'status.phase'."""
+    for name in path.split("."):
+        obj = getattr(obj, name)
+    return obj
+
+
+def _match_selector(selector, get_value) -> bool:
+    """Whether a 'key=value,key!=value' selector matches."""
+    for requirement in filter(None, (selector or "").split(",")):
+        if "!=" in requirement:
+            key, value = requirement.split("!=", 1)
+            if get_value(key) == value:
+                return False
+        else:
+            key, value = requirement.replace("==", "=").split("=", 1)
+            if get_value(key) != value:
+                return False
+    return True
+
+
+class FakeKubernetesConfiguration():
+    """kubernetes Configuration look-alike."""
+
+    def get_api_key_with_prefix(self, identifier):
+        """Returns the token of the identifier."""
+        # pylint: disable=unused-argument
+        return "Bearer fake-token"
+
+
+class FakeKubernetesApiClient():
+    """kubernetes ApiClient look-alike. kubernetes.stream swaps its request
+    method for the duration of an exec."""
+
+    def __init__(self) -> None:
+        self.configuration = FakeKubernetesConfiguration()
+        self.request = None
+
+
+class FakeWSClient():
+    """kubernetes WSClient look-alike: the output of an exec, available
+    after the first update."""
+
+    def __init__(self, api, stdout, returncode=0) -> None:
+        self.api = api
+        self._stdout = stdout
+        self._stderr = ""
+        self._open = True
+        self.returncode = returncode
+
+    def is_open(self) -> bool:
+        """Whether the exec is still running."""
+        return self._open
+
+    def update(self, timeout=0) -> None:
+        """Receives the output, which completes the exec."""
+        # pylint: disable=unused-argument
+        self.api.round_trip()
+        self._open = False
+
+    def peek_stdout(self) -> bool:
+        """Whether there is unread stdout."""
+        return bool(self._stdout)
+
+    def read_stdout(self) -> str:
+        """Returns the unread stdout."""
+        data, self._stdout = self._stdout, ""
+        return data
+
+    def peek_stderr(self) -> bool:
+        """Whether there is unread stderr."""
+        return bool(self._stderr)
+
+    def read_stderr(self) -> str:
+        """Returns the unread stderr."""
+        data, self._stderr = self._stderr, ""
+        return data
+
+    def close(self) -> None:
+        """Closes the connection."""
+        self._open = False
+
+
+class FakeWatch():
+    """kubernetes Watch look-alike: streams the events put into its queue
+    until stopped. Exceptions put into the queue are raised instead."""
+
+    def __init__(self) -> None:
+        self.events = queue.Queue()
+        # Keyword arguments of every stream call
+        self.calls = []
+        self._stopped = threading.Event()
+
+    def stream(self, func, **kwargs):
+        """Yields the events as they are put into the queue."""
+        # pylint: disable=unused-argument
+        self.calls.append(kwargs)
+        while not self._stopped.is_set():
+            try:
+                event = self.events.get(timeout=0.01)
+            except queue.Empty:
+                continue
+            if isinstance(event, Exception):
+                raise event
+            yield event
+
+    def stop(self) -> None:
+        """Ends the stream."""
+        self._stopped.set()
+
+
+class FakeCoreV1Api(FakeAPI):
+    """kubernetes CoreV1Api look-alike, of a single cluster."""
+
+    def __init__(self, pods: List[FakePod], latency: float = 0.0,
+                 page_size: int = 500, error_rate: float = 0.0,
+                 seed: Optional[int] = None, quota: int = 0,
+                 output_lines: int = 10) -> None:
+        super().__init__(org=None, latency=latency, page_size=page_size,
+                         error_rate=error_rate, seed=seed, quota=quota)
+        self.pods = pods
+        self.output_lines = output_lines
+        self.api_client = FakeKubernetesApiClient()
+
+    def list_pod_for_all_namespaces(self, limit=None, _continue=None,
+                                    label_selector=None,
+                                    field_selector=None, **kwargs):
+        """Returns a page of the pods matching the selectors."""
+        # pylint: disable=unused-argument
+        self.round_trip()
+        pods = self.pods
+        if label_selector or field_selector:
+            pods = [pod for pod in pods
+                    if _match_selector(label_selector,
+                                       lambda key, pod=pod:
+                                       pod.metadata.labels.get(key))
+                    and _match_selector(field_selector,
+                                        lambda key, pod=pod:
+                                        _get_path(pod, key))]
+        start = int(_continue or 0)
+        end = start + (limit or len(pods))
+        return FakePodList(items=pods[start:end], metadata=FakeListMeta(
+            _continue=str(end) if end < len(pods) else None))
+
+    def connect_get_namespaced_pod_exec(self, name, namespace, **kwargs):
+        """Starts an exec in a pod, writing output_lines lines."""
+        # pylint: disable=unused-argument
+        self.round_trip()
+        return FakeWSClient(self, "".join(
+            f"{namespace}/{name} line {index}\n"
+            for index in range(self.output_lines)))
@@ -0,0 +1,86 @@
+"""Measures the cost per row of rendering tables in every output format.
+
+Usage: python -m gcpctl.benchmarks.printer [--rows N [N ...]]
+"""
+# Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import argparse
+import os
+import time
+
+from gcpctl.printer import OUTPUT_BUFFER_SIZE, OUTPUT_FORMATS, Printer
+
+HEADERS = ["Cluster", "Project", "Zone"]
+ZONES = ["us-central1-a", "europe-west1-b", "asia-east1"]
+
+
+def iter_rows(count):
+    """Yields rows looking like the ones of 'get gke-clusters'."""
+    for index in range(count):
+        yield [f"cluster-{index}", f"project-{index % 997}-{index % 13}",
+               ZONES[index % len(ZONES)]]
+
+
+def render_fixed(rows, stream):
+    """Renders rows the way tables were rendered before the table writer,
+    with a format string built for every row."""
+    for row in rows:
+        stream.write(Printer.get_row_str(row) + "\n")
+
+
+def get_modes():
+    """Returns (name, render function) tuples for every mode measured."""
+    modes = [('fixed', render_fixed)]
+    modes.append(('table', lambda rows, stream: Printer.print_table(
+        HEADERS, rows, stream=stream)))
+    modes.append(('table-full', lambda rows, stream: Printer.print_table(
+        HEADERS, rows, stream=stream, lookahead=None)))
+    for output in OUTPUT_FORMATS:
+        if output == 'table':
+            continue
+        modes.append((output, lambda rows, stream, output=output:
+                      Printer.print_table(HEADERS, rows, stream=stream,
+                                          output=output)))
+    return modes
+
+
+def run(count, render):
+    """Renders count rows to /dev/null.
+    :return: Microseconds per row.
+    """
+    with open(os.devnull, 'w', buffering=OUTPUT_BUFFER_SIZE,
+              encoding='utf-8') as stream:
+        start = time.perf_counter()
+        render(iter_rows(count), stream)
+        elapsed = time.perf_counter() - start
+    return elapsed / count * 1e6
+
+
+def main():
+    """Benchmark entry."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+',
+                        default=[10000, 100000, 1000000],
+                        help='Number of rows of every rendered table')
+    args = parser.parse_args()
+
+    Printer.print_headers(["Mode", "Rows", "Microseconds per row"])
+    for name, render in get_modes():
+        for count in args.rows:
+            print(Printer.get_row_str([name, count,
+                                       f"{run(count, render):.3f}"]))
+
+
+if __name__ == '__main__':
+    main()
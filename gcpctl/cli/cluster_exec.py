@@ -1,4 +1,4 @@
-"""app get sub-command parser and entry points"""
+"""app cluster-exec sub-command parser and entry point"""
 # Copyright 2023 Arie Bregman
 #
 #    Licensed under the Apache License, Version 2.0 (the "License"); you may
@@ -14,7 +14,10 @@
 #    under the License.
 import logging
 
-from gcpctl.gke_clusters.manager import GKEManager
+from gcpctl.cli.utils import (add_backend_arguments, add_cache_arguments,
+                              add_inventory_arguments, get_gke_manager)
+from gcpctl.utils.concurrency import DEFAULT_PARALLELISM
+from gcpctl.utils.executor import DEFAULT_EXEC_PARALLELISM
 
 LOG = logging.getLogger(__name__)
 
@@ -27,10 +30,45 @@ def add_cluster_exec_parser(subparsers):
     cluster_exec_parser.add_argument('-cl', '--cluster', '--clusters',
                                      dest="clusters", nargs='+')
     cluster_exec_parser.add_argument('-c', '--commands', '--command',
-                                     dest="commands", nargs='+')
+                                     dest="commands", nargs='+',
+                                     required=True)
+    cluster_exec_parser.add_argument('-p', '--project', '--projects',
+                                     dest="project_ids", nargs='+',
+                                     default=[])
+    cluster_exec_parser.add_argument('-e', '--env-type', nargs='+',
+                                     dest="env_types",
+                                     help='Env names from config file')
+    cluster_exec_parser.add_argument(
+        '--parallelism', type=int, default=DEFAULT_PARALLELISM,
+        dest="parallelism", help='Maximum number of concurrent API calls')
+    cluster_exec_parser.add_argument(
+        '-r', '--recursive', action='store_true', dest="recursive",
+        help='Include projects of sub-folders')
+    cluster_exec_parser.add_argument(
+        '--exec-parallelism', type=int, default=DEFAULT_EXEC_PARALLELISM,
+        dest="exec_parallelism",
+        help='Maximum number of clusters to execute on at the same time')
+    cluster_exec_parser.add_argument(
+        '--timeout', type=float, dest="timeout",
+        help='Seconds after which the command is terminated on a cluster')
+    cluster_exec_parser.add_argument(
+        '--fail-fast', action='store_true', dest="fail_fast",
+        help='Stop once the command failed on a cluster')
+    cluster_exec_parser.add_argument(
+        '--stream', action='store_true', dest="stream",
+        help='Print output lines as they are written, instead of grouped \
+by cluster')
+    add_cache_arguments(cluster_exec_parser)
+    add_inventory_arguments(cluster_exec_parser)
+    add_backend_arguments(cluster_exec_parser)
 
 
 def cluster_exec_main(args):
     """Main entry for sub-command cluster-exec."""
-    gke_manager = GKEManager(project_ids=args.project_ids)
-    gke_manager.cluster_exec(commands=args.commands)
+    gke_manager = get_gke_manager(args)
+    if not gke_manager.cluster_exec(
+            commands=args.commands, parallelism=args.exec_parallelism,
+            timeout=args.timeout, fail_fast=args.fail_fast,
+            stream=args.stream):
+        return 1
+    return 0
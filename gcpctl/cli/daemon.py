@@ -0,0 +1,140 @@
+"""Forwarding of commands to a 'gcpctl serve' daemon"""
+# Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+# Imported by every invocation of gcpctl, so only cheap modules are imported
+import json
+import os
+import socket
+import struct
+import sys
+
+SOCKET_PATH = os.environ.get('GCPCTL_SOCKET') or os.path.join(
+    os.path.expanduser('~'), '.cache/gcpctl/daemon.sock')
+# Commands which always run in the invoking process
+LOCAL_COMMANDS = {'serve', 'shell'}
+# Environment variables selecting the credentials and the clusters commands
+# use. A command is run by the daemon only if they are the same in the
+# daemon, as its clients and caches were set up with the daemon's ones.
+IDENTITY_VARIABLES = {'KUBECONFIG', 'GOOGLE_APPLICATION_CREDENTIALS'}
+IDENTITY_PREFIXES = ('CLOUDSDK_',)
+
+# Every message is a frame: a channel byte, the length of the payload and
+# the payload. The client sends a single REQUEST frame, the daemon answers
+# with STDOUT and STDERR frames and a final EXIT frame, or with a single
+# LOCAL frame when the client has to run the command itself.
+HEADER = struct.Struct('!cI')
+REQUEST = b'r'
+STDOUT = b'1'
+STDERR = b'2'
+EXIT = b'x'
+LOCAL = b'l'
+
+
+def get_identity_env(environ=None) -> dict:
+    """Returns the environment variables selecting the credentials and the
+    clusters commands use, see IDENTITY_VARIABLES.
+    :param environ: Defaults to os.environ.
+    """
+    environ = os.environ if environ is None else environ
+    return {name: value for name, value in environ.items()
+            if name in IDENTITY_VARIABLES or
+            name.startswith(IDENTITY_PREFIXES)}
+
+
+def send_frame(sock, channel: bytes, payload: bytes) -> None:
+    """Sends a single frame."""
+    sock.sendall(HEADER.pack(channel, len(payload)) + payload)
+
+
+def _recv_exactly(sock, size: int) -> bytes:
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed mid frame")
+        data += chunk
+    return data
+
+
+def recv_frame(sock):
+    """Receives a single frame.
+    :return: (channel, payload) tuple.
+    :raises ConnectionError: If the connection was closed.
+    """
+    channel, size = HEADER.unpack(_recv_exactly(sock, HEADER.size))
+    return channel, _recv_exactly(sock, size)
+
+
+def forward(argv, path=SOCKET_PATH):
+    """Runs a command on the daemon listening on path, writing its output
+    to stdout and stderr as it arrives.
+    :param argv: The command line arguments, without the program name.
+    :return: The exit code of the command, or None if no daemon is
+        listening or the daemon uses other credentials or clusters.
+    """
+    if not os.path.exists(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    with sock:
+        try:
+            return _forward(sock, argv)
+        except KeyboardInterrupt:
+            # Closing the connection aborts the command on the daemon
+            return 130
+
+
+def _forward(sock, argv):
+    """Sends the command to the daemon and writes its output."""
+    send_frame(sock, REQUEST, json.dumps({
+        'argv': argv, 'cwd': os.getcwd(),
+        'isatty': sys.stdout.isatty(),
+        'env': get_identity_env()}).encode('utf-8'))
+    streams = {STDOUT: sys.stdout.buffer, STDERR: sys.stderr.buffer}
+    while True:
+        try:
+            channel, payload = recv_frame(sock)
+        except ConnectionError:
+            sys.stderr.write("gcpctl: the daemon closed the connection\n")
+            return 1
+        if channel == EXIT:
+            return int(payload)
+        if channel == LOCAL:
+            return None
+        streams[channel].write(payload)
+        streams[channel].flush()
+
+
+def main():
+    """Entry point of the gcpctl command. Forwards the command to the
+    daemon when one is listening, and otherwise runs it in this process.
+    Set GCPCTL_NO_DAEMON to always run commands in this process.
+    """
+    argv = sys.argv[1:]
+    if not LOCAL_COMMANDS.intersection(argv) and \
+            not os.environ.get('GCPCTL_NO_DAEMON'):
+        code = forward(argv)
+        if code is not None:
+            return code
+    # pylint: disable=import-outside-toplevel
+    from gcpctl.cli.main import main as run_locally
+    return run_locally()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -13,11 +13,15 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 import logging
+import sys
 
-from gcpctl.config import Config
-from gcpctl.folders.manager import FolderManager
-from gcpctl.projects.manager import ProjectManager
-from gcpctl.gke_clusters.manager import GKEManager
+from gcpctl.cli.utils import (add_backend_arguments, add_cache_arguments,
+                              add_inventory_arguments, add_output_arguments,
+                              get_cache, get_discovery_backend,
+                              get_output_options, resolve_envs)
+from gcpctl.exceptions.cli import UnknownColumns
+from gcpctl.utils.colors import BCOLORS
+from gcpctl.utils.concurrency import DEFAULT_PARALLELISM
 
 LOG = logging.getLogger(__name__)
 
@@ -37,6 +41,19 @@ def add_get_parser(subparsers):
     get_gke_clusters_parser.add_argument('-e', '--env-type', nargs='+',
                                          dest="env_types",
                                          help='Env name from config file')
+    get_gke_clusters_parser.add_argument(
+        '--parallelism', type=int, default=DEFAULT_PARALLELISM,
+        dest="parallelism", help='Maximum number of concurrent API calls')
+    get_gke_clusters_parser.add_argument(
+        '-r', '--recursive', action='store_true', dest="recursive",
+        help='Include projects of sub-folders at any depth')
+    add_cache_arguments(get_gke_clusters_parser)
+    add_inventory_arguments(get_gke_clusters_parser)
+    get_gke_clusters_parser.add_argument(
+        '--sort', action='store_true', dest="sort",
+        help='Print rows sorted, once all of them were obtained')
+    add_output_arguments(get_gke_clusters_parser)
+    add_backend_arguments(get_gke_clusters_parser)
 
     # Projects
     get_projects_parser = get_subparsers.add_parser("projects")
@@ -48,6 +65,18 @@ def add_get_parser(subparsers):
     get_projects_parser.add_argument('-f', '--folder-ids', nargs='+',
                                      default=[],
                                      dest="folder_ids", help='Folder IDs')
+    get_projects_parser.add_argument(
+        '-r', '--recursive', action='store_true', dest="recursive",
+        help='Include projects of sub-folders at any depth')
+    get_projects_parser.add_argument(
+        '--parallelism', type=int, default=DEFAULT_PARALLELISM,
+        dest="parallelism", help='Maximum number of concurrent API calls')
+    add_cache_arguments(get_projects_parser)
+    get_projects_parser.add_argument(
+        '--sort', action='store_true', dest="sort",
+        help='Print rows sorted, once all of them were obtained')
+    add_output_arguments(get_projects_parser)
+    add_backend_arguments(get_projects_parser)
 
     # Folders
     get_folders_parser = get_subparsers.add_parser("folders")
@@ -56,27 +85,81 @@ def add_get_parser(subparsers):
     get_folders_parser.add_argument('-f', '--folder-ids', nargs='+',
                                     default=[],
                                     dest="folder_ids", help='Folder ID')
+    depth_group = get_folders_parser.add_mutually_exclusive_group()
+    depth_group.add_argument(
+        '-r', '--recursive', action='store_true', dest="recursive",
+        help='Include sub-folders at any depth')
+    depth_group.add_argument(
+        '--depth', type=int, default=0, dest="depth",
+        help='Levels of sub-folders to include, 0 for only the direct \
+sub-folders')
+    get_folders_parser.add_argument(
+        '--tree', action='store_true', dest="tree",
+        help='Print the folders as a tree, under their parents')
+    get_folders_parser.add_argument(
+        '--parallelism', type=int, default=DEFAULT_PARALLELISM,
+        dest="parallelism", help='Maximum number of concurrent API calls')
+    add_cache_arguments(get_folders_parser)
+    get_folders_parser.add_argument(
+        '--sort', action='store_true', dest="sort",
+        help='Print rows sorted, once all of them were obtained')
+    add_output_arguments(get_folders_parser)
 
 
+# The entries import what they need, so the GCP and Kubernetes libraries
+# are loaded only by the sub-command which is run.
 def get_gke_clusters_main(args):
     """Get GKE clusters main entry."""
-    if args.env_types:
-        project_manager = ProjectManager(
-            folder_ids=Config.get_folder_ids(args.env_types))
-        args.project_ids.extend([project.project_id for project in
-                                 project_manager.get_projects()])
-    gke_manager = GKEManager(project_ids=args.project_ids)
-    gke_manager.list_clusters()
+    # pylint: disable=import-outside-toplevel
+    from gcpctl.gke_clusters.manager import GKEManager
+    clusters, folder_ids = resolve_envs(args)
+    gke_manager = GKEManager(project_ids=args.project_ids,
+                             folder_ids=folder_ids, clusters=clusters,
+                             recursive=args.recursive,
+                             backend=get_discovery_backend(args)
+                             if args.project_ids or folder_ids else None)
+    try:
+        gke_manager.list_clusters(sort=args.sort,
+                                  **get_output_options(args))
+    except UnknownColumns as ex:
+        LOG.error("%s%s%s", BCOLORS['RED'], ex.message, BCOLORS['ENDC'])
+        sys.exit(2)
 
 
 def get_projects_main(args):
     """Get projects main entry."""
-    args.folder_ids.extend(Config.get_folder_ids(args.env_types))
-    projects_manager = ProjectManager(folder_ids=args.folder_ids)
-    projects_manager.list()
+    # pylint: disable=import-outside-toplevel
+    from gcpctl.config import Config
+    from gcpctl.projects.manager import ProjectManager
+    # Not extended in place, the parser's default list would keep the IDs
+    # for the next commands of a shell or serve session
+    folder_ids = args.folder_ids + Config.get_folder_ids(args.env_types)
+    projects_manager = ProjectManager(folder_ids=folder_ids,
+                                      recursive=args.recursive,
+                                      backend=get_discovery_backend(args))
+    try:
+        projects_manager.list(sort=args.sort, **get_output_options(args))
+    except UnknownColumns as ex:
+        LOG.error("%s%s%s", BCOLORS['RED'], ex.message, BCOLORS['ENDC'])
+        sys.exit(2)
 
 
 def get_folders_main(args):
     """Get folders main entry."""
-    folder_manager = FolderManager(folder_ids=args.folder_ids)
-    folder_manager.list()
+    # pylint: disable=import-outside-toplevel
+    from gcpctl.folders.manager import FolderManager
+    if args.tree and (args.output != 'table' or args.columns or args.sort):
+        # The tree has neither rows nor columns
+        args.parser.error("--tree can't be combined with -o/--output, "
+                          "--columns or --sort")
+    folder_manager = FolderManager(folder_ids=args.folder_ids,
+                                   recursive=args.recursive,
+                                   depth=args.depth,
+                                   parallelism=args.parallelism,
+                                   cache=get_cache(args))
+    try:
+        folder_manager.list(sort=args.sort, tree=args.tree,
+                            **get_output_options(args))
+    except UnknownColumns as ex:
+        LOG.error("%s%s%s", BCOLORS['RED'], ex.message, BCOLORS['ENDC'])
+        sys.exit(2)
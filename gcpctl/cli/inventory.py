@@ -0,0 +1,125 @@
+"""app inventory sub-command parser and entry points"""
+# Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import logging
+import sys
+
+from gcpctl.cli.utils import (add_backend_arguments, add_cache_arguments,
+                              add_output_arguments, get_discovery_backend,
+                              get_output_options)
+from gcpctl.exceptions.cli import UnknownColumns
+from gcpctl.inventory.snapshot import DEFAULT_CLUSTERS_MAX_AGE
+from gcpctl.utils.colors import BCOLORS
+from gcpctl.utils.concurrency import DEFAULT_PARALLELISM
+
+LOG = logging.getLogger(__name__)
+
+
+def add_inventory_parser(subparsers):
+    """The parser for sub command 'inventory'."""
+    inventory_parser = subparsers.add_parser(
+        "inventory", help='Snapshot of the projects and GKE clusters of \
+envs, used by the commands targeting them instead of crawling the envs')
+    inventory_parser.set_defaults(parser=inventory_parser)
+    inventory_subparsers = inventory_parser.add_subparsers(
+        dest='inventory_subparser')
+
+    # Refresh
+    refresh_parser = inventory_subparsers.add_parser("refresh")
+    refresh_parser.set_defaults(func=inventory_refresh_main,
+                                parser=refresh_parser)
+    refresh_parser.add_argument('-e', '--env-type', nargs='+',
+                                dest="env_types", required=True,
+                                help='Env names from config file')
+    refresh_parser.add_argument(
+        '-r', '--recursive', action='store_true', dest="recursive",
+        help='Include projects of sub-folders at any depth')
+    refresh_parser.add_argument(
+        '--parallelism', type=int, default=DEFAULT_PARALLELISM,
+        dest="parallelism", help='Maximum number of concurrent API calls')
+    add_cache_arguments(refresh_parser)
+    add_backend_arguments(refresh_parser)
+
+    # Sync
+    sync_parser = inventory_subparsers.add_parser(
+        "sync", help='Update the snapshot with what changed since it was \
+stored, and print the added, removed and changed projects and clusters')
+    # A sync reports what changed since the last one, so it never reads
+    # cached listings. What it lists still refreshes the listings cache.
+    sync_parser.set_defaults(func=inventory_sync_main, parser=sync_parser,
+                             use_cache=True, refresh=True)
+    sync_parser.add_argument('-e', '--env-type', nargs='+',
+                             dest="env_types", required=True,
+                             help='Env names from config file')
+    sync_parser.add_argument(
+        '-r', '--recursive', action='store_true', dest="recursive",
+        help='Include projects of sub-folders at any depth')
+    sync_parser.add_argument(
+        '--parallelism', type=int, default=DEFAULT_PARALLELISM,
+        dest="parallelism", help='Maximum number of concurrent API calls')
+    sync_parser.add_argument(
+        '--clusters-max-age', type=float, default=DEFAULT_CLUSTERS_MAX_AGE,
+        dest="clusters_max_age",
+        help='Seconds after which the clusters of a project are listed \
+again, even though the project did not change')
+    add_backend_arguments(sync_parser)
+    add_output_arguments(sync_parser)
+
+    # List
+    list_parser = inventory_subparsers.add_parser("list")
+    list_parser.set_defaults(func=inventory_list_main, parser=list_parser)
+    add_output_arguments(list_parser)
+
+
+# pylint: disable=import-outside-toplevel
+def inventory_refresh_main(args):
+    """Inventory refresh main entry."""
+    from gcpctl.config import Config
+    from gcpctl.inventory.manager import InventoryManager
+    inventory_manager = InventoryManager(
+        env_folder_ids={env: Config.get_folder_ids([env])
+                        for env in args.env_types},
+        recursive=args.recursive, backend=get_discovery_backend(args))
+    if not inventory_manager.refresh():
+        return 1
+    return 0
+
+
+def inventory_sync_main(args):
+    """Inventory sync main entry."""
+    from gcpctl.config import Config
+    from gcpctl.inventory.manager import InventoryManager
+    inventory_manager = InventoryManager(
+        env_folder_ids={env: Config.get_folder_ids([env])
+                        for env in args.env_types},
+        recursive=args.recursive, backend=get_discovery_backend(args))
+    try:
+        if not inventory_manager.sync(
+                clusters_max_age=args.clusters_max_age,
+                **get_output_options(args)):
+            return 1
+    except UnknownColumns as ex:
+        LOG.error("%s%s%s", BCOLORS['RED'], ex.message, BCOLORS['ENDC'])
+        sys.exit(2)
+    return 0
+
+
+def inventory_list_main(args):
+    """Inventory list main entry."""
+    from gcpctl.inventory.manager import InventoryManager
+    try:
+        InventoryManager().list(**get_output_options(args))
+    except UnknownColumns as ex:
+        LOG.error("%s%s%s", BCOLORS['RED'], ex.message, BCOLORS['ENDC'])
+        sys.exit(2)
@@ -13,15 +13,29 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 import argparse
+import contextlib
 import logging
 import sys
 
+from gcpctl.api_caller import (DEFAULT_MAX_ATTEMPTS, DEFAULT_RATE,
+                               api_callers_configured, configure_api_callers)
+from gcpctl.client_factory import (DEFAULT_CHANNEL_POOL_SIZE,
+                                   DEFAULT_KEEPALIVE, ClientFactory,
+                                   get_client_factory, set_client_factory)
 import gcpctl.cli.get as get_parser
 import gcpctl.cli.pod_exec as pod_exec_parser
 import gcpctl.cli.cluster_exec as cluster_exec_parser
+import gcpctl.cli.inventory as inventory_parser
+import gcpctl.cli.serve as serve_parser
+import gcpctl.cli.shell as shell_parser
+from gcpctl.utils.colors import BCOLORS
 
 LOG = logging.getLogger(__name__)
 
+# Options configuring the clients and API callers of the whole process
+GLOBAL_OPTIONS = ('channel_pool_size', 'keepalive', 'api_rate',
+                  'api_attempts')
+
 
 def create_parser():
     """Returns argument parser"""
@@ -33,10 +47,29 @@ def create_parser():
 
     parser.add_argument('--debug', '-d', action='store_true',
                         dest="debug", help='Turn on debug')
+    parser.add_argument('--channel-pool-size', type=int,
+                        default=DEFAULT_CHANNEL_POOL_SIZE,
+                        dest="channel_pool_size",
+                        help='Number of gRPC connections per GCP API')
+    parser.add_argument('--keepalive', type=int, default=DEFAULT_KEEPALIVE,
+                        dest="keepalive",
+                        help='Seconds between keepalive pings of idle gRPC \
+connections, 0 to disable them')
+    parser.add_argument('--api-rate', type=float, default=DEFAULT_RATE,
+                        dest="api_rate",
+                        help='Maximum requests per second to every GCP API, \
+0 for no limit')
+    parser.add_argument('--api-attempts', type=int,
+                        default=DEFAULT_MAX_ATTEMPTS, dest="api_attempts",
+                        help='Attempts of every GCP API request which is \
+throttled or fails transiently')
 
     get_parser.add_get_parser(subparsers)
     pod_exec_parser.add_pod_exec_parser(subparsers)
     cluster_exec_parser.add_cluster_exec_parser(subparsers)
+    inventory_parser.add_inventory_parser(subparsers)
+    serve_parser.add_serve_parser(subparsers)
+    shell_parser.add_shell_parser(subparsers)
 
     return parser
 
@@ -59,11 +92,86 @@ def main():
     parser = create_parser()
     args = parser.parse_args()
     setup_logging(args.debug)
+    set_client_factory(ClientFactory(pool_size=args.channel_pool_size,
+                                     keepalive=args.keepalive))
+    configure_api_callers(rate=args.api_rate, max_attempts=args.api_attempts)
+    return run(args)
+
+
+def create_session_parser(args):
+    """Returns the parser of the commands of a shell or serve session
+    started with the parsed arguments. The global options the commands
+    don't give, e.g. --api-rate, are the session's."""
+    parser = create_parser()
+    parser.set_defaults(**{name: getattr(args, name)
+                           for name in GLOBAL_OPTIONS})
+    return parser
+
 
+@contextlib.contextmanager
+def global_options(parser, args):
+    """Applies the global options of a command of a session, e.g.
+    --api-rate, while it runs. The clients and API callers of the session
+    are kept for the next commands, and used by this one too unless it
+    gives other options than the session's.
+    :param parser: Parser returned by create_session_parser.
+    """
+    if all(getattr(args, name) == parser.get_default(name)
+           for name in GLOBAL_OPTIONS):
+        yield
+        return
+    factory = get_client_factory()
+    set_client_factory(ClientFactory(pool_size=args.channel_pool_size,
+                                     keepalive=args.keepalive))
+    try:
+        with api_callers_configured(rate=args.api_rate,
+                                    max_attempts=args.api_attempts):
+            yield
+    finally:
+        set_client_factory(factory)
+
+
+def run(args):
+    """Runs the sub-command of the parsed arguments."""
     if hasattr(args, 'func'):
-        args.func(args)
-    else:
-        args.parser.print_help()
+        return args.func(args)
+    args.parser.print_help()
+    return None
+
+
+def run_command(parser, argv) -> int:
+    """Runs a command line in this process, the way a shell or serve
+    session runs every command it gets. Failures of the command are
+    reported rather than raised, so the session goes on.
+    :param parser: Parser returned by create_session_parser.
+    :param argv: The command line arguments, without the program name.
+    :return: The exit code of the command.
+    """
+    try:
+        args = parser.parse_args(argv)
+        logging.getLogger().setLevel(
+            logging.DEBUG if args.debug else logging.INFO)
+        if args.main_subparser in ('serve', 'shell'):
+            LOG.error("%sAlready in a gcpctl session%s", BCOLORS['RED'],
+                      BCOLORS['ENDC'])
+            return 2
+        with global_options(parser, args):
+            code = run(args)
+    except SystemExit as ex:
+        code = ex.code
+    except KeyboardInterrupt:
+        return 130
+    except Exception as ex:  # pylint: disable=broad-except
+        LOG.debug("Command failed", exc_info=True)
+        LOG.error("%s%s%s", BCOLORS['RED'], ex, BCOLORS['ENDC'])
+        return 1
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    # sys.exit was given a message
+    print(code, file=sys.stderr)
+    return 1
 
 
 if __name__ == '__main__':
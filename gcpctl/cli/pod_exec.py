@@ -13,10 +13,14 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 import logging
+import sys
 
-from gcpctl.config import Config
-from gcpctl.projects.manager import ProjectManager
-from gcpctl.gke_clusters.manager import GKEManager
+from gcpctl.cli.utils import (add_backend_arguments, add_cache_arguments,
+                              add_inventory_arguments, get_gke_manager)
+from gcpctl.utils.colors import BCOLORS
+from gcpctl.utils.concurrency import DEFAULT_PARALLELISM
+from gcpctl.utils.executor import (DEFAULT_EXEC_PARALLELISM,
+                                   DEFAULT_GROUP_PARALLELISM)
 
 LOG = logging.getLogger(__name__)
 
@@ -29,26 +33,82 @@ def add_pod_exec_parser(subparsers):
     pod_exec_parser.add_argument('-cl', '--clusters', '--cluster',
                                  dest="clusters", nargs='+')
     pod_exec_parser.add_argument('-c', '--commands', '--command',
-                                 dest="commands", nargs='+')
-    pod_exec_parser.add_argument('-po', '--pods', dest="pods")
+                                 dest="commands", nargs='+', required=True)
+    pod_exec_parser.add_argument('-po', '--pods', dest="pods", nargs='+')
     pod_exec_parser.add_argument('-pr', '--pods-regex', dest="pods_regex")
+    pod_exec_parser.add_argument('-n', '--namespace', '--namespaces',
+                                 dest="namespaces", nargs='+',
+                                 help='Namespaces of the pods')
+    pod_exec_parser.add_argument('-l', '--selector', dest="label_selector",
+                                 help='Label selector of the pods, e.g. \
+app=api,tier!=cache')
+    pod_exec_parser.add_argument('--phase', '--phases', dest="phases",
+                                 nargs='+',
+                                 help='Phases of the pods, e.g. Running')
+    pod_exec_parser.add_argument('--one-per-owner', action='store_true',
+                                 dest="one_per_owner",
+                                 help='Only one pod of every workload, \
+e.g. Deployment, preferably a Running one')
+    pod_exec_parser.add_argument('--sample', type=int, dest="sample",
+                                 help='Number of the selected pods of every \
+cluster to pick at random, spread over their workloads')
+    pod_exec_parser.add_argument('--seed', type=int, dest="seed",
+                                 help='Seed of --sample, for the same pick \
+every time')
     pod_exec_parser.add_argument('-p', '--project', '--projects',
                                  dest="project_ids", nargs='+', default=[])
     pod_exec_parser.add_argument('-e', '--env-type', nargs='+',
                                  dest="env_types",
                                  help='Env names from config file')
+    pod_exec_parser.add_argument('--parallelism', type=int,
+                                 default=DEFAULT_PARALLELISM,
+                                 dest="parallelism",
+                                 help='Maximum number of concurrent API calls')
+    pod_exec_parser.add_argument('-r', '--recursive', action='store_true',
+                                 dest="recursive",
+                                 help='Include projects of sub-folders')
+    pod_exec_parser.add_argument('--exec-parallelism', type=int,
+                                 default=DEFAULT_EXEC_PARALLELISM,
+                                 dest="exec_parallelism",
+                                 help='Maximum number of concurrent execs')
+    pod_exec_parser.add_argument('--cluster-parallelism', type=int,
+                                 default=DEFAULT_GROUP_PARALLELISM,
+                                 dest="cluster_parallelism",
+                                 help='Maximum number of concurrent execs \
+in a single cluster')
+    add_cache_arguments(pod_exec_parser)
+    add_inventory_arguments(pod_exec_parser)
+    add_backend_arguments(pod_exec_parser)
 
 
 def pod_exec_main(args):
     """Main entry for sub-command pod-exec."""
-    if args.env_types:
-        project_manager = ProjectManager(
-            folder_ids=Config.get_folder_ids(args.env_types))
-        args.project_ids.extend([project.project_id for project in
-                                 project_manager.get_projects()])
-    gke_manager = GKEManager()
-    for project_id in args.project_ids:
-        gke_manager.load_clusters(clusters=args.clusters,
-                                  project=project_id)
-    gke_manager.pod_exec(commands=args.commands, pods=args.pods,
-                         pods_regex=args.pods_regex)
+    # pylint: disable=import-outside-toplevel
+    from gcpctl.exceptions.kubernetes import InvalidSelector
+    from gcpctl.kubernetes.pods import PodSelector, parse_label_selector
+    from gcpctl.kubernetes.pool import get_client_pool
+    selector = PodSelector(
+        names=args.pods, name_regex=args.pods_regex,
+        namespaces=args.namespaces, label_selector=args.label_selector,
+        phases=args.phases, one_per_owner=args.one_per_owner,
+        sample=args.sample, seed=args.seed)
+    # Executing in every pod of every cluster is rarely intended
+    if selector == PodSelector(seed=args.seed):
+        args.parser.error("one of --pods, --pods-regex, --namespace, "
+                          "--selector, --phase, --one-per-owner or --sample "
+                          "is required")
+    if args.label_selector:
+        try:
+            parse_label_selector(args.label_selector)
+        except InvalidSelector as ex:
+            LOG.error("%s%s%s", BCOLORS['RED'], ex.message, BCOLORS['ENDC'])
+            sys.exit(2)
+    gke_manager = get_gke_manager(
+        args,
+        client_pool=get_client_pool(pool_maxsize=args.cluster_parallelism))
+    if not gke_manager.pod_exec(
+            commands=args.commands, selector=selector,
+            parallelism=args.exec_parallelism,
+            cluster_parallelism=args.cluster_parallelism):
+        return 1
+    return 0
@@ -0,0 +1,290 @@
+"""app serve sub-command parser and entry point"""
+# Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import contextlib
+import io
+import json
+import logging
+import os
+import select
+import signal
+import socket
+import sys
+import threading
+import time
+
+from gcpctl.cli.daemon import (EXIT, LOCAL, REQUEST, SOCKET_PATH, STDERR,
+                               STDOUT, get_identity_env, recv_frame,
+                               send_frame)
+from gcpctl.utils.colors import BCOLORS
+
+LOG = logging.getLogger(__name__)
+
+# Output is sent to the client in frames of up to this many characters
+FRAME_SIZE = 1 << 16
+
+
+def add_serve_parser(subparsers):
+    """The parser for sub command 'serve'."""
+    serve_parser = subparsers.add_parser(
+        "serve", help='Run a daemon that runs the commands of other gcpctl \
+invocations, keeping clients and caches warm between them')
+    serve_parser.set_defaults(parser=serve_parser, func=serve_main)
+    serve_parser.add_argument('--socket', default=SOCKET_PATH, dest="socket",
+                              help='Path of the Unix socket to listen on')
+
+
+def serve_main(args):
+    """Main entry for sub-command serve."""
+    # pylint: disable=import-outside-toplevel
+    from gcpctl.cli.main import create_session_parser
+    from gcpctl.kubernetes.informer import enable_pod_informers
+    # Commands of the session select pods from memory
+    enable_pod_informers()
+    CommandServer(args.socket, create_session_parser(args)).serve_forever()
+
+
+class FrameWriter(io.TextIOBase):
+    """Text stream which sends what is written to it to the client, as
+    frames of a channel. Writes are buffered up to FRAME_SIZE characters or,
+    when the client's stdout is a terminal, up to the end of a line. Once the
+    client is gone, on_error is called and what is written is dropped.
+    """
+
+    def __init__(self, sock, channel, isatty=False, on_error=None) -> None:
+        super().__init__()
+        self.sock = sock
+        self.channel = channel
+        self.broken = False
+        self._isatty = isatty
+        self._on_error = on_error
+        self._buffer = []
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @property
+    def encoding(self):
+        """The encoding of the text sent to the client."""
+        return 'utf-8'
+
+    def isatty(self) -> bool:
+        return self._isatty
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text) -> int:
+        with self._lock:
+            self._buffer.append(text)
+            self._size += len(text)
+            if self._size >= FRAME_SIZE or (self._isatty and '\n' in text):
+                self._send()
+        return len(text)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._send()
+
+    def _send(self) -> None:
+        if self._buffer and not self.broken:
+            payload = ''.join(self._buffer).encode('utf-8')
+            try:
+                send_frame(self.sock, self.channel, payload)
+            except OSError as ex:
+                LOG.debug("Failed to send output: %s", ex)
+                self.broken = True
+                if self._on_error:
+                    self._on_error()
+        self._buffer = []
+        self._size = 0
+
+
+class CommandServer():
+    """Runs the commands forwarded by thin gcpctl invocations in this
+    process, so the GCP clients, the Kubernetes clients and the listings
+    caches stay warm between them. Commands are run one at a time, as they
+    share the process' stdout, stderr and working directory. A command is
+    interrupted, as with Ctrl-C, when its client goes away.
+    """
+
+    def __init__(self, path, parser) -> None:
+        """Constructor.
+        :param path: Path of the Unix socket to listen on.
+        :param parser: Parser returned by create_session_parser.
+        """
+        self.path = path
+        self.parser = parser
+        self._lock = threading.Lock()
+        self._running = False
+        self._aborted = False
+        # Whether an interrupt reaches the running command
+        self._interruptible = False
+
+    def _remove_stale_socket(self) -> None:
+        """Removes the socket left by a daemon which is gone. Exits if a
+        daemon is still listening on it."""
+        if not os.path.exists(self.path):
+            return
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            try:
+                sock.connect(self.path)
+            except OSError:
+                os.remove(self.path)
+                return
+        LOG.error("%sA daemon is already listening on %s%s",
+                  BCOLORS['RED'], self.path, BCOLORS['ENDC'])
+        sys.exit(2)
+
+    def serve_forever(self) -> None:
+        """Accepts and runs commands until interrupted."""
+        self._remove_stale_socket()
+        os.makedirs(os.path.dirname(self.path), mode=0o700, exist_ok=True)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # Only the user may connect and run commands
+        umask = os.umask(0o177)
+        try:
+            server.bind(self.path)
+        finally:
+            os.umask(umask)
+        server.listen()
+        LOG.info("Serving on %s", self.path)
+        try:
+            with server:
+                while True:
+                    conn, _ = server.accept()
+                    with conn:
+                        self.handle(conn)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self.path)
+
+    def handle(self, conn) -> None:
+        """Runs the command of a single connection."""
+        try:
+            channel, payload = recv_frame(conn)
+        except ConnectionError:
+            return
+        if channel != REQUEST:
+            return
+        request = json.loads(payload)
+        if request.get('env', {}) != get_identity_env():
+            LOG.debug("Client of %s uses other credentials or clusters, "
+                      "it runs the command itself", request['argv'])
+            send_frame(conn, LOCAL, b'')
+            return
+        isatty = request.get('isatty', False)
+        stdout = FrameWriter(conn, STDOUT, isatty=isatty, on_error=self._abort)
+        stderr = FrameWriter(conn, STDERR, isatty=isatty, on_error=self._abort)
+        self._running, self._aborted = True, False
+        # Written to once the command is done, to stop the watcher
+        done_reader, done_writer = socket.socketpair()
+        watcher = threading.Thread(target=self._watch,
+                                   args=(conn, done_reader), daemon=True)
+        previous_handler = signal.signal(signal.SIGINT, self._on_interrupt)
+        start = time.perf_counter()
+        try:
+            watcher.start()
+            try:
+                code = self._run(request, stdout, stderr)
+            finally:
+                with self._lock:
+                    self._running = False
+                done_writer.send(b'x')
+                watcher.join()
+            stdout.flush()
+            stderr.flush()
+            if not (stdout.broken or stderr.broken):
+                send_frame(conn, EXIT, str(code).encode('utf-8'))
+        except KeyboardInterrupt:
+            # Interrupts of aborted commands may land once they are done
+            if not self._aborted:
+                raise
+        except OSError as ex:
+            LOG.debug("Client of %s went away: %s", request['argv'], ex)
+        finally:
+            self._interruptible = False
+            signal.signal(signal.SIGINT, previous_handler)
+            done_reader.close()
+            done_writer.close()
+        if self._aborted:
+            LOG.debug("Client of %s went away, aborted it", request['argv'])
+        LOG.debug("Ran %s in %.3f seconds", request['argv'],
+                  time.perf_counter() - start)
+
+    def _watch(self, conn, done) -> None:
+        """Aborts the running command when its client closes the
+        connection, as clients send nothing after their request. Returns
+        once done is readable."""
+        readable, _, _ = select.select([conn, done], [], [])
+        if conn not in readable:
+            return
+        try:
+            closed = not conn.recv(1, socket.MSG_PEEK)
+        except OSError:
+            closed = True
+        if closed:
+            self._abort()
+
+    def _on_interrupt(self, signum, frame) -> None:
+        """Interrupts the command, only while it runs, so restoring the
+        state of the process after it isn't interrupted."""
+        # pylint: disable=unused-argument
+        if self._interruptible:
+            raise KeyboardInterrupt
+
+    def _abort(self) -> None:
+        """Interrupts the running command, once."""
+        with self._lock:
+            if self._running and not self._aborted:
+                self._aborted = True
+                # A signal, unlike interrupt_main, also wakes up blocking
+                # calls such as the ones waiting on an API
+                signal.pthread_kill(threading.main_thread().ident,
+                                    signal.SIGINT)
+
+    def _run(self, request, stdout, stderr) -> int:
+        """Runs the command with stdout, stderr and the logs sent to the
+        client, from the client's working directory."""
+        # pylint: disable=import-outside-toplevel
+        from gcpctl.cli.main import run_command
+        root = logging.getLogger()
+        level = root.level
+        handlers = [(handler, handler.stream) for handler in root.handlers
+                    if isinstance(handler, logging.StreamHandler)]
+        stdin = sys.stdin
+        cwd = os.getcwd()
+        try:
+            for handler, _ in handlers:
+                handler.setStream(stderr)
+            # Commands can't prompt, input() fails right away
+            sys.stdin = io.StringIO()
+            os.chdir(request['cwd'])
+            with contextlib.redirect_stdout(stdout), \
+                    contextlib.redirect_stderr(stderr):
+                with self._lock:
+                    if self._aborted:
+                        return 130
+                    self._interruptible = True
+                try:
+                    return run_command(self.parser, request['argv'])
+                finally:
+                    self._interruptible = False
+        finally:
+            os.chdir(cwd)
+            sys.stdin = stdin
+            for handler, stream in handlers:
+                handler.setStream(stream)
+            root.setLevel(level)
@@ -0,0 +1,66 @@
+"""app shell sub-command parser and entry point"""
+# Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import logging
+import shlex
+
+from gcpctl.utils.colors import BCOLORS
+
+LOG = logging.getLogger(__name__)
+
+PROMPT = "gcpctl> "
+EXIT_COMMANDS = ('exit', 'quit')
+
+
+def add_shell_parser(subparsers):
+    """The parser for sub command 'shell'."""
+    shell_parser = subparsers.add_parser(
+        "shell", help='Run commands interactively, keeping clients and \
+caches warm between them')
+    shell_parser.set_defaults(parser=shell_parser, func=shell_main)
+
+
+def shell_main(args):
+    """Main entry for sub-command shell."""
+    # pylint: disable=import-outside-toplevel
+    from gcpctl.cli.main import create_session_parser, run_command
+    from gcpctl.kubernetes.informer import enable_pod_informers
+    try:
+        # Line editing and history for input(), where available
+        import readline  # noqa: F401 pylint: disable=unused-import
+    except ImportError:
+        pass
+    parser = create_session_parser(args)
+    # Commands of the session select pods from memory
+    enable_pod_informers()
+    while True:
+        try:
+            line = input(PROMPT).strip()
+        except EOFError:
+            print()
+            return 0
+        except KeyboardInterrupt:
+            print()
+            continue
+        if line in EXIT_COMMANDS:
+            return 0
+        try:
+            argv = shlex.split(line)
+        except ValueError as ex:
+            LOG.error("%s%s%s", BCOLORS['RED'], ex, BCOLORS['ENDC'])
+            continue
+        if argv and argv[0] in ('gcpctl', 'gcp'):
+            argv = argv[1:]
+        if argv:
+            run_command(parser, argv)
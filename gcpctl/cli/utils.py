@@ -12,6 +12,25 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import logging
+import sys
+
+from gcpctl.client_factory import get_client_factory
+from gcpctl.discovery.backend import BACKENDS, get_backend
+from gcpctl.exceptions.discovery import BackendNotAvailable
+from gcpctl.inventory.snapshot import DEFAULT_MAX_AGE
+from gcpctl.printer import DEFAULT_LOOKAHEAD, OUTPUT_FORMATS
+from gcpctl.utils.cache import ListingCache, MemoryLayer
+from gcpctl.utils.colors import BCOLORS
+
+LOG = logging.getLogger(__name__)
+
+# Listings caches by (enabled, refresh, account), shared by the commands of
+# a shell or serve session so they keep their entries in memory. They share
+# a single memory layer, so what --refresh lists is what the other commands
+# get.
+_CACHES = {}
+_MEMORY = MemoryLayer()
 
 
 def ask_yes_no_question(question: str) -> bool:
@@ -31,3 +50,109 @@ def ask_yes_no_question(question: str) -> bool:
             answer = 'n'
 
     return answer == 'y'
+
+
+def add_cache_arguments(parser) -> None:
+    """Adds the arguments controlling the listings cache to a parser."""
+    parser.add_argument('--refresh', action='store_true', dest="refresh",
+                        help='Ignore cached listings and refresh them')
+    parser.add_argument('--no-cache', action='store_false', dest="use_cache",
+                        help='Neither read nor write cached listings')
+
+
+def get_cache(args) -> ListingCache:
+    """Returns the listings cache matching the parsed arguments."""
+    account = get_client_factory().account if args.use_cache else ''
+    key = (args.use_cache, args.refresh, account)
+    if key not in _CACHES:
+        _CACHES[key] = ListingCache(enabled=args.use_cache,
+                                    refresh=args.refresh, memory=_MEMORY,
+                                    account=account)
+    return _CACHES[key]
+
+
+def add_backend_arguments(parser) -> None:
+    """Adds the argument selecting the discovery backend to a parser."""
+    parser.add_argument('--backend', choices=BACKENDS, default='crawl',
+                        dest="backend",
+                        help='How to discover projects and clusters: crawl \
+the folders hierarchy or use Cloud Asset Inventory search')
+
+
+def get_discovery_backend(args):
+    """Returns the discovery backend matching the parsed arguments."""
+    try:
+        return get_backend(args.backend, parallelism=args.parallelism,
+                           cache=get_cache(args))
+    except BackendNotAvailable as ex:
+        LOG.error("%s%s%s", BCOLORS['RED'], ex.message, BCOLORS['ENDC'])
+        sys.exit(2)
+
+
+def add_inventory_arguments(parser) -> None:
+    """Adds the argument controlling the use of the inventory snapshot to a
+    parser."""
+    parser.add_argument('--max-age', type=float, default=DEFAULT_MAX_AGE,
+                        dest="max_age",
+                        help='Use the inventory snapshot of an env if it \
+was refreshed at most this many seconds ago, 0 to always crawl the env')
+
+
+def resolve_envs(args):
+    """Returns the GKE clusters of the envs of the parsed arguments whose
+    inventory snapshot is fresh, and the folder IDs of the envs which have
+    to be crawled. Snapshots aren't used with --refresh or --no-cache.
+    :return: (clusters, folder IDs) tuple.
+    """
+    # pylint: disable=import-outside-toplevel
+    from gcpctl.config import Config
+    from gcpctl.inventory.manager import InventoryManager
+    env_folder_ids = {env: Config.get_folder_ids([env])
+                      for env in args.env_types or []}
+    max_age = 0 if args.refresh or not args.use_cache else args.max_age
+    return InventoryManager(env_folder_ids, recursive=args.recursive)\
+        .get_clusters(max_age=max_age)
+
+
+def get_gke_manager(args, **kwargs):
+    """Returns a GKEManager holding the GKE clusters targeted by the parsed
+    arguments. The discovery backend is created only if some projects or
+    envs have to be crawled.
+    :param kwargs: Passed to GKEManager's constructor.
+    """
+    # pylint: disable=import-outside-toplevel
+    from gcpctl.gke_clusters.manager import GKEManager
+    clusters, folder_ids = resolve_envs(args)
+    crawl = bool(args.project_ids or folder_ids)
+    gke_manager = GKEManager(
+        recursive=args.recursive,
+        clusters=[cluster for cluster in clusters
+                  if not args.clusters or cluster.name in args.clusters],
+        backend=get_discovery_backend(args) if crawl else None, **kwargs)
+    if crawl:
+        gke_manager.load_clusters(projects=args.project_ids,
+                                  folder_ids=folder_ids,
+                                  clusters=args.clusters)
+    return gke_manager
+
+
+def add_output_arguments(parser) -> None:
+    """Adds the arguments controlling the printed rows to a parser."""
+    parser.add_argument('-o', '--output', choices=OUTPUT_FORMATS,
+                        default='table', dest="output",
+                        help='Format of the printed rows')
+    parser.add_argument('--columns', type=lambda value: value.split(','),
+                        dest="columns",
+                        help='Comma separated columns to print, e.g. \
+project_id,parent')
+    parser.add_argument('--lookahead', type=int, default=DEFAULT_LOOKAHEAD,
+                        dest="lookahead",
+                        help='Number of rows the table columns are sized \
+from, 0 to size them from all the rows')
+
+
+def get_output_options(args) -> dict:
+    """Returns the Printer.print_table options matching the parsed
+    arguments."""
+    return {'output': args.output, 'columns': args.columns,
+            'lookahead': args.lookahead}
@@ -0,0 +1,157 @@
+"""Creates the GCP API clients"""
+# Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import hashlib
+import logging
+import threading
+
+LOG = logging.getLogger(__name__)
+
+CLOUD_PLATFORM_SCOPE = "https://www.googleapis.com/auth/cloud-platform"
+# Number of gRPC channels, i.e. connections, per API endpoint
+DEFAULT_CHANNEL_POOL_SIZE = 1
+# Seconds between keepalive pings of idle connections, 0 to disable them
+DEFAULT_KEEPALIVE = 30
+# Seconds to wait for a keepalive ping to be acknowledged
+KEEPALIVE_TIMEOUT = 10
+
+_DEFAULT_FACTORY = None
+_DEFAULT_FACTORY_LOCK = threading.Lock()
+
+
+class ClientFactory():
+    """Creates GCP API clients which share credentials and gRPC channels.
+    The application default credentials are resolved once for all the
+    clients, and clients of services behind the same endpoint (e.g. folders
+    and projects) share their channels, so TLS handshakes and token fetches
+    aren't repeated for every client or command.
+    Every client class gets up to pool_size clients, each one on its own
+    channel, which are handed out round robin.
+    """
+
+    def __init__(self, credentials=None,
+                 pool_size=DEFAULT_CHANNEL_POOL_SIZE,
+                 keepalive=DEFAULT_KEEPALIVE) -> None:
+        """Constructor.
+        :param credentials: google.auth credentials. Defaults to the
+            application default credentials.
+        :param pool_size: Number of channels per API endpoint.
+        :param keepalive: Seconds between keepalive pings of idle channels,
+            0 to disable them.
+        """
+        self._credentials = credentials
+        self.pool_size = max(pool_size, 1)
+        self.keepalive = keepalive
+        self._channels = {}
+        self._clients = {}
+        self._next_index = {}
+        self._lock = threading.Lock()
+
+    @property
+    def credentials(self):
+        """The google.auth credentials, resolved on first use."""
+        with self._lock:
+            return self._get_credentials()
+
+    def _get_credentials(self):
+        if self._credentials is None:
+            # pylint: disable=import-outside-toplevel
+            import google.auth
+            self._credentials, _ = google.auth.default(
+                scopes=[CLOUD_PLATFORM_SCOPE])
+        return self._credentials
+
+    @property
+    def account(self) -> str:
+        """Identifies the account of the credentials: its email when the
+        credentials name it, else a digest of their refresh token, else
+        ''."""
+        credentials = self.credentials
+        for attribute in ('service_account_email', 'signer_email',
+                          'account'):
+            account = getattr(credentials, attribute, None)
+            # Credentials of the metadata server are 'default' until used
+            if isinstance(account, str) and account not in ('', 'default'):
+                return account
+        refresh_token = getattr(credentials, 'refresh_token', None)
+        if isinstance(refresh_token, str):
+            return hashlib.sha256(refresh_token.encode('utf-8')).hexdigest()
+        return ''
+
+    def get_channel_options(self) -> list:
+        """Returns the options the gRPC channels are created with."""
+        # Same as the ones of the channels the clients create themselves
+        options = [('grpc.max_send_message_length', -1),
+                   ('grpc.max_receive_message_length', -1)]
+        if self.keepalive:
+            options.extend([
+                ('grpc.keepalive_time_ms', self.keepalive * 1000),
+                ('grpc.keepalive_timeout_ms', KEEPALIVE_TIMEOUT * 1000),
+                ('grpc.keepalive_permit_without_calls', 1)])
+        if self.pool_size > 1:
+            # Otherwise channels with the same options share a connection
+            options.append(('grpc.use_local_subchannel_pool', 1))
+        return options
+
+    def _get_channel(self, transport_class, host, index):
+        key = (host, index)
+        if key not in self._channels:
+            LOG.debug("Opening channel %d to %s", index, host)
+            self._channels[key] = transport_class.create_channel(
+                host, credentials=self._get_credentials(),
+                options=self.get_channel_options())
+        return self._channels[key]
+
+    def get(self, client_class):
+        """Returns a client of the given class, creating it if needed.
+        Clients are thread safe and may be used concurrently.
+        :param client_class: A GCP gRPC client class, e.g.
+            resourcemanager_v3.FoldersClient.
+        """
+        with self._lock:
+            index = self._next_index.get(client_class, 0)
+            self._next_index[client_class] = (index + 1) % self.pool_size
+            key = (client_class, index)
+            if key not in self._clients:
+                transport_class = client_class.get_transport_class('grpc')
+                host = f"{client_class.DEFAULT_ENDPOINT}:443"
+                channel = self._get_channel(transport_class, host, index)
+                self._clients[key] = client_class(
+                    transport=transport_class(host=host, channel=channel))
+            return self._clients[key]
+
+    def close(self) -> None:
+        """Closes all the channels. Clients obtained so far can't be used
+        anymore."""
+        with self._lock:
+            for channel in self._channels.values():
+                channel.close()
+            self._channels = {}
+            self._clients = {}
+
+
+def get_client_factory() -> ClientFactory:
+    """Returns the client factory shared by the whole process."""
+    global _DEFAULT_FACTORY  # pylint: disable=global-statement
+    with _DEFAULT_FACTORY_LOCK:
+        if _DEFAULT_FACTORY is None:
+            _DEFAULT_FACTORY = ClientFactory()
+        return _DEFAULT_FACTORY
+
+
+def set_client_factory(factory: ClientFactory) -> None:
+    """Replaces the client factory shared by the whole process."""
+    global _DEFAULT_FACTORY  # pylint: disable=global-statement
+    with _DEFAULT_FACTORY_LOCK:
+        _DEFAULT_FACTORY = factory
@@ -31,6 +31,11 @@ SYSTEM_CONF_PATH = '/etc/gcpctl/gcpctl.yaml'
 
 LOG = logging.getLogger(__name__)
 
+# Default configuration files parsed by this process, by path, along with
+# their modification time, so a long running process (gcpctl shell or serve)
+# parses a file again only once it changed
+_LOADED = {}
+
 
 def _ask_user_for_overwrite() -> bool:
     """Prints a question on the command line asking whether the user would
@@ -177,13 +182,31 @@ class Config():
 
         return Config.from_file(dest)
 
+    @staticmethod
+    def load_default() -> 'Config':
+        """Returns the configuration of the first available definition
+        found between the default paths. The definition is parsed once and
+        reused until it is modified.
+        :return: The configuration instance
+        :raise ConfigurationNotFound: If no definition could be found.
+        """
+        paths = Config.DEFAULT_FILE_PATHS
+        file = get_first_available_file(paths)
+
+        if not file:
+            raise conf_exc.ConfigurationNotFound(paths)
+
+        mtime = os.stat(file).st_mtime_ns
+        if file not in _LOADED or _LOADED[file][0] != mtime:
+            _LOADED[file] = (mtime, Config(Config.from_file(file)))
+        return _LOADED[file][1]
+
     @staticmethod
     def get_folder_ids(env_types):
         """Return folder IDs of a given environment type."""
         folder_ids = []
         if env_types:
-            config = Config()
-            config.load()
+            config = Config.load_default()
             for env_type in env_types:
                 folder_ids.extend(
                     config.data.get('environments').get(env_type))
@@ -0,0 +1,79 @@
+"""Projects and GKE clusters discovery backends."""
+# Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+from abc import ABC, abstractmethod
+from typing import Iterator
+
+from gcpctl.client_factory import get_client_factory
+from gcpctl.utils.cache import ListingCache
+from gcpctl.utils.concurrency import DEFAULT_PARALLELISM
+
+BACKENDS = ('crawl', 'search')
+
+
+def format_time(value) -> str:
+    """Returns the ISO 8601 string of a timestamp of an API resource, or ''
+    if it is unset."""
+    return value.isoformat() if value else ""
+
+
+class DiscoveryBackend(ABC):
+    """Base class for the different ways of discovering the projects and the
+    GKE clusters under folders. Scopes (folders or projects) that failed to
+    be queried are recorded in self.errors instead of aborting the discovery.
+    """
+
+    def __init__(self, parallelism=DEFAULT_PARALLELISM, cache=None,
+                 client_factory=None) -> None:
+        self.parallelism = parallelism
+        self.cache = cache or ListingCache(enabled=False)
+        self.client_factory = client_factory or get_client_factory()
+        self.errors = {}
+
+    @abstractmethod
+    def get_projects(self, folder_ids, recursive=False) -> Iterator:
+        """Yields the projects under the given folders.
+        :param folder_ids: IDs of the folders to look for projects in.
+        :param recursive: Whether to include projects of sub-folders.
+        :return: Iterator over GCPProject instances.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_clusters(self, project_ids=None, folder_ids=None,
+                     recursive=False) -> Iterator:
+        """Yields the GKE clusters of the given projects and of the projects
+        under the given folders.
+        :param project_ids: IDs of projects to look for clusters in.
+        :param folder_ids: IDs of folders to look for clusters in.
+        :param recursive: Whether to include clusters of projects in
+            sub-folders.
+        :return: Iterator over GKECluster instances.
+        """
+        raise NotImplementedError
+
+
+def get_backend(name='crawl', **kwargs) -> DiscoveryBackend:
+    """Returns a discovery backend instance.
+    :param name: One of BACKENDS.
+    :param kwargs: Passed to the backend's constructor.
+    """
+    # pylint: disable=import-outside-toplevel
+    if name == 'search':
+        from gcpctl.discovery.search import SearchBackend
+        return SearchBackend(**kwargs)
+    if name == 'crawl':
+        from gcpctl.discovery.crawl import CrawlBackend
+        return CrawlBackend(**kwargs)
+    raise ValueError(f"Unknown discovery backend: {name}")
@@ -0,0 +1,114 @@
+"""Discovery by crawling the resource hierarchy."""
+# Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import logging
+from itertools import chain
+
+from google.cloud import container_v1
+from google.cloud import resourcemanager_v3
+
+from gcpctl.api_caller import get_api_caller
+from gcpctl.discovery.backend import DiscoveryBackend, format_time
+from gcpctl.folders.walker import PROJECT, FolderWalker
+from gcpctl.gke_clusters.cluster import GKECluster
+from gcpctl.projects.project import GCPProject
+from gcpctl.utils.concurrency import DEFAULT_PARALLELISM, fan_out
+
+LOG = logging.getLogger(__name__)
+
+
+class CrawlBackend(DiscoveryBackend):
+    """Discovers projects by listing the projects of every folder, and GKE
+    clusters by listing the clusters of every project. Finding the clusters
+    under a folder therefore takes 1 + P API calls, issued concurrently.
+    """
+
+    def __init__(self, parallelism=DEFAULT_PARALLELISM, cache=None,
+                 client_factory=None, folders_client=None,
+                 projects_client=None, clusters_client=None) -> None:
+        super().__init__(parallelism=parallelism, cache=cache,
+                         client_factory=client_factory)
+        self._folders_client = folders_client
+        self._projects_client = projects_client
+        self._clusters_client = clusters_client
+
+    # Unless given, clients come from the client factory on first use, a
+    # listing of projects never needs the clusters client for instance
+    @property
+    def folders_client(self):
+        """The folders client."""
+        return self._folders_client or self.client_factory.get(
+            resourcemanager_v3.FoldersClient)
+
+    @property
+    def projects_client(self):
+        """The projects client."""
+        return self._projects_client or self.client_factory.get(
+            resourcemanager_v3.ProjectsClient)
+
+    @property
+    def clusters_client(self):
+        """The clusters client. Every call may return another client of the
+        factory's pool."""
+        return self._clusters_client or self.client_factory.get(
+            container_v1.ClusterManagerClient)
+
+    def get_projects(self, folder_ids, recursive=False):
+        walker = FolderWalker(folders_client=self.folders_client,
+                              projects_client=self.projects_client,
+                              parallelism=self.parallelism,
+                              cache=self.cache, errors=self.errors)
+        max_depth = None if recursive else 0
+        for entry in walker.walk(folder_ids, max_depth=max_depth):
+            if entry.kind == PROJECT:
+                project = entry.resource
+                yield GCPProject(
+                    display_name=project.display_name, parent=project.parent,
+                    project_id=project.project_id, etag=project.etag,
+                    update_time=format_time(project.update_time))
+
+    def _list_project_clusters(self, project_id):
+        """Returns the GKE clusters of a single project."""
+        parent = f"projects/{project_id}/locations/-"
+        client = self.clusters_client
+        clusters = self.cache.fetch(
+            'clusters', 'list_clusters', parent,
+            lambda: get_api_caller(client).call(
+                client.list_clusters, parent=parent, retry=None).clusters,
+            message_class=container_v1.Cluster)
+        return [GKECluster(
+            name=cluster.name, project_id=project_id, zone=cluster.zone,
+            endpoint=cluster.endpoint,
+            ca_certificate=cluster.master_auth.cluster_ca_certificate,
+            etag=cluster.etag)
+            for cluster in clusters]
+
+    def get_clusters(self, project_ids=None, folder_ids=None,
+                     recursive=False):
+        """Projects are queried concurrently, as soon as the walk of the
+        folders finds them, but the clusters are returned in the same order
+        as the projects."""
+        project_ids = list(project_ids or [])
+        if folder_ids:
+            project_ids = chain(project_ids, (
+                project.project_id for project in
+                self.get_projects(folder_ids, recursive=recursive)))
+        for result in fan_out(self._list_project_clusters, project_ids,
+                              parallelism=self.parallelism):
+            if not result.ok:
+                LOG.debug("Failed to list clusters of %s: %s",
+                          result.item, result.error)
+                self.errors[f"projects/{result.item}"] = result.error
+                continue
+            yield from result.value
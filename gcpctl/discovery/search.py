@@ -0,0 +1,159 @@
+"""Discovery using Cloud Asset Inventory resource search."""
+# Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import logging
+
+from gcpctl.discovery.backend import DiscoveryBackend, format_time
+from gcpctl.exceptions.discovery import BackendNotAvailable
+from gcpctl.gke_clusters.cluster import GKECluster
+from gcpctl.projects.project import GCPProject
+from gcpctl.utils.concurrency import DEFAULT_PARALLELISM, fan_out_pages
+from gcpctl.utils.pagers import iter_pages
+
+LOG = logging.getLogger(__name__)
+
+PROJECT_ASSET_TYPE = "cloudresourcemanager.googleapis.com/Project"
+CLUSTER_ASSET_TYPE = "container.googleapis.com/Cluster"
+RESOURCE_MANAGER_PREFIX = "//cloudresourcemanager.googleapis.com/"
+DEFAULT_PAGE_SIZE = 500
+# Fields of the cluster search results: the resource itself isn't returned
+# by default, and holds the endpoint and CA certificate of the cluster
+CLUSTER_READ_MASK = ["name", "location", "updateTime", "versionedResources"]
+
+
+def _to_project(result) -> GCPProject:
+    """Converts a project ResourceSearchResult to GCPProject."""
+    return GCPProject(
+        display_name=result.display_name,
+        parent=result.parent_full_resource_name.replace(
+            RESOURCE_MANAGER_PREFIX, ""),
+        project_id=result.additional_attributes.get("projectId", ""),
+        update_time=format_time(result.update_time))
+
+
+def _get_resource(result):
+    """Returns the resource of a ResourceSearchResult, as its API returns
+    it (e.g. a container_v1 Cluster in JSON form), or an empty dict if the
+    search didn't return it."""
+    for versioned_resource in result.versioned_resources:
+        if versioned_resource.resource:
+            return versioned_resource.resource
+    return {}
+
+
+def _to_cluster(result) -> GKECluster:
+    """Converts a cluster ResourceSearchResult to GKECluster. The name of
+    the result is in the form of
+    //container.googleapis.com/projects/P/locations/L/clusters/C
+    """
+    parts = result.name.split("/")
+    resource = _get_resource(result)
+    cluster = GKECluster(
+        name=parts[-1], project_id=parts[parts.index("projects") + 1],
+        zone=result.location,
+        endpoint=resource.get("endpoint", ""),
+        ca_certificate=resource.get("masterAuth", {}).get(
+            "clusterCaCertificate", ""),
+        update_time=format_time(result.update_time))
+    if not cluster.endpoint:
+        LOG.debug("Search returned no endpoint of %s, its credentials will "
+                  "come from the kubeconfig or gcloud", result.name)
+    return cluster
+
+
+class SearchBackend(DiscoveryBackend):
+    """Discovers projects and GKE clusters with Cloud Asset Inventory
+    resource search. All the projects or all the clusters under a folder are
+    found with a single paginated search query, instead of crawling the
+    hierarchy. Requires the google-cloud-asset package.
+    """
+
+    def __init__(self, parallelism=DEFAULT_PARALLELISM, cache=None,
+                 client_factory=None, client=None,
+                 page_size=DEFAULT_PAGE_SIZE) -> None:
+        super().__init__(parallelism=parallelism, cache=cache,
+                         client_factory=client_factory)
+        if client is None:
+            try:
+                # pylint: disable=import-outside-toplevel
+                from google.cloud import asset_v1
+            except ImportError as ex:
+                raise BackendNotAvailable(
+                    'search', "install the google-cloud-asset package") \
+                    from ex
+            self.client_class = asset_v1.AssetServiceClient
+        self._client = client
+        self.page_size = page_size
+
+    @property
+    def client(self):
+        """The asset service client. Unless given, it comes from the client
+        factory on first use."""
+        return self._client or self.client_factory.get(self.client_class)
+
+    def _search(self, scope, asset_type, convert):
+        """Yields pages of the resources of the given type under scope."""
+        request = {"scope": scope, "asset_types": [asset_type],
+                   "page_size": self.page_size}
+        if asset_type == CLUSTER_ASSET_TYPE:
+            request["read_mask"] = {"paths": CLUSTER_READ_MASK}
+
+        def search():
+            for page in iter_pages(self.client.search_all_resources,
+                                   request, 'results'):
+                yield [convert(result) for result in page]
+
+        return self.cache.fetch_pages(
+            'projects' if asset_type == PROJECT_ASSET_TYPE else 'clusters',
+            'search_all_resources', f"{scope}/{asset_type}", search)
+
+    def _search_scopes(self, scopes, asset_type, convert):
+        """Yields the resources of the given type under each one of the
+        scopes, querying the scopes concurrently. Resources are yielded as
+        soon as the page holding them arrives."""
+        for result in fan_out_pages(
+                lambda scope: self._search(scope, asset_type, convert),
+                scopes, parallelism=self.parallelism):
+            if not result.ok:
+                LOG.debug("Failed to search %s: %s", result.item,
+                          result.error)
+                self.errors[result.item] = result.error
+                continue
+            yield from result.value
+
+    def get_projects(self, folder_ids, recursive=False):
+        scopes = [f"folders/{folder_id}" for folder_id in folder_ids]
+        for project in self._search_scopes(scopes, PROJECT_ASSET_TYPE,
+                                           _to_project):
+            # Search always returns all the descendants of the scope
+            if recursive or project.parent in scopes:
+                yield project
+
+    def get_clusters(self, project_ids=None, folder_ids=None,
+                     recursive=False):
+        scopes = [f"projects/{project_id}"
+                  for project_id in project_ids or []]
+        direct_projects = None
+        if folder_ids:
+            scopes.extend([f"folders/{folder_id}"
+                           for folder_id in folder_ids])
+            if not recursive:
+                direct_projects = set(project_ids or []) | {
+                    project.project_id
+                    for project in self.get_projects(folder_ids)}
+        for cluster in self._search_scopes(scopes, CLUSTER_ASSET_TYPE,
+                                           _to_cluster):
+            if direct_projects is None or \
+                    cluster.project_id in direct_projects:
+                yield cluster
@@ -22,3 +22,13 @@ class AbortedByUserError(GcpctlException):
         """Constructor.
         """
         super().__init__(message)
+
+
+class UnknownColumns(GcpctlException):
+    """Columns selected for output that the table doesn't have."""
+
+    def __init__(self, columns, available):
+        self.message = f"Unknown columns: {', '.join(columns)}. \
+Available columns: {', '.join(available)}"
+
+        super().__init__(self.message)
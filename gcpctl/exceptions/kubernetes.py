@@ -0,0 +1,24 @@
+"""Kubernetes-related exceptions."""
+# Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+from gcpctl.exceptions import GcpctlException
+
+
+class InvalidSelector(GcpctlException):
+    """Label selector which can't be parsed exception."""
+
+    def __init__(self, selector: str, reason: str):
+        self.message = f"Invalid label selector '{selector}': {reason}"
+
+        super().__init__(self.message)
@@ -17,7 +17,12 @@ import logging
 from google.cloud import resourcemanager_v3
 from google.api_core.exceptions import PermissionDenied
 
+from gcpctl.client_factory import get_client_factory
+from gcpctl.folders.walker import FOLDER, FolderWalker
+from gcpctl.utils.cache import ListingCache
 from gcpctl.utils.colors import BCOLORS
+from gcpctl.utils.concurrency import DEFAULT_PARALLELISM
+from gcpctl.utils.pagers import iter_pages
 from gcpctl.printer import Printer
 
 
@@ -27,27 +32,96 @@ LOG = logging.getLogger(__name__)
 class FolderManager():
     """Manages operations related to GCP folders."""
 
-    def __init__(self, folder_ids=None) -> None:
-        self.client = resourcemanager_v3.FoldersClient()
+    def __init__(self, folder_ids=None, recursive=False, depth=0,
+                 parallelism=DEFAULT_PARALLELISM, cache=None,
+                 client_factory=None, client=None) -> None:
+        """Constructor.
+        :param folder_ids: IDs of the folders whose sub-folders are listed.
+        :param recursive: Whether to include sub-folders at any depth.
+        :param depth: Otherwise, how many levels of sub-folders to descend
+            into. 0 means only the direct sub-folders.
+        """
+        self.client_factory = client_factory or get_client_factory()
+        self._client = client
         self.folder_ids = folder_ids
+        self.recursive = recursive
+        self.depth = depth
+        self.parallelism = parallelism
+        self.cache = cache or ListingCache(enabled=False)
 
-    def list(self):
-        """List folders."""
-        folders = []
-        if self.folder_ids:
-            for folder_id in self.folder_ids:
-                request = resourcemanager_v3.ListFoldersRequest(
-                    parent=f"folders/{folder_id}")
-                folders = self.client.list_folders(request=request)
-                Printer.print_headers(["Folder", "Parent"])
-                for folder in folders:
-                    print(Printer.get_row_str([folder.display_name,
-                                               folder.parent]))
+    @property
+    def client(self):
+        """The folders client. Unless given, it comes from the client
+        factory on first use."""
+        return self._client or self.client_factory.get(
+            resourcemanager_v3.FoldersClient)
+
+    def iter_folders(self):
+        """Yields the sub-folders of the folders as soon as they are found,
+        down to self.depth levels below them (any depth when recursive).
+        All the folders of a level are listed concurrently, so every level
+        costs a single round-trip.
+        """
+        walker = FolderWalker(folders_client=self.client,
+                              parallelism=self.parallelism,
+                              cache=self.cache)
+        max_depth = None if self.recursive else self.depth
+        for entry in walker.walk(self.folder_ids, max_depth=max_depth):
+            if entry.kind == FOLDER:
+                yield entry.resource
+
+    def iter_paths(self):
+        """Yields (folder, path) tuples of the sub-folders of the folders,
+        as soon as they are found. The path is made of the display names
+        of the folders below the listed folder, e.g.
+        folders/1/Engineering/Platform.
+        """
+        paths = {f"folders/{folder_id}": f"folders/{folder_id}"
+                 for folder_id in self.folder_ids}
+        # A folder is found only once its parent was
+        for folder in self.iter_folders():
+            path = f"{paths[folder.parent]}/{folder.display_name}"
+            paths[folder.name] = path
+            yield folder, path
+
+    def print_tree(self) -> None:
+        """Prints the sub-folders of every folder as a tree, each folder
+        under its parent, sorted by their display names."""
+        children = {}
+        labels = {}
+        for folder in self.iter_folders():
+            children.setdefault(folder.parent, []).append(folder.name)
+            labels[folder.name] = folder.display_name
+        for names in children.values():
+            names.sort(key=lambda name: labels[name])
+        roots = [f"folders/{folder_id}" for folder_id in self.folder_ids]
+        labels.update({root: root for root in roots})
+        Printer.print_tree(roots, children, labels)
+
+    def list(self, sort=False, tree=False, **output_options):
+        """List folders.
+        :param sort: Print the folders sorted instead of as they arrive.
+        :param tree: Print the folders as a tree instead of a table.
+        :param output_options: Passed to Printer.print_table, e.g. output.
+        """
+        if self.folder_ids and tree:
+            self.print_tree()
+        elif self.folder_ids:
+            Printer.print_table(
+                ["Folder", "Parent", "Path"],
+                ([folder.display_name, folder.parent, path]
+                 for folder, path in self.iter_paths()),
+                sort=sort, **output_options)
         else:
             request = resourcemanager_v3.ListFoldersRequest()
             try:
-                for folder in self.client.list_folders(request=request):
-                    print(folder.display_name)
+                Printer.print_table(
+                    ["Folder"],
+                    ([folder.display_name]
+                     for page in iter_pages(self.client.list_folders,
+                                            request, 'folders')
+                     for folder in page),
+                    sort=sort, **output_options)
             except PermissionDenied:
                 LOG.error("%sNo permissions to access the root of the \
 organization.\nConsider accessing a specific folder with -f FOLDER.%s",
@@ -0,0 +1,156 @@
+"""GCP resource hierarchy walker."""
+# Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Iterator, Optional
+
+from google.cloud import resourcemanager_v3
+from google.api_core.exceptions import PermissionDenied
+
+from gcpctl.utils.cache import ListingCache
+from gcpctl.utils.colors import BCOLORS
+from gcpctl.utils.concurrency import DEFAULT_PARALLELISM
+from gcpctl.utils.pagers import iter_pages
+
+LOG = logging.getLogger(__name__)
+
+FOLDER = "folder"
+PROJECT = "project"
+
+
+@dataclass
+class WalkEntry():
+    """A folder or a project found while walking the hierarchy."""
+
+    kind: str
+    resource: Any
+    depth: int
+
+
+class FolderWalker():
+    """Walks the folders tree breadth-first, starting from one or more
+    folders. The children of every discovered folder are listed as soon as
+    the folder is found, using a bounded pool of workers, and entries are
+    yielded as soon as the page of results holding them arrives.
+    """
+
+    def __init__(self, folders_client, projects_client=None,
+                 parallelism=DEFAULT_PARALLELISM, cache=None,
+                 errors=None) -> None:
+        """Constructor.
+        :param folders_client: resourcemanager_v3 FoldersClient.
+        :param projects_client: resourcemanager_v3 ProjectsClient. If not
+            given, only folders are walked.
+        :param parallelism: Maximum number of concurrent API calls.
+        :param cache: ListingCache used for the API listings.
+        :param errors: Dict the folders which can't be accessed are recorded
+            in, keyed by their name, e.g. the errors of a DiscoveryBackend.
+        """
+        self.folders_client = folders_client
+        self.projects_client = projects_client
+        self.parallelism = parallelism
+        self.cache = cache or ListingCache(enabled=False)
+        self.errors = {} if errors is None else errors
+
+    def _list_folders(self, parent):
+        request = resourcemanager_v3.ListFoldersRequest(parent=parent)
+        return self.cache.fetch_pages(
+            'folders', 'list_folders', parent,
+            lambda: iter_pages(self.folders_client.list_folders, request,
+                               'folders'),
+            message_class=resourcemanager_v3.Folder)
+
+    def _list_projects(self, parent):
+        request = resourcemanager_v3.ListProjectsRequest(parent=parent)
+        return self.cache.fetch_pages(
+            'projects', 'list_projects', parent,
+            lambda: iter_pages(self.projects_client.list_projects, request,
+                               'projects'),
+            message_class=resourcemanager_v3.Project)
+
+    @staticmethod
+    def _produce(pages, kind, parent, depth, results, stop) -> None:
+        """Puts every page of a listing into the results queue, followed
+        by a None page marking the end of the listing."""
+        error = None
+        try:
+            for page in pages:
+                if stop.is_set():
+                    break
+                results.put((kind, parent, depth, page, None))
+        except Exception as ex:  # pylint: disable=broad-except
+            error = ex
+        results.put((kind, parent, depth, None, error))
+
+    def walk(self, folder_ids, max_depth: Optional[int] = None,
+             ) -> Iterator[WalkEntry]:
+        """Yields the folders and projects under the given folders.
+        :param folder_ids: IDs of the folders to start from.
+        :param max_depth: How many levels of sub-folders to descend into.
+            0 means only the direct children of the given folders are
+            returned. None means no limit.
+        :return: Iterator over the found entries, in order of arrival.
+        """
+        executor = ThreadPoolExecutor(max_workers=self.parallelism)
+        results = queue.Queue()
+        stop = threading.Event()
+        pending = 0
+
+        def submit(kind, parent, depth):
+            nonlocal pending
+            pages = self._list_projects(parent) if kind == PROJECT else \
+                self._list_folders(parent)
+            executor.submit(self._produce, pages, kind, parent, depth,
+                            results, stop)
+            pending += 1
+
+        def visit(parent, depth):
+            if self.projects_client:
+                submit(PROJECT, parent, depth)
+            # Without projects there is nothing else to find in a
+            # folder, so its sub-folders are always listed
+            if not self.projects_client or max_depth is None or \
+                    depth < max_depth:
+                submit(FOLDER, parent, depth)
+
+        try:
+            for folder_id in folder_ids:
+                visit(f"folders/{folder_id}", 0)
+            while pending:
+                kind, parent, depth, page, error = results.get()
+                if page is None:
+                    pending -= 1
+                    if isinstance(error, PermissionDenied):
+                        LOG.error("%sNo permissions to access %s%s",
+                                  BCOLORS['RED'], parent, BCOLORS['ENDC'])
+                        # What is under the folder is unknown, not gone
+                        self.errors[parent] = error
+                    elif error is not None:
+                        raise error
+                    continue
+                for resource in page:
+                    yield WalkEntry(kind=kind, resource=resource,
+                                    depth=depth)
+                    if kind == FOLDER and (
+                            max_depth is None or depth < max_depth):
+                        visit(resource.name, depth + 1)
+        finally:
+            # The caller may stop consuming early, don't wait for
+            # calls nobody is interested in anymore
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -12,7 +12,7 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from gcpctl.printer import Printer
 
@@ -24,6 +24,12 @@ class GKECluster():
     name: str
     project_id: str
     zone: str
+    endpoint: str = ""
+    # Base64 encoded PEM of the cluster's CA certificate
+    ca_certificate: str = field(default="", repr=False)
+    # Change the API reports on every update of the cluster
+    etag: str = ""
+    update_time: str = ""
 
     def __str__(self):
         return Printer.get_row_str([self.name, self.project_id, self.zone])
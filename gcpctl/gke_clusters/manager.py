@@ -13,15 +13,21 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 import logging
+import os
+import shlex
 import sys
+from concurrent.futures import CancelledError
+from functools import partial
+from itertools import chain
 
-from google.cloud import container_v1
-
+from gcpctl.discovery.backend import get_backend
 from gcpctl.utils.colors import BCOLORS
-from gcpctl.gke_clusters.cluster import GKECluster
-from gcpctl.kubernetes.config import load_config
-from gcpctl.kubernetes.manager import KubernetesManager
-from gcpctl.utils.process import local_exec
+from gcpctl.utils.concurrency import fan_out
+from gcpctl.utils.executor import (DEFAULT_EXEC_PARALLELISM,
+                                   DEFAULT_GROUP_PARALLELISM, ExecEngine,
+                                   STDERR, ExecResult, ExecTask,
+                                   print_summary)
+from gcpctl.utils.process import AsyncExecutor, Command
 from gcpctl.printer import Printer
 
 LOG = logging.getLogger(__name__)
@@ -30,61 +36,223 @@ LOG = logging.getLogger(__name__)
 class GKEManager():
     """Execute GCP GKE related operations."""
 
-    def __init__(self, project_ids=None, clusters=None) -> None:
-        self.client = container_v1.ClusterManagerClient()
+    def __init__(self, project_ids=None, folder_ids=None, clusters=None,
+                 recursive=False, backend=None, client_pool=None) -> None:
         self.project_ids = project_ids
+        self.folder_ids = folder_ids
         self.clusters = clusters or []
+        self.recursive = recursive
+        self._backend = backend
+        self._client_pool = client_pool
         super().__init__()
 
-    def _validate_and_get_projects(self):
-        """Validate there is at least one project to
-        obtain GKE clusters from."""
-        project_ids = []
-        if not self.project_ids:
+    @property
+    def backend(self):
+        """The discovery backend, created on first use."""
+        if self._backend is None:
+            self._backend = get_backend()
+        return self._backend
+
+    @property
+    def client_pool(self):
+        """The Kubernetes clients pool, created on first use, as it loads
+        the kubernetes library."""
+        if self._client_pool is None:
+            # pylint: disable=import-outside-toplevel
+            from gcpctl.kubernetes.pool import get_client_pool
+            self._client_pool = get_client_pool()
+        return self._client_pool
+
+    def _validate_scopes(self):
+        """Validate there is at least one project or folder to
+        obtain GKE clusters from, unless clusters were given."""
+        if not self.project_ids and not self.folder_ids and \
+                not self.clusters:
             LOG.error("%sProvide a project ID%s",
                       BCOLORS['RED'], BCOLORS['ENDC'])
             sys.exit(2)
-        if self.project_ids:
-            project_ids.extend(self.project_ids)
-        return project_ids
-
-    def list_clusters(self) -> None:
-        """List GKE clusters."""
-        clusters = []
-        for project_id in self._validate_and_get_projects():
-            parent = "projects/%s/locations/-" % project_id
-            response = self.client.list_clusters(parent=parent)
-            clusters.extend([GKECluster(
-                name=cluster.name, project_id=project_id,
-                zone=cluster.zone) for cluster in response.clusters])
-        LOG.info("Obtained %d GKE clusters", len(clusters))
-        Printer.print_headers(["Cluster", "Project", "Zone"])
-        for cluster in clusters:
-            print(cluster)
-
-    def load_clusters(self, project, clusters=None) -> None:
-        """Sets self.clusters to actual Cluster instances."""
-        parent = f"projects/{project}/locations/-"
-        response = self.client.list_clusters(parent=parent)
-        for cluster in response.clusters:
+
+    def iter_clusters(self, project_ids=None, folder_ids=None,
+                      clusters=None):
+        """Yields the GKE clusters of the given projects and folders as soon
+        as they are found. Scopes that failed to be queried are recorded in
+        the backend errors instead of aborting the run.
+        :param project_ids: IDs of the projects to obtain clusters from.
+        :param folder_ids: IDs of the folders to obtain clusters from.
+        :param clusters: If given, only clusters with these names are
+            returned.
+        """
+        for cluster in self.backend.get_clusters(
+                project_ids=project_ids, folder_ids=folder_ids,
+                recursive=self.recursive):
             if not clusters or cluster.name in clusters:
-                self.clusters.append(GKECluster(cluster.name, project,
-                                                cluster.zone))
+                yield cluster
+
+    def get_clusters(self, project_ids=None, folder_ids=None, clusters=None):
+        """Returns the GKE clusters of the given projects and folders. See
+        iter_clusters."""
+        return list(self.iter_clusters(project_ids=project_ids,
+                                       folder_ids=folder_ids,
+                                       clusters=clusters))
+
+    def report_errors(self) -> None:
+        """Logs the scopes that failed to be queried, if any."""
+        for scope, error in self.backend.errors.items():
+            LOG.error("%sFailed to obtain clusters of %s: %s%s",
+                      BCOLORS['RED'], scope, error, BCOLORS['ENDC'])
+
+    def list_clusters(self, sort=False, **output_options) -> None:
+        """List GKE clusters: the given ones, followed by the ones of the
+        projects and folders.
+        :param sort: Print the clusters sorted instead of as they arrive.
+        :param output_options: Passed to Printer.print_table, e.g. output.
+        """
+        self._validate_scopes()
+        clusters = self.clusters
+        if self.project_ids or self.folder_ids:
+            clusters = chain(clusters, self.iter_clusters(
+                project_ids=self.project_ids, folder_ids=self.folder_ids))
+        count = Printer.print_table(
+            ["Cluster", "Project", "Zone"],
+            ([cluster.name, cluster.project_id, cluster.zone]
+             for cluster in clusters),
+            sort=sort, **output_options)
+        LOG.info("Obtained %d GKE clusters", count)
+        if self.project_ids or self.folder_ids:
+            self.report_errors()
+
+    def load_clusters(self, projects=None, folder_ids=None,
+                      clusters=None) -> None:
+        """Sets self.clusters to actual Cluster instances.
+        :param projects: IDs of the projects to load clusters from.
+        :param folder_ids: IDs of the folders to load clusters from.
+        :param clusters: If given, only clusters with these names are loaded.
+        """
+        self.clusters.extend(self.get_clusters(
+            project_ids=projects, folder_ids=folder_ids, clusters=clusters))
+        self.report_errors()
 
-    def pod_exec(self, commands, pods=None, pods_regex=None) -> None:
+    def pod_exec(self, commands, selector,
+                 parallelism=DEFAULT_EXEC_PARALLELISM,
+                 cluster_parallelism=DEFAULT_GROUP_PARALLELISM) -> bool:
         """Executes command on one or more of the clusters Pods
-        in the GKE cluster"""
+        in the GKE cluster. Pods are executed on concurrently and their output
+        is streamed, prefixed with cluster/namespace/pod.
+        :param commands: The command to execute and its arguments.
+        :param selector: PodSelector of the pods of every cluster to execute
+            in.
+        :param parallelism: Maximum number of concurrent executions.
+        :param cluster_parallelism: Maximum number of concurrent executions
+            in a single cluster.
+        :return: Whether the command succeeded on all the pods.
+        """
+        # pylint: disable=import-outside-toplevel
+        from gcpctl.kubernetes.informer import (get_pod_informer,
+                                                pod_informers_enabled)
+        from gcpctl.kubernetes.kubeconfig import get_context
+        from gcpctl.kubernetes.manager import KubernetesManager
+        if not self.clusters:
+            LOG.error("%sNo clusters specified...%s\nSpecify \
+projects with clusters", BCOLORS['RED'], BCOLORS['ENDC'])
+            sys.exit(2)
+        command = shlex.split(" ".join(commands))
+        client_pool = self.client_pool
+
+        def select_pods(cluster):
+            k8s_manager = KubernetesManager(
+                api_client=client_pool.get(cluster))
+            if pod_informers_enabled():
+                k8s_manager.informer = get_pod_informer(
+                    get_context(cluster), k8s_manager.core_v1)
+            index = k8s_manager.get_pod_index(selector)
+            pods = index.select(selector)
+            LOG.debug("Selected %d of the %d pods of %s", len(pods),
+                      len(index), cluster.name)
+            return k8s_manager, pods
+
+        # The pods of every cluster are listed concurrently
+        tasks = []
+        listed = True
+        for result in fan_out(select_pods, self.clusters,
+                              parallelism=parallelism):
+            cluster = result.item
+            if not result.ok:
+                LOG.error("%sFailed to list the pods of %s: %s%s",
+                          BCOLORS['RED'], cluster.name, result.error,
+                          BCOLORS['ENDC'])
+                listed = False
+                continue
+            k8s_manager, pods = result.value
+            for pod in pods:
+                tasks.append(ExecTask(
+                    prefix=f"{cluster.name}/{pod.namespace}/{pod.name}",
+                    group=get_context(cluster),
+                    func=partial(k8s_manager.exec_pod, pod.name,
+                                 pod.namespace, command)))
+        engine = ExecEngine(parallelism=parallelism,
+                            group_parallelism=cluster_parallelism)
+        results = engine.run(tasks)
+        engine.print_summary(results)
+        return listed and all(result.ok for result in results)
+
+    @staticmethod
+    def _exec_prefix(cluster) -> str:
+        # Unique like the cluster's kubeconfig context, as clusters of a
+        # project may share their name across locations
+        return f"{cluster.project_id}/{cluster.zone}/{cluster.name}"
+
+    def cluster_exec(self, commands, parallelism=DEFAULT_EXEC_PARALLELISM,
+                     timeout=None, fail_fast=False, stream=False) -> bool:
+        """Executes a local command, e.g. kubectl, against every one of the
+        clusters, concurrently. The command gets a kubeconfig of its own,
+        holding only the cluster's context, so neither the user's kubeconfig
+        nor commands running against other clusters are affected.
+        :param commands: The command to execute and its arguments.
+        :param parallelism: Maximum number of clusters to execute on at
+            the same time.
+        :param timeout: Seconds after which the command is killed.
+        :param fail_fast: Stop once the command failed on a cluster.
+        :param stream: Print output lines as they are written instead of
+            grouping the output of every cluster.
+        :return: Whether the command succeeded on all the clusters.
+        """
+        # pylint: disable=import-outside-toplevel
+        from gcpctl.kubernetes.kubeconfig import (get_cluster_kubeconfig,
+                                                  get_context)
         if not self.clusters:
             LOG.error("%sNo clusters specified...%s\nSpecify \
 projects with clusters", BCOLORS['RED'], BCOLORS['ENDC'])
             sys.exit(2)
-        k8s_manager = KubernetesManager()
-        for cluster in self.clusters:
-            context = load_config(cluster)
-            namespaces = k8s_manager.get_namespaces()
-            for namespace in namespaces:
-                pods_instances = k8s_manager.get_pods(
-                    pods=pods, pods_regex=pods_regex, namespace=namespace)
-                for pod in pods_instances:
-                    local_exec(f"kubectl config use-context {context}; \
-kubectl exec {pod.metadata.name} -n {namespace.metadata.name} -- {commands}")
+        command = shlex.split(" ".join(commands))
+        # A cluster given and found in the projects runs the command once
+        clusters = list({get_context(cluster): cluster
+                         for cluster in self.clusters}.values())
+        executor = AsyncExecutor(parallelism=parallelism, timeout=timeout,
+                                 fail_fast=fail_fast, buffered=not stream)
+        prepared = list(fan_out(get_cluster_kubeconfig, clusters,
+                                parallelism=parallelism))
+        failed = [kubeconfig for kubeconfig in prepared if not kubeconfig.ok]
+        results = {}
+        for kubeconfig in failed:
+            prefix = self._exec_prefix(kubeconfig.item)
+            executor.output.write(prefix, STDERR, f"Failed to write the \
+kubeconfig: {kubeconfig.error!r}")
+            results[prefix] = ExecResult(prefix=prefix, exit_code=None,
+                                         duration=0.0, error=kubeconfig.error)
+        to_run = [Command(prefix=self._exec_prefix(kubeconfig.item),
+                          args=command,
+                          env=dict(os.environ, KUBECONFIG=kubeconfig.value))
+                  for kubeconfig in prepared if kubeconfig.ok]
+        if failed and fail_fast:
+            results.update({
+                skipped.prefix: ExecResult(
+                    prefix=skipped.prefix, exit_code=None,
+                    duration=0.0, error=CancelledError())
+                for skipped in to_run})
+            to_run = []
+        for result in executor.run(to_run):
+            results[result.prefix] = result
+        results = [results[self._exec_prefix(cluster)]
+                   for cluster in clusters]
+        print_summary(results, executor.wall_time)
+        return all(result.ok for result in results)
@@ -0,0 +1,217 @@
+"""Refreshing and reading the inventory snapshot of envs."""
+# Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import logging
+import time
+import zlib
+
+from gcpctl.discovery.backend import get_backend
+from gcpctl.inventory.snapshot import (DEFAULT_CLUSTERS_MAX_AGE,
+                                       DEFAULT_MAX_AGE, InventorySnapshot)
+from gcpctl.printer import Printer
+from gcpctl.utils.colors import BCOLORS
+
+LOG = logging.getLogger(__name__)
+
+ADDED = 'added'
+REMOVED = 'removed'
+CHANGED = 'changed'
+
+
+def diff(before, after):
+    """Yields (change, key) tuples of the resources added, removed or
+    changed between two {key: resource} dicts."""
+    for key, resource in after.items():
+        if key not in before:
+            yield ADDED, key
+        elif before[key] != resource:
+            yield CHANGED, key
+    for key in before:
+        if key not in after:
+            yield REMOVED, key
+
+
+def is_due(project_id, listed, max_age, now) -> bool:
+    """Whether the clusters of a project listed at listed (None if they
+    never were) have to be listed again. Projects listed at the same time
+    are due over the second half of max_age, so they aren't all listed
+    again by the same sync."""
+    if listed is None:
+        return True
+    spread = zlib.crc32(project_id.encode('utf-8')) / 2 ** 32
+    return now - listed >= max_age * (1 + spread) / 2
+
+
+class InventoryManager():
+    """Manages the inventory snapshot of envs."""
+
+    def __init__(self, env_folder_ids=None, recursive=False, backend=None,
+                 snapshot=None) -> None:
+        """Constructor.
+        :param env_folder_ids: Folder IDs of every env, by env name.
+        :param recursive: Whether to include projects of sub-folders.
+        """
+        self.env_folder_ids = env_folder_ids or {}
+        self.recursive = recursive
+        self._backend = backend
+        self.snapshot = snapshot or InventorySnapshot()
+
+    @property
+    def backend(self):
+        """The discovery backend, created on first use."""
+        if self._backend is None:
+            self._backend = get_backend()
+        return self._backend
+
+    def get_clusters(self, max_age=DEFAULT_MAX_AGE):
+        """Returns the GKE clusters of the envs whose snapshot is fresh, and
+        the folder IDs of the ones which have to be crawled.
+        :return: (clusters, folder IDs) tuple.
+        """
+        clusters = []
+        folder_ids = []
+        for env, env_folder_ids in self.env_folder_ids.items():
+            if max_age and self.snapshot.is_fresh(
+                    env, env_folder_ids, self.recursive, max_age=max_age):
+                LOG.debug("Using the inventory snapshot of %s", env)
+                clusters.extend(self.snapshot.get_clusters(env))
+            else:
+                folder_ids.extend(env_folder_ids)
+        return clusters, folder_ids
+
+    def refresh(self) -> bool:
+        """Crawls the folders of every env and stores what was found in the
+        snapshot. Listings still fresh in the listings cache aren't queried
+        again.
+        :return: Whether all the folders and projects were listed.
+        """
+        ok = True
+        rows = []
+        for env, folder_ids in self.env_folder_ids.items():
+            start = time.monotonic()
+            self.backend.errors.clear()
+            try:
+                projects = list(self.backend.get_projects(
+                    folder_ids, recursive=self.recursive))
+                clusters = list(self.backend.get_clusters(
+                    project_ids=[project.project_id
+                                 for project in projects]))
+            except Exception as ex:  # pylint: disable=broad-except
+                LOG.error("%sFailed to refresh %s: %s%s", BCOLORS['RED'],
+                          env, ex, BCOLORS['ENDC'])
+                ok = False
+                continue
+            before = {(cluster.project_id, cluster.zone, cluster.name)
+                      for cluster in self.snapshot.get_clusters(env)}
+            self.snapshot.store(env, folder_ids, self.recursive, projects,
+                                clusters, errors=self.backend.errors)
+            after = {(cluster.project_id, cluster.zone, cluster.name)
+                     for cluster in self.snapshot.get_clusters(env)}
+            rows.append([env, len(projects), len(after),
+                         len(after - before), len(before - after),
+                         f"{time.monotonic() - start:.2f}s"])
+            for scope, error in self.backend.errors.items():
+                LOG.error("%sFailed to list %s of %s: %s%s", BCOLORS['RED'],
+                          scope, env, error, BCOLORS['ENDC'])
+                ok = False
+        Printer.print_table(["Env", "Projects", "Clusters", "Added",
+                             "Removed", "Duration"], rows)
+        return ok
+
+    def _get_state(self, env):
+        """Returns the stored projects and clusters of env, by key."""
+        return ({project.project_id: project
+                 for project in self.snapshot.get_projects(env)},
+                {(cluster.project_id, cluster.zone, cluster.name): cluster
+                 for cluster in self.snapshot.get_clusters(env)})
+
+    def sync(self, clusters_max_age=DEFAULT_CLUSTERS_MAX_AGE,
+             **output_options) -> bool:
+        """Updates the snapshot of every env and prints the projects and
+        clusters which were added, removed or changed since it was stored.
+        The projects are listed again, but the clusters are listed only for
+        the projects which were added or changed, or whose clusters were
+        listed more than clusters_max_age seconds ago: GKE can't list only
+        the clusters which changed, and they make most of the API calls.
+        Changes to the clusters of the other projects aren't printed, and
+        the snapshot of the env stays as old as their listing, so commands
+        reading it don't use it past their own max age.
+        :param output_options: Passed to Printer.print_table, e.g. output.
+        :return: Whether all the folders and projects were listed.
+        """
+        ok = True
+        rows = []
+        for env, folder_ids in self.env_folder_ids.items():
+            start = time.monotonic()
+            self.backend.errors.clear()
+            projects_before, clusters_before = self._get_state(env)
+            listing_times = self.snapshot.get_listing_times(env)
+            now = time.time()
+            try:
+                projects = list(self.backend.get_projects(
+                    folder_ids, recursive=self.recursive))
+                project_ids = [
+                    project.project_id for project in projects
+                    if projects_before.get(project.project_id) != project or
+                    is_due(project.project_id,
+                           listing_times.get(project.project_id),
+                           clusters_max_age, now)]
+                clusters = list(self.backend.get_clusters(
+                    project_ids=project_ids))
+            except Exception as ex:  # pylint: disable=broad-except
+                LOG.error("%sFailed to sync %s: %s%s", BCOLORS['RED'],
+                          env, ex, BCOLORS['ENDC'])
+                ok = False
+                continue
+            self.snapshot.store(env, folder_ids, self.recursive, projects,
+                                clusters, errors=self.backend.errors,
+                                cluster_project_ids=project_ids)
+            projects_after, clusters_after = self._get_state(env)
+            for change, project_id in diff(projects_before, projects_after):
+                project = projects_after.get(project_id) or \
+                    projects_before[project_id]
+                rows.append([env, change, 'project', project_id,
+                             project.display_name, ''])
+            for change, (project_id, zone, name) in diff(clusters_before,
+                                                         clusters_after):
+                rows.append([env, change, 'cluster', project_id, name, zone])
+            LOG.info("Synced %s in %.2fs, listing the clusters of %d of %d "
+                     "projects", env, time.monotonic() - start,
+                     len(project_ids), len(projects))
+            if len(project_ids) < len(projects):
+                LOG.info(
+                    "Changes to the clusters of the %d other projects of %s "
+                    "aren't shown, use --clusters-max-age 0 to list them",
+                    len(projects) - len(project_ids), env)
+            for scope, error in self.backend.errors.items():
+                LOG.error("%sFailed to list %s of %s: %s%s", BCOLORS['RED'],
+                          scope, env, error, BCOLORS['ENDC'])
+                ok = False
+        Printer.print_table(["Env", "Change", "Kind", "Project", "Name",
+                             "Zone"], rows, **output_options)
+        return ok
+
+    def list(self, **output_options) -> None:
+        """List the envs of the snapshot and how old they are.
+        :param output_options: Passed to Printer.print_table, e.g. output.
+        """
+        rows = []
+        for snapshot in self.snapshot.get_envs():
+            rows.append([snapshot.env, ",".join(snapshot.folder_ids),
+                         snapshot.recursive,
+                         len(self.snapshot.get_projects(snapshot.env)),
+                         len(self.snapshot.get_clusters(snapshot.env)),
+                         f"{snapshot.age:.0f}s"])
+        Printer.print_table(["Env", "Folders", "Recursive", "Projects",
+                             "Clusters", "Age"], rows, **output_options)
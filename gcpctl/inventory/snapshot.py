@@ -0,0 +1,254 @@
+"""On-disk snapshot of the projects and GKE clusters of every env."""
+# Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import contextlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from gcpctl.gke_clusters.cluster import GKECluster
+from gcpctl.projects.project import GCPProject
+from gcpctl.utils.cache import CACHE_DIR
+
+LOG = logging.getLogger(__name__)
+
+INVENTORY_PATH = os.path.join(CACHE_DIR, 'inventory.sqlite3')
+# Time, in seconds, the snapshot of an env is used instead of crawling it
+DEFAULT_MAX_AGE = 60 * 60
+# Time, in seconds, after which a sync lists the clusters of a project again
+# even though the project didn't change
+DEFAULT_CLUSTERS_MAX_AGE = 24 * 60 * 60
+
+# Snapshots stored with another version of the schema are dropped
+SCHEMA_VERSION = 3
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS envs (
+    env TEXT PRIMARY KEY,
+    folder_ids TEXT NOT NULL,
+    recursive INTEGER NOT NULL,
+    refreshed REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS projects (
+    env TEXT NOT NULL,
+    project_id TEXT NOT NULL,
+    display_name TEXT NOT NULL,
+    parent TEXT NOT NULL,
+    etag TEXT NOT NULL,
+    update_time TEXT NOT NULL,
+    clusters_listed REAL,
+    PRIMARY KEY (env, project_id)
+);
+CREATE TABLE IF NOT EXISTS clusters (
+    env TEXT NOT NULL,
+    project_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    zone TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    ca_certificate TEXT NOT NULL,
+    etag TEXT NOT NULL,
+    update_time TEXT NOT NULL,
+    PRIMARY KEY (env, project_id, zone, name)
+);
+"""
+
+
+@dataclass
+class EnvSnapshot():
+    """What is stored about an env, without its projects and clusters."""
+
+    env: str
+    folder_ids: List[str]
+    recursive: bool
+    refreshed: float
+
+    @property
+    def age(self) -> float:
+        """Seconds since the env was refreshed, i.e. since the clusters of
+        its least recently listed project were listed."""
+        return time.time() - self.refreshed
+
+
+class InventorySnapshot():
+    """SQLite database holding the projects and GKE clusters found under
+    the folders of every env, so commands targeting an env can start
+    without crawling it. An env is used only if it was refreshed with the
+    same folders and recursion, at most max_age seconds ago.
+    """
+
+    def __init__(self, path: str = INVENTORY_PATH) -> None:
+        self.path = path
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Yields a connection, committing once the block completes."""
+        os.makedirs(os.path.dirname(self.path), mode=0o700, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                conn.executescript(
+                    "DROP TABLE IF EXISTS envs; "
+                    "DROP TABLE IF EXISTS projects; "
+                    "DROP TABLE IF EXISTS clusters; "
+                    f"PRAGMA user_version = {SCHEMA_VERSION};")
+            conn.executescript(SCHEMA)
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_env(self, env: str) -> Optional[EnvSnapshot]:
+        """Returns what is stored about an env, or None if it was never
+        refreshed."""
+        if not os.path.exists(self.path):
+            return None
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT folder_ids, recursive, refreshed FROM envs "
+                "WHERE env = ?", (env,)).fetchone()
+        if row is None:
+            return None
+        return EnvSnapshot(env=env, folder_ids=json.loads(row[0]),
+                           recursive=bool(row[1]), refreshed=row[2])
+
+    def get_envs(self) -> List[EnvSnapshot]:
+        """Returns what is stored about every env."""
+        if not os.path.exists(self.path):
+            return []
+        with self._connect() as conn:
+            names = [row[0] for row in conn.execute(
+                "SELECT env FROM envs ORDER BY env")]
+        return [self.get_env(env) for env in names]
+
+    def is_fresh(self, env: str, folder_ids: List[str], recursive: bool,
+                 max_age: float = DEFAULT_MAX_AGE) -> bool:
+        """Whether the snapshot of env can be used instead of crawling it."""
+        snapshot = self.get_env(env)
+        if snapshot is None:
+            return False
+        if sorted(snapshot.folder_ids) != sorted(folder_ids) or \
+                snapshot.recursive != recursive:
+            LOG.debug("Inventory of %s was refreshed with other folders or "
+                      "recursion", env)
+            return False
+        return snapshot.age <= max_age
+
+    def get_projects(self, env: str) -> List[GCPProject]:
+        """Returns the stored projects of env."""
+        with self._connect() as conn:
+            return [GCPProject(display_name=row[0], parent=row[1],
+                               project_id=row[2], etag=row[3],
+                               update_time=row[4])
+                    for row in conn.execute(
+                        "SELECT display_name, parent, project_id, etag, "
+                        "update_time FROM projects WHERE env = ? "
+                        "ORDER BY rowid", (env,))]
+
+    def get_listing_times(self, env: str) -> Dict[str, Optional[float]]:
+        """Returns when the clusters of every stored project of env were
+        listed, by project ID. None if they never were."""
+        with self._connect() as conn:
+            return dict(conn.execute(
+                "SELECT project_id, clusters_listed FROM projects "
+                "WHERE env = ?", (env,)))
+
+    def get_clusters(self, env: str) -> List[GKECluster]:
+        """Returns the stored GKE clusters of env."""
+        with self._connect() as conn:
+            return [GKECluster(name=row[0], project_id=row[1], zone=row[2],
+                               endpoint=row[3], ca_certificate=row[4],
+                               etag=row[5], update_time=row[6])
+                    for row in conn.execute(
+                        "SELECT name, project_id, zone, endpoint, "
+                        "ca_certificate, etag, update_time FROM clusters "
+                        "WHERE env = ? ORDER BY project_id, zone, name",
+                        (env,))]
+
+    def store(self, env: str, folder_ids: List[str], recursive: bool,
+              projects: Iterable[GCPProject],
+              clusters: Iterable[GKECluster],
+              errors: Iterable[str] = (),
+              cluster_project_ids: Iterable[str] = None) -> None:
+        """Stores the projects and clusters found under the folders of env,
+        replacing the ones stored before.
+        :param errors: Scopes (e.g. 'projects/ID') which failed to be
+            listed. What is stored under them is kept, and the env isn't
+            marked as refreshed, so it is crawled until a refresh succeeds.
+        :param cluster_project_ids: IDs of the projects whose clusters were
+            listed, all the projects by default. The stored clusters of the
+            other projects are kept, and the env is marked as refreshed
+            when the clusters of its least recently listed project were.
+        """
+        projects = list(projects)
+        errors = set(errors)
+        failed_projects = {scope.split('/', 1)[1] for scope in errors
+                           if scope.startswith('projects/')}
+        listed = {project.project_id for project in projects}
+        if cluster_project_ids is None:
+            cluster_project_ids = listed
+        clusters_listed = set(cluster_project_ids) - failed_projects
+        with self._connect() as conn:
+            stored = {row[0] for row in conn.execute(
+                "SELECT project_id FROM projects WHERE env = ?", (env,))}
+            # Projects are only known to be gone if all folders were listed
+            folders_failed = any(not scope.startswith('projects/')
+                                 for scope in errors)
+            gone = set() if folders_failed else stored - listed
+            conn.executemany(
+                "DELETE FROM projects WHERE env = ? AND project_id = ?",
+                [(env, project_id) for project_id in gone])
+            conn.executemany(
+                "DELETE FROM clusters WHERE env = ? AND project_id = ?",
+                [(env, project_id) for project_id
+                 in clusters_listed | gone])
+            # Unlike a replace, an upsert keeps when the clusters of the
+            # project were listed
+            conn.executemany(
+                "INSERT INTO projects (env, project_id, display_name, "
+                "parent, etag, update_time) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (env, project_id) DO UPDATE SET "
+                "display_name = excluded.display_name, "
+                "parent = excluded.parent, etag = excluded.etag, "
+                "update_time = excluded.update_time",
+                [(env, project.project_id, project.display_name,
+                  project.parent, project.etag, project.update_time)
+                 for project in projects])
+            now = time.time()
+            conn.executemany(
+                "UPDATE projects SET clusters_listed = ? "
+                "WHERE env = ? AND project_id = ?",
+                [(now, env, project_id) for project_id in clusters_listed])
+            conn.executemany(
+                "INSERT OR REPLACE INTO clusters (env, project_id, name, "
+                "zone, endpoint, ca_certificate, etag, update_time) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(env, cluster.project_id, cluster.name, cluster.zone,
+                  cluster.endpoint, cluster.ca_certificate, cluster.etag,
+                  cluster.update_time) for cluster in clusters])
+            # The stored clusters of the env are only as fresh as the ones
+            # of its least recently listed project
+            oldest, never_listed = conn.execute(
+                "SELECT MIN(clusters_listed), "
+                "COUNT(*) - COUNT(clusters_listed) FROM projects "
+                "WHERE env = ?", (env,)).fetchone()
+            if not errors and not never_listed:
+                conn.execute(
+                    "INSERT OR REPLACE INTO envs (env, folder_ids, "
+                    "recursive, refreshed) VALUES (?, ?, ?, ?)",
+                    (env, json.dumps(folder_ids), int(recursive),
+                     now if oldest is None else oldest))
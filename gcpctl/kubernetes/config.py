@@ -13,22 +13,57 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 """
-import subprocess
-from kubernetes import config
+import logging
 
+from kubernetes import client, config
+from kubernetes.config.kube_config import (KUBE_CONFIG_DEFAULT_LOCATION,
+                                           KubeConfigLoader,
+                                           KubeConfigMerger)
 
-# TODO(bregman-arie): If possible, replace this with actual Python library
-#                     equivalent.
-def load_config(cluster):
+from gcpctl.kubernetes.kubeconfig import get_cluster_kubeconfig, get_context
+
+LOG = logging.getLogger(__name__)
+
+
+def load_kubeconfig(path: str = KUBE_CONFIG_DEFAULT_LOCATION):
+    """Parses the kubeconfig file(s). Multiple paths can be given, separated
+    like in the KUBECONFIG environment variable.
+    :return: KubeConfigMerger holding the merged configuration.
+    """
+    return KubeConfigMerger(path)
+
+
+def _client_from_kubeconfig(kubeconfig, context, pool_maxsize=None):
+    """Returns ApiClient of a context of an already parsed kubeconfig.
+    Refreshed credentials are not persisted back to the kubeconfig file.
+    """
+    configuration = client.Configuration()
+    if pool_maxsize:
+        configuration.connection_pool_maxsize = pool_maxsize
+    loader = KubeConfigLoader(config_dict=kubeconfig.config,
+                              active_context=context)
+    loader.load_and_set(configuration)
+    return client.ApiClient(configuration=configuration)
+
+
+def new_client(cluster, kubeconfig=None, pool_maxsize=None):
+    """Returns a Kubernetes ApiClient of the cluster, built from its context.
+    Unlike load_kube_config, neither the process-wide default configuration
+    nor the kubeconfig's current context are changed.
+    :param cluster: The GKE cluster.
+    :param kubeconfig: Already parsed kubeconfig (see load_kubeconfig). If
+        not given, the default kubeconfig is parsed.
+    :param pool_maxsize: Maximum number of HTTP connections the client
+        keeps open.
+    """
+    context = get_context(cluster)
+    LOG.debug("Loading context: %s", context)
     try:
-        context = f"gke_{cluster.project_id}_{cluster.zone}_{cluster.name}"
-        print(f"Loading context: {context}")
-        config.load_kube_config(context=context)
+        return _client_from_kubeconfig(kubeconfig or load_kubeconfig(),
+                                       context, pool_maxsize=pool_maxsize)
     except config.config_exception.ConfigException:
-        print(f"Couldn't load the config of {cluster.name}. \
-Running gcloud get-credentials")
-        subprocess.run(["gcloud", "container", "clusters", "get-credentials",
-                        cluster.name, f"--project={cluster.project_id}",
-                        f"--zone={cluster.zone}"],
-                       capture_output=True, text=True, check=True)
-    return context
+        LOG.info("Couldn't load the config of %s. Running gcloud \
+get-credentials", cluster.name)
+    return _client_from_kubeconfig(
+        load_kubeconfig(get_cluster_kubeconfig(cluster)), context,
+        pool_maxsize=pool_maxsize)
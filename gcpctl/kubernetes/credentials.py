@@ -0,0 +1,92 @@
+"""Kubernetes clients of GKE clusters built from their API objects."""
+# Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import base64
+import hashlib
+import os
+import tempfile
+import threading
+
+from google.auth.transport.requests import Request
+from kubernetes import client
+
+from gcpctl.client_factory import get_client_factory
+from gcpctl.utils.files import get_private_tmp_dir
+
+
+class GKECredentials():
+    """Google credentials used to authenticate to GKE clusters. A single
+    access token is shared by all the clusters and refreshed once it
+    expires.
+    """
+
+    def __init__(self, credentials=None) -> None:
+        """Constructor.
+        :param credentials: google.auth credentials. Defaults to the ones of
+            the shared client factory, so the GCP API clients and the
+            clusters use the same access token.
+        """
+        self.credentials = credentials or get_client_factory().credentials
+        self._lock = threading.Lock()
+
+    def token(self) -> str:
+        """Returns a valid access token, refreshing it if needed."""
+        with self._lock:
+            if not self.credentials.valid:
+                self.credentials.refresh(Request())
+            return self.credentials.token
+
+
+def write_ca_certificate(cluster) -> str:
+    """Writes the CA certificate of the cluster into a private temporary
+    file, as the Kubernetes client only accepts it as a file. The file is
+    named after the certificate, so a recreated cluster gets a new one.
+    :return: Path to the file.
+    """
+    digest = hashlib.sha256(cluster.ca_certificate.encode('utf-8'))
+    path = os.path.join(
+        get_private_tmp_dir(),
+        f"{cluster.project_id}_{cluster.zone}_{cluster.name}_\
+{digest.hexdigest()[:16]}.crt")
+    if not os.path.exists(path):
+        with tempfile.NamedTemporaryFile(dir=get_private_tmp_dir(),
+                                         delete=False) as buffer:
+            buffer.write(base64.b64decode(cluster.ca_certificate))
+        os.replace(buffer.name, path)
+    return path
+
+
+def new_cluster_client(cluster, credentials: GKECredentials,
+                       pool_maxsize=None):
+    """Returns a Kubernetes ApiClient of the cluster, built from its
+    endpoint and CA certificate. No kubeconfig is read and no gcloud
+    process is spawned; requests are authenticated with a Google access
+    token which is refreshed whenever it expires.
+    :param cluster: GKECluster with endpoint and ca_certificate set.
+    :param credentials: The credentials to authenticate with.
+    :param pool_maxsize: Maximum number of HTTP connections the client
+        keeps open.
+    """
+    configuration = client.Configuration()
+    configuration.host = f"https://{cluster.endpoint}"
+    configuration.ssl_ca_cert = write_ca_certificate(cluster)
+    if pool_maxsize:
+        configuration.connection_pool_maxsize = pool_maxsize
+
+    def refresh_token(conf):
+        conf.api_key['authorization'] = f"Bearer {credentials.token()}"
+
+    refresh_token(configuration)
+    configuration.refresh_api_key_hook = refresh_token
+    return client.ApiClient(configuration=configuration)
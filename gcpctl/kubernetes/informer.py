@@ -0,0 +1,211 @@
+"""Watch-based cache of the pods of clusters"""
+# Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import logging
+import threading
+import time
+
+from gcpctl.api_caller import get_status
+from gcpctl.kubernetes.pods import PodIndex, PodRecord
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 500
+# Seconds every watch request lasts, it is then renewed from the last
+# resourceVersion
+WATCH_TIMEOUT = 5 * 60
+# Seconds an informer may stay unused before it stops watching and drops
+# its pods
+DEFAULT_IDLE_TIMEOUT = 10 * 60
+# Status of a watch from a resourceVersion the API server no longer has
+GONE = 410
+
+_ENABLED = False
+_INFORMERS = {}
+_INFORMERS_LOCK = threading.Lock()
+
+
+class PodInformer():
+    """Keeps the pods of a cluster in memory, so selecting pods again is a
+    local lookup. The pods are listed once, and then kept up to date by
+    watching them from the resourceVersion of the listing. Bookmarks keep
+    the resourceVersion current while no pod changes, so renewed watches
+    resume where the previous ones stopped instead of listing again.
+
+    When the watch fails, or the informer wasn't used for idle_timeout
+    seconds, the pods are dropped and the next lookup lists them again.
+    Only a PodRecord of every pod is kept.
+    """
+
+    def __init__(self, core_v1, page_size=DEFAULT_PAGE_SIZE,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT,
+                 watch_factory=None) -> None:
+        """Constructor.
+        :param core_v1: CoreV1Api of the cluster.
+        :param page_size: Number of pods to obtain in every list call.
+        :param idle_timeout: Seconds the informer may stay unused.
+        :param watch_factory: Returns the kubernetes Watch to watch with,
+            e.g. a fake one.
+        """
+        self.core_v1 = core_v1
+        self.page_size = page_size
+        self.idle_timeout = idle_timeout
+        self._watch_factory = watch_factory
+        self.records = {}
+        self.resource_version = None
+        # Number of times the pods were listed
+        self.lists = 0
+        self._index = None
+        self._synced = False
+        # Incremented by every listing, so a watch which ended doesn't
+        # drop the pods of the listing which follows it
+        self._generation = 0
+        self._last_used = time.monotonic()
+        self._lock = threading.Lock()
+        self._list_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watch = None
+
+    def _list(self) -> int:
+        """Lists all the pods, replacing the records.
+        :return: The generation of the listing.
+        """
+        records = {}
+        kwargs = {"limit": self.page_size}
+        while True:
+            response = self.core_v1.list_pod_for_all_namespaces(**kwargs)
+            for pod in response.items:
+                records[(pod.metadata.namespace, pod.metadata.name)] = \
+                    PodRecord.from_pod(pod)
+            if not response.metadata._continue:
+                break
+            kwargs["_continue"] = response.metadata._continue
+        with self._lock:
+            self.records = records
+            # The pages of a listing are a snapshot at its resourceVersion
+            self.resource_version = response.metadata.resource_version
+            self._index = None
+            self._synced = True
+            self.lists += 1
+            self._generation += 1
+            return self._generation
+
+    def _new_watch(self):
+        if self._watch_factory:
+            return self._watch_factory()
+        # pylint: disable=import-outside-toplevel
+        from kubernetes import watch
+        return watch.Watch()
+
+    def _apply(self, event) -> None:
+        """Applies a watch event to the records."""
+        pod = event['object']
+        with self._lock:
+            self.resource_version = pod.metadata.resource_version
+            if event['type'] == 'BOOKMARK':
+                return
+            key = (pod.metadata.namespace, pod.metadata.name)
+            if event['type'] == 'DELETED':
+                self.records.pop(key, None)
+            else:
+                self.records[key] = PodRecord.from_pod(pod)
+            self._index = None
+
+    def _is_idle(self) -> bool:
+        with self._lock:
+            return time.monotonic() - self._last_used > self.idle_timeout
+
+    def _run(self, generation) -> None:
+        """Watches the pods of a listing until stopped, idle or the watch
+        fails."""
+        try:
+            while not self._stop.is_set() and not self._is_idle():
+                self._watch = self._new_watch()
+                for event in self._watch.stream(
+                        self.core_v1.list_pod_for_all_namespaces,
+                        resource_version=self.resource_version,
+                        allow_watch_bookmarks=True,
+                        timeout_seconds=WATCH_TIMEOUT):
+                    if self._stop.is_set() or self._is_idle():
+                        break
+                    if event['type'] == 'ERROR':
+                        LOG.debug("Watching pods failed: %s",
+                                  event.get('raw_object'))
+                        return
+                    self._apply(event)
+        except Exception as ex:  # pylint: disable=broad-except
+            if get_status(ex) == GONE:
+                LOG.debug("resourceVersion %s expired",
+                          self.resource_version)
+            else:
+                LOG.debug("Watching pods failed: %s", ex)
+        finally:
+            # Events may have been missed, the next lookup lists again
+            with self._lock:
+                if self._generation == generation:
+                    self._synced = False
+                    self.records = {}
+                    self._index = None
+
+    def get_index(self) -> PodIndex:
+        """Returns the index of the pods of the cluster, listing them first
+        if they aren't watched."""
+        with self._lock:
+            self._last_used = time.monotonic()
+        with self._list_lock:
+            with self._lock:
+                synced = self._synced
+            if not synced:
+                generation = self._list()
+                self._stop.clear()
+                threading.Thread(target=self._run, args=(generation,),
+                                 daemon=True).start()
+        with self._lock:
+            if self._index is None:
+                self._index = PodIndex(list(self.records.values()))
+            return self._index
+
+    def stop(self) -> None:
+        """Stops watching."""
+        self._stop.set()
+        if self._watch is not None:
+            self._watch.stop()
+
+
+def enable_pod_informers() -> None:
+    """Has pod-exec keep the pods of clusters in memory, for the commands of
+    a shell or serve session. Single commands list the pods once anyway."""
+    global _ENABLED  # pylint: disable=global-statement
+    _ENABLED = True
+
+
+def pod_informers_enabled() -> bool:
+    """Whether pod-exec keeps the pods of clusters in memory."""
+    return _ENABLED
+
+
+def get_pod_informer(key, core_v1) -> PodInformer:
+    """Returns the pod informer of a cluster, shared by the whole process.
+    :param key: Identifies the cluster, e.g. its kubeconfig context.
+    :param core_v1: CoreV1Api of the cluster.
+    """
+    with _INFORMERS_LOCK:
+        informer = _INFORMERS.get(key)
+        if informer is None:
+            informer = _INFORMERS[key] = PodInformer(core_v1)
+        else:
+            # The clients pool may have replaced the idle client of the
+            # cluster
+            informer.core_v1 = core_v1
+        return informer
@@ -0,0 +1,107 @@
+"""
+# Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import threading
+
+from gcpctl.utils.files import get_private_tmp_dir
+
+LOG = logging.getLogger(__name__)
+
+# The credentials plugin of kubectl gcloud get-credentials configures too
+AUTH_PLUGIN = "gke-gcloud-auth-plugin"
+
+_LOCKS = {}
+_LOCKS_LOCK = threading.Lock()
+
+
+def get_context(cluster) -> str:
+    """Returns the name of the kubeconfig context of a GKE cluster."""
+    return f"gke_{cluster.project_id}_{cluster.zone}_{cluster.name}"
+
+
+# TODO(bregman-arie): If possible, replace this with actual Python library
+#                     equivalent.
+def write_cluster_kubeconfig(cluster, kubeconfig) -> None:
+    """Writes the credentials of the cluster into the given kubeconfig
+    file, leaving the user's kubeconfig untouched. The file's current
+    context is set to the cluster."""
+    subprocess.run(["gcloud", "container", "clusters", "get-credentials",
+                    cluster.name, f"--project={cluster.project_id}",
+                    f"--zone={cluster.zone}"],
+                   env=dict(os.environ, KUBECONFIG=kubeconfig),
+                   capture_output=True, text=True, check=True)
+
+
+def build_kubeconfig(cluster) -> dict:
+    """Returns a kubeconfig holding only the cluster, built from its
+    endpoint and CA certificate, the same gcloud get-credentials would
+    write."""
+    context = get_context(cluster)
+    return {
+        'apiVersion': 'v1',
+        'kind': 'Config',
+        'current-context': context,
+        'clusters': [{'name': context, 'cluster': {
+            'server': f"https://{cluster.endpoint}",
+            'certificate-authority-data': cluster.ca_certificate}}],
+        'users': [{'name': context, 'user': {'exec': {
+            'apiVersion': 'client.authentication.k8s.io/v1beta1',
+            'command': AUTH_PLUGIN,
+            'provideClusterInfo': True,
+            'interactiveMode': 'Never'}}}],
+        'contexts': [{'name': context, 'context': {
+            'cluster': context, 'user': context}}],
+    }
+
+
+def _get_lock(context) -> threading.Lock:
+    with _LOCKS_LOCK:
+        return _LOCKS.setdefault(context, threading.Lock())
+
+
+def get_cluster_kubeconfig(cluster) -> str:
+    """Returns the path of a kubeconfig file holding only the cluster, with
+    its context as the current one. The file is written on first use, into
+    the private temporary directory, and reused by every later command of
+    the process. Clusters whose endpoint is known get it without spawning
+    any process, in a file named after their endpoint and CA certificate so
+    a recreated cluster gets a new one; others through gcloud
+    get-credentials.
+    """
+    context = get_context(cluster)
+    name = context
+    if cluster.endpoint and cluster.ca_certificate:
+        digest = hashlib.sha256(
+            f"{cluster.endpoint}\n{cluster.ca_certificate}".encode('utf-8'))
+        name = f"{context}_{digest.hexdigest()[:16]}"
+    path = os.path.join(get_private_tmp_dir(), f"{name}.kubeconfig")
+    with _get_lock(context):
+        if os.path.exists(path):
+            return path
+        tmp_path = f"{path}.tmp"
+        if cluster.endpoint and cluster.ca_certificate:
+            # JSON is YAML, as far as kubectl is concerned
+            with open(tmp_path, 'w', encoding='utf-8') as buffer:
+                json.dump(build_kubeconfig(cluster), buffer)
+        else:
+            LOG.debug("Running gcloud get-credentials for %s", context)
+            write_cluster_kubeconfig(cluster, tmp_path)
+        os.replace(tmp_path, path)
+    return path
@@ -13,28 +13,171 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 """
-from kubernetes import client
 import re
+import threading
+
+from kubernetes import client
+from kubernetes.stream import stream
+
+from gcpctl.kubernetes.pods import PodIndex, PodRecord, PodSelector
+
+DEFAULT_PAGE_SIZE = 500
+# Seconds to wait for output of an exec before checking again whether it
+# is still running
+EXEC_POLL_TIMEOUT = 1
+
+
+class LineSplitter():
+    """Accumulates chunks of output and passes complete lines to a
+    callback."""
+
+    def __init__(self, name, on_output) -> None:
+        self.name = name
+        self.on_output = on_output
+        self.buffer = ""
+
+    def feed(self, data: str) -> None:
+        """Adds a chunk of output."""
+        *lines, self.buffer = (self.buffer + data).split("\n")
+        for line in lines:
+            self.on_output(self.name, line)
+
+    def flush(self) -> None:
+        """Passes the last, incomplete, line if there is one."""
+        if self.buffer:
+            self.on_output(self.name, self.buffer)
+            self.buffer = ""
 
 
 class KubernetesManager():
+    """Executes Kubernetes related operations on a single cluster."""
+
+    def __init__(self, api_client=None, core_v1=None, informer=None):
+        """Constructor.
+        :param api_client: ApiClient of the cluster. If not given, the
+            process-wide default configuration is used.
+        :param core_v1: CoreV1Api to use instead of creating one from
+            api_client, e.g. a fake one.
+        :param informer: PodInformer of the cluster pods are selected from
+            instead of listing them.
+        """
+        self.informer = informer
+        self.core_v1 = core_v1 or client.CoreV1Api(api_client)
+        # kubernetes.stream swaps the request method of the ApiClient for
+        # the duration of the call, so execs get their own ApiClient and
+        # are set up one at a time
+        self._exec_core_v1 = core_v1 or client.CoreV1Api(
+            client.ApiClient(self.core_v1.api_client.configuration))
+        self._exec_lock = threading.Lock()
+
+    def iter_pods(self, pods=None, pods_regex=None, label_selector=None,
+                  field_selector=None, page_size=DEFAULT_PAGE_SIZE):
+        """Yields Pod instances of all namespaces based on given criteria.
+        Pods are listed with a single paginated call across all namespaces.
+        Selectors, and the pod name when a single one is given, are applied
+        by the API server, and only the regex is matched locally.
+        :param pods: Names of the pods to return.
+        :param pods_regex: Regex pods' names should match.
+        :param label_selector: Kubernetes label selector, e.g. 'app=api'.
+        :param field_selector: Kubernetes field selector,
+            e.g. 'status.phase=Running'.
+        :param page_size: Number of pods to obtain in every call.
+        """
+        field_selectors = [field_selector] if field_selector else []
+        if pods and len(pods) == 1 and not pods_regex:
+            field_selectors.append(f"metadata.name={pods[0]}")
+        kwargs = {"limit": page_size}
+        if label_selector:
+            kwargs["label_selector"] = label_selector
+        if field_selectors:
+            kwargs["field_selector"] = ",".join(field_selectors)
+        regex = re.compile(pods_regex) if pods_regex else None
+        names = set(pods or [])
+        continue_token = None
+        while True:
+            if continue_token:
+                kwargs["_continue"] = continue_token
+            response = self.core_v1.list_pod_for_all_namespaces(**kwargs)
+            for pod in response.items:
+                name = pod.metadata.name
+                if (not names and not regex) or name in names or \
+                        (regex and regex.match(name)):
+                    yield pod
+            continue_token = response.metadata._continue
+            if not continue_token:
+                break
 
-    def __init__(self):
-        pass
-
-    def get_pods(self, api_instance, pods_names=None, pods_regex=None):
-        """Returns Pod instances based on given criteria."""
-        pods_res = []
-        v1 = client.CoreV1Api()
-        namespaces = v1.list_namespace().items
-        for namespace in namespaces:
-            pods = v1.list_namespaced_pod(namespace.metadata.name).items
-            for pod in pods:
-                if (pod.metadata.name in pods) or \
-                        (pods_regex and re.match(
-                            pods_regex, pod.metadata.name)):
-                    pods_res.append(pod)
-        return pods
+    def get_pods(self, pods=None, pods_regex=None, label_selector=None,
+                 field_selector=None):
+        """Returns Pod instances based on given criteria. See iter_pods."""
+        return list(self.iter_pods(pods=pods, pods_regex=pods_regex,
+                                   label_selector=label_selector,
+                                   field_selector=field_selector))
+
+    def get_pod_index(self, selector: PodSelector = None,
+                      page_size=DEFAULT_PAGE_SIZE) -> PodIndex:
+        """Returns an index of the pods of the cluster, listed with a single
+        paginated call, or kept by the informer.
+        :param selector: If given, the API server applies what it can of
+            it (the label selector, the pod names and a single phase), so
+            only the pods which may be selected are listed.
+        """
+        if self.informer is not None:
+            return self.informer.get_index()
+        selector = selector or PodSelector()
+        # Field selectors can't match one of several values
+        field_selector = None
+        if selector.phases and len(selector.phases) == 1:
+            field_selector = f"status.phase={selector.phases[0]}"
+        return PodIndex(PodRecord.from_pod(pod) for pod in self.iter_pods(
+            pods=None if selector.name_regex else selector.names,
+            label_selector=selector.label_selector,
+            field_selector=field_selector, page_size=page_size))
+
+    def select_pods(self, selector: PodSelector) -> list:
+        """Returns the PodRecords of the pods selected by selector.
+        :raises InvalidSelector: If the label selector can't be parsed.
+        """
+        return self.get_pod_index(selector).select(selector)
 
     def get_namespaces(self):
-        pass
+        """Returns the Namespace instances of the cluster."""
+        return self.core_v1.list_namespace().items
+
+    def exec_pod(self, name, namespace, command, on_output,
+                 container=None) -> int:
+        """Executes a command in a pod through the Kubernetes API, streaming
+        its output line by line.
+        :param name: Name of the pod.
+        :param namespace: Namespace of the pod.
+        :param command: The command and its arguments.
+        :param on_output: Called with the stream name ('stdout' or
+            'stderr') and the line.
+        :param container: Container to execute in. Defaults to the pod's
+            default container.
+        :return: Exit code of the command.
+        """
+        kwargs = {"container": container} if container else {}
+        with self._exec_lock:
+            # The websocket connection uses the token as is, so give the
+            # refresh hook a chance to renew it first
+            self._exec_core_v1.api_client.configuration \
+                .get_api_key_with_prefix('authorization')
+            response = stream(
+                self._exec_core_v1.connect_get_namespaced_pod_exec,
+                name, namespace, command=command, stderr=True, stdin=False,
+                stdout=True, tty=False, _preload_content=False, **kwargs)
+        stdout = LineSplitter('stdout', on_output)
+        stderr = LineSplitter('stderr', on_output)
+        try:
+            while response.is_open():
+                response.update(timeout=EXEC_POLL_TIMEOUT)
+                if response.peek_stdout():
+                    stdout.feed(response.read_stdout())
+                if response.peek_stderr():
+                    stderr.feed(response.read_stderr())
+        finally:
+            response.close()
+        stdout.flush()
+        stderr.flush()
+        return response.returncode
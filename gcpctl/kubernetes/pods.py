@@ -1,3 +1,4 @@
+"""Selection of pods by name, namespace, label, owner and phase"""
 # Copyright 2023 Arie Bregman
 #
 #    Licensed under the Apache License, Version 2.0 (the "License"); you may
@@ -11,3 +12,257 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import random
+import re
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from itertools import zip_longest
+from typing import List, Optional
+
+from gcpctl.exceptions.kubernetes import InvalidSelector
+
+# Operators of label selector requirements. Equality requirements (a=b,
+# a==b, a!=b) are turned into set-based ones (a in (b), a notin (b)).
+IN = 'in'
+NOT_IN = 'notin'
+EXISTS = 'exists'
+NOT_EXISTS = '!'
+
+# Commas separate requirements, except inside the values of a set
+REQUIREMENTS_SEPARATOR = re.compile(r",(?![^(]*\))")
+REQUIREMENT = re.compile(r"""
+    (?P<not>!)?\s*(?P<key>[\w./-]+)\s*
+    (?:
+        (?P<operator>==|=|!=)\s*(?P<value>[\w.-]*)
+        | \s(?P<set_operator>in|notin)\s*\((?P<values>[^)]*)\)
+    )?$""", re.VERBOSE)
+# Label of the pods of a Deployment, the suffix of their ReplicaSet's name
+POD_TEMPLATE_HASH = 'pod-template-hash'
+
+
+@dataclass
+class Requirement():
+    """A single requirement of a label selector."""
+
+    key: str
+    operator: str
+    values: frozenset = frozenset()
+
+    def matches(self, labels) -> bool:
+        """Whether a pod with these labels meets the requirement."""
+        if self.operator == IN:
+            return labels.get(self.key) in self.values
+        if self.operator == NOT_IN:
+            return labels.get(self.key) not in self.values
+        if self.operator == EXISTS:
+            return self.key in labels
+        return self.key not in labels
+
+
+def parse_label_selector(selector: str) -> List[Requirement]:
+    """Parses a Kubernetes label selector, e.g. 'app=api,tier in (web)'.
+    :raises InvalidSelector: If the selector can't be parsed.
+    """
+    requirements = []
+    for text in REQUIREMENTS_SEPARATOR.split(selector):
+        match = REQUIREMENT.match(text.strip())
+        if not match:
+            raise InvalidSelector(selector, f"can't parse '{text.strip()}'")
+        key = match.group('key')
+        if match.group('not'):
+            if match.group('operator') or match.group('set_operator'):
+                raise InvalidSelector(selector, f"'!{key}' takes no values")
+            requirements.append(Requirement(key, NOT_EXISTS))
+        elif match.group('operator'):
+            requirements.append(Requirement(
+                key, NOT_IN if match.group('operator') == '!=' else IN,
+                frozenset([match.group('value')])))
+        elif match.group('set_operator'):
+            requirements.append(Requirement(
+                key, match.group('set_operator'),
+                frozenset(value.strip() for value
+                          in match.group('values').split(','))))
+        else:
+            requirements.append(Requirement(key, EXISTS))
+    return requirements
+
+
+def get_owner(pod):
+    """Returns the (kind, name) of the workload a pod belongs to, or None
+    if it belongs to none. Pods of a Deployment are owned by one of its
+    ReplicaSets, named after the Deployment and the pod-template-hash
+    label, so they are reported as owned by the Deployment.
+    """
+    references = pod.metadata.owner_references or []
+    # The controller, if any of the owners is marked as one
+    reference = next((reference for reference in references
+                      if getattr(reference, 'controller', None)),
+                     references[0] if references else None)
+    if reference is None:
+        return None
+    template_hash = (pod.metadata.labels or {}).get(POD_TEMPLATE_HASH)
+    if reference.kind == 'ReplicaSet' and template_hash and \
+            reference.name.endswith(f"-{template_hash}"):
+        return 'Deployment', reference.name[:-len(template_hash) - 1]
+    return reference.kind, reference.name
+
+
+def _intern(value):
+    """Interns strings, so the many pods with the same namespace, phase or
+    labels share them."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class PodRecord():
+    """What gcpctl needs of a pod. Much smaller than a V1Pod, so the pods of
+    many clusters can be kept in memory."""
+
+    __slots__ = ('name', 'namespace', 'labels', 'phase', 'owner')
+
+    def __init__(self, name, namespace, labels=None, phase=None,
+                 owner=None) -> None:
+        """Constructor.
+        :param labels: The labels of the pod, by key.
+        :param phase: The phase of the pod, e.g. Running.
+        :param owner: (kind, name) of the workload the pod belongs to, see
+            get_owner.
+        """
+        self.name = name
+        self.namespace = namespace
+        self.labels = labels or {}
+        self.phase = phase
+        self.owner = owner
+
+    @classmethod
+    def from_pod(cls, pod) -> 'PodRecord':
+        """Returns the record of a V1Pod."""
+        owner = get_owner(pod)
+        return cls(
+            name=pod.metadata.name,
+            namespace=_intern(pod.metadata.namespace),
+            labels={_intern(key): _intern(value) for key, value
+                    in (pod.metadata.labels or {}).items()},
+            phase=_intern(pod.status.phase) if pod.status else None,
+            owner=(_intern(owner[0]), owner[1]) if owner else None)
+
+    def __repr__(self) -> str:
+        return f"PodRecord({self.namespace}/{self.name})"
+
+
+@dataclass
+class PodSelector():
+    """What pods are selected by. Pods have to meet all the criteria which
+    are set."""
+
+    # Names of the pods
+    names: Optional[List[str]] = None
+    # Regex the names of the pods should match
+    name_regex: Optional[str] = None
+    namespaces: Optional[List[str]] = None
+    # Kubernetes label selector, e.g. 'app=api,tier!=cache'
+    label_selector: Optional[str] = None
+    # Phases of the pods, e.g. Running
+    phases: Optional[List[str]] = None
+    # Only one pod of every workload (e.g. Deployment), a Running one if
+    # possible. Pods belonging to no workload are all kept.
+    one_per_owner: bool = False
+    # Number of pods picked at random among the selected ones, spread over
+    # their workloads
+    sample: Optional[int] = None
+    # Seed of the random pick, for reproducible samples
+    seed: Optional[int] = None
+
+
+class PodIndex():
+    """In-memory index of the pods of a cluster by namespace, label, owner
+    and phase, built from a single listing. Selecting pods intersects the
+    sets of pods of the index instead of matching every pod.
+    """
+
+    def __init__(self, records) -> None:
+        """Constructor.
+        :param records: PodRecord of every pod.
+        """
+        self.pods = list(records)
+        self.by_namespace = defaultdict(set)
+        self.by_label = defaultdict(set)
+        self.by_phase = defaultdict(set)
+        self.owners = []
+        for position, pod in enumerate(self.pods):
+            self.by_namespace[pod.namespace].add(position)
+            for label in pod.labels.items():
+                self.by_label[label].add(position)
+            self.by_phase[pod.phase].add(position)
+            # A pod without an owner is a workload of its own
+            self.owners.append(
+                (pod.namespace, *pod.owner) if pod.owner else
+                (pod.namespace, 'Pod', pod.name))
+
+    def __len__(self) -> int:
+        return len(self.pods)
+
+    @staticmethod
+    def _union(index, keys):
+        return set().union(*(index.get(key, ()) for key in keys))
+
+    def select(self, selector: PodSelector) -> list:
+        """Returns the PodRecords selected by selector, in the order they
+        were listed.
+        :raises InvalidSelector: If the label selector can't be parsed.
+        """
+        candidates = set(range(len(self.pods)))
+        if selector.namespaces:
+            candidates &= self._union(self.by_namespace, selector.namespaces)
+        if selector.phases:
+            candidates &= self._union(self.by_phase, selector.phases)
+        requirements = parse_label_selector(selector.label_selector) \
+            if selector.label_selector else []
+        for requirement in requirements:
+            if requirement.operator == IN:
+                candidates &= self._union(
+                    self.by_label, [(requirement.key, value)
+                                    for value in requirement.values])
+        positions = []
+        names = set(selector.names or [])
+        regex = re.compile(selector.name_regex) \
+            if selector.name_regex else None
+        for position in sorted(candidates):
+            pod = self.pods[position]
+            if (names or regex) and pod.name not in names and \
+                    not (regex and regex.match(pod.name)):
+                continue
+            if all(requirement.matches(pod.labels)
+                   for requirement in requirements):
+                positions.append(position)
+        if selector.one_per_owner:
+            positions = self._one_per_owner(positions)
+        if selector.sample is not None and selector.sample < len(positions):
+            positions = sorted(self._sample(positions, selector.sample,
+                                            random.Random(selector.seed)))
+        return [self.pods[position] for position in positions]
+
+    def _one_per_owner(self, positions):
+        """Keeps the first pod of every owner, preferring Running pods."""
+        running = self.by_phase.get('Running', set())
+        chosen = {}
+        for position in positions:
+            owner = self.owners[position]
+            if owner not in chosen or (chosen[owner] not in running and
+                                       position in running):
+                chosen[owner] = position
+        return sorted(chosen.values())
+
+    def _sample(self, positions, count, rng):
+        """Picks count of the positions at random, taking a pod of every
+        owner before taking a second one of any."""
+        groups = defaultdict(list)
+        for position in positions:
+            groups[self.owners[position]].append(position)
+        groups = list(groups.values())
+        rng.shuffle(groups)
+        for group in groups:
+            rng.shuffle(group)
+        picked = [position for positions_round in zip_longest(*groups)
+                  for position in positions_round if position is not None]
+        return picked[:count]
@@ -0,0 +1,125 @@
+"""Pool of Kubernetes clients of GKE clusters."""
+# Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import logging
+import threading
+import time
+
+from gcpctl.kubernetes.config import load_kubeconfig, new_client
+from gcpctl.kubernetes.credentials import GKECredentials, new_cluster_client
+from gcpctl.kubernetes.kubeconfig import get_context
+
+LOG = logging.getLogger(__name__)
+
+# Seconds a client may stay unused before it is closed
+DEFAULT_IDLE_TIMEOUT = 10 * 60
+
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+class ClusterClientPool():
+    """Keeps one Kubernetes ApiClient per GKE cluster, so its HTTP
+    connections are reused across calls. Clients which weren't used for
+    idle_timeout seconds are closed.
+    Clusters whose endpoint is known get a client built directly from it,
+    authenticated with Google credentials. Others fall back to their
+    kubeconfig context, and the kubeconfig is parsed only once for all of
+    them.
+    """
+
+    def __init__(self, idle_timeout=DEFAULT_IDLE_TIMEOUT,
+                 pool_maxsize=None, credentials=None) -> None:
+        """Constructor.
+        :param idle_timeout: Seconds a client may stay unused.
+        :param pool_maxsize: Maximum number of HTTP connections every client
+            keeps open. Defaults to the kubernetes library default.
+        :param credentials: GKECredentials to authenticate with. Defaults to
+            the application default credentials.
+        """
+        self.idle_timeout = idle_timeout
+        self.pool_maxsize = pool_maxsize
+        self._credentials = credentials
+        self._kubeconfig = None
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    @property
+    def kubeconfig(self):
+        """The parsed kubeconfig, loaded on first use."""
+        with self._lock:
+            if self._kubeconfig is None:
+                self._kubeconfig = load_kubeconfig()
+            return self._kubeconfig
+
+    @property
+    def credentials(self) -> GKECredentials:
+        """The Google credentials, resolved on first use."""
+        with self._lock:
+            if self._credentials is None:
+                self._credentials = GKECredentials()
+            return self._credentials
+
+    def _new_client(self, cluster):
+        if cluster.endpoint and cluster.ca_certificate:
+            return new_cluster_client(cluster, self.credentials,
+                                      pool_maxsize=self.pool_maxsize)
+        return new_client(cluster, kubeconfig=self.kubeconfig,
+                          pool_maxsize=self.pool_maxsize)
+
+    def _evict_idle(self, now) -> None:
+        for key, (api_client, last_used) in list(self._clients.items()):
+            if now - last_used > self.idle_timeout:
+                LOG.debug("Closing idle client of %s", key)
+                del self._clients[key]
+                api_client.close()
+
+    def get(self, cluster):
+        """Returns the ApiClient of the cluster, creating it if needed."""
+        key = get_context(cluster)
+        with self._lock:
+            now = time.monotonic()
+            self._evict_idle(now)
+            if key in self._clients:
+                api_client, _ = self._clients[key]
+                self._clients[key] = (api_client, now)
+                return api_client
+        api_client = self._new_client(cluster)
+        with self._lock:
+            if key in self._clients:
+                # Created concurrently by another thread
+                api_client.close()
+                api_client = self._clients[key][0]
+            self._clients[key] = (api_client, time.monotonic())
+        return api_client
+
+    def close(self) -> None:
+        """Closes all the clients."""
+        with self._lock:
+            for api_client, _ in self._clients.values():
+                api_client.close()
+            self._clients.clear()
+
+
+def get_client_pool(pool_maxsize=None) -> ClusterClientPool:
+    """Returns the clients pool shared by the whole process, so the commands
+    of a shell or serve session reuse the clients of each other.
+    :param pool_maxsize: See ClusterClientPool. Every value gets its own
+        pool.
+    """
+    with _POOLS_LOCK:
+        if pool_maxsize not in _POOLS:
+            _POOLS[pool_maxsize] = ClusterClientPool(
+                pool_maxsize=pool_maxsize)
+        return _POOLS[pool_maxsize]
@@ -13,8 +13,262 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 """
+import csv
+import io
+import json
+import queue
+import sys
+import threading
+
+from gcpctl.exceptions.cli import UnknownColumns
 from gcpctl.utils.colors import BCOLORS
 
+OUTPUT_FORMATS = ('table', 'json', 'jsonl', 'csv', 'yaml')
+# Size of the buffer used when the output is not a terminal
+OUTPUT_BUFFER_SIZE = 1 << 16
+# Number of rows the widths of the table columns are computed from
+DEFAULT_LOOKAHEAD = 100
+COLUMN_SEPARATOR = "  "
+# Prefixes of the lines of a tree: of a node which has siblings below it,
+# of the last one, and of their descendants
+TREE_BRANCH = "├── "
+TREE_LAST = "└── "
+TREE_PIPE = "│   "
+TREE_SPACE = "    "
+YAML_BATCH_SIZE = 100
+
+
+def get_field_name(header: str) -> str:
+    """Returns the name of the field of a column in machine readable
+    formats, e.g. 'Project ID' -> 'project_id'."""
+    return header.lower().replace(' ', '_')
+
+
+def select_columns(headers, columns):
+    """Returns the indexes of the selected columns.
+    :param headers: The headers of the columns.
+    :param columns: Names of the columns to keep, as given by
+        get_field_name, e.g. ['project_id', 'parent'].
+    :raises UnknownColumns: If any column is not in the headers.
+    """
+    fields = [get_field_name(header) for header in headers]
+    unknown = [column for column in columns if column not in fields]
+    if unknown:
+        raise UnknownColumns(unknown, fields)
+    return [fields.index(column) for column in columns]
+
+
+class RowWriter():
+    """Base class of the writers of the output formats. A writer is created
+    per table and writes rows one at a time."""
+
+    def __init__(self, headers, stream) -> None:
+        self.headers = headers
+        self.fields = [get_field_name(header) for header in headers]
+        self.stream = stream
+
+    def open(self) -> None:
+        """Writes whatever comes before the first row."""
+
+    def write_row(self, row) -> None:
+        """Writes a single row."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Writes whatever comes after the last row."""
+
+
+class TableWriter(RowWriter):
+    """Aligned columns, with colored headers.
+
+    The width of every column is computed from the first rows (the
+    look-ahead window), which are held back until the window is full or the
+    table ends. The following rows are written as they arrive; a longer
+    value in one of them shifts the rest of its line instead of being cut.
+    """
+
+    def __init__(self, headers, stream, lookahead=DEFAULT_LOOKAHEAD,
+                 sub_header="=====", color=BCOLORS['GREEN']) -> None:
+        """
+        :param lookahead: Number of rows to compute the widths from. If
+            None or 0, all the rows are held back and the widths fit them.
+        """
+        super().__init__(headers, stream)
+        self.lookahead = lookahead or None
+        self.sub_header = sub_header
+        self.color = color
+        self.pending = []
+        self.row_format = None
+
+    def write_row(self, row) -> None:
+        if self.row_format is not None:
+            self.stream.write(self.row_format.format(*row))
+            return
+        self.pending.append([str(item) for item in row])
+        if self.lookahead and len(self.pending) >= self.lookahead:
+            self._write_pending()
+
+    def close(self) -> None:
+        if self.row_format is None:
+            self._write_pending()
+
+    def _write_pending(self) -> None:
+        """Compiles the row format from the held back rows and writes them,
+        preceded by the headers."""
+        widths = [max(len(header), len(self.sub_header))
+                  for header in self.headers]
+        for row in self.pending:
+            widths = [max(width, len(item))
+                      for width, item in zip(widths, row)]
+        # The last column isn't padded, no point in trailing spaces
+        self.row_format = COLUMN_SEPARATOR.join(
+            ["{!s: <" + str(width) + "}" for width in widths[:-1]]
+            + ["{!s}"]) + "\n"
+        headers = (self.row_format.format(*self.headers)
+                   + self.row_format.format(
+                       *[self.sub_header for _ in self.headers]))
+        # Reset the color before the last new line, not after it
+        self.stream.write(self.color + headers[:-1] + BCOLORS['ENDC'] + "\n")
+        self.stream.writelines(self.row_format.format(*row)
+                               for row in self.pending)
+        self.pending = []
+
+
+class JSONLinesWriter(RowWriter):
+    """An object per line."""
+
+    def write_row(self, row) -> None:
+        self.stream.write(json.dumps(dict(zip(self.fields, row))) + "\n")
+
+
+class JSONWriter(RowWriter):
+    """A single array of objects, written as the rows arrive."""
+
+    def __init__(self, headers, stream) -> None:
+        super().__init__(headers, stream)
+        self.separator = "\n"
+
+    def open(self) -> None:
+        self.stream.write("[")
+
+    def write_row(self, row) -> None:
+        self.stream.write(self.separator
+                          + json.dumps(dict(zip(self.fields, row))))
+        self.separator = ",\n"
+
+    def close(self) -> None:
+        self.stream.write("\n]\n")
+
+
+class CSVWriter(RowWriter):
+    """Comma separated values, with a header line."""
+
+    def __init__(self, headers, stream) -> None:
+        super().__init__(headers, stream)
+        self.writer = csv.writer(stream, lineterminator="\n")
+
+    def open(self) -> None:
+        self.writer.writerow(self.fields)
+
+    def write_row(self, row) -> None:
+        self.writer.writerow(row)
+
+
+class YAMLWriter(RowWriter):
+    """A single list of mappings, written in batches of rows since setting
+    up a YAML dump costs far more than dumping a row."""
+
+    def __init__(self, headers, stream) -> None:
+        super().__init__(headers, stream)
+        # Imported here as loading it is a noticeable part of the startup
+        # pylint: disable=import-outside-toplevel
+        import yaml
+        self.yaml = yaml
+        # libyaml's dumper, when PyYAML was built with it, is several times
+        # faster
+        self.dumper = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+        self.batch = []
+
+    def write_row(self, row) -> None:
+        self.batch.append(dict(zip(self.fields, row)))
+        if len(self.batch) >= YAML_BATCH_SIZE:
+            self._write_batch()
+
+    def close(self) -> None:
+        if self.batch:
+            self._write_batch()
+
+    def _write_batch(self) -> None:
+        self.yaml.dump(self.batch, self.stream, Dumper=self.dumper,
+                       sort_keys=False)
+        self.batch = []
+
+
+WRITERS = {
+    'table': TableWriter,
+    'json': JSONWriter,
+    'jsonl': JSONLinesWriter,
+    'csv': CSVWriter,
+    'yaml': YAMLWriter,
+}
+
+
+def read_ahead(rows, on_wait):
+    """Yields the rows, which a thread obtains ahead of the caller, and
+    calls on_wait() whenever the next one isn't obtained yet, e.g. while
+    the next page of a listing is requested. An exception raised by the
+    rows is raised after the rows obtained before it.
+    """
+    ready = queue.SimpleQueue()
+    stop = threading.Event()
+    done = object()
+
+    def read():
+        try:
+            for row in rows:
+                ready.put(row)
+                if stop.is_set():
+                    return
+        except BaseException as ex:  # pylint: disable=broad-except
+            ready.put(ex)
+        ready.put(done)
+
+    threading.Thread(target=read, daemon=True).start()
+    try:
+        while True:
+            try:
+                row = ready.get_nowait()
+            except queue.Empty:
+                on_wait()
+                row = ready.get()
+            if row is done:
+                return
+            if isinstance(row, BaseException):
+                raise row
+            yield row
+    finally:
+        # The caller may stop early, e.g. on a closed pipe, don't keep
+        # obtaining rows nobody will print
+        stop.set()
+
+
+def open_output_stream():
+    """Returns the stream tables are written to. On a terminal that is
+    stdout itself, so rows show up as soon as they are written. Otherwise
+    (e.g. a pipe or a file), writes to stdout go through a large buffer,
+    which Printer.print_table flushes whenever it waits for the next rows
+    unless it sorts them.
+    """
+    sys.stdout.flush()
+    if sys.stdout.isatty():
+        return sys.stdout
+    try:
+        return open(sys.stdout.fileno(), 'w', buffering=OUTPUT_BUFFER_SIZE,
+                    encoding=sys.stdout.encoding, closefd=False)
+    except (AttributeError, io.UnsupportedOperation, OSError):
+        # stdout was replaced with something without a file descriptor
+        return sys.stdout
+
 
 class Printer():
     """Responsible for printing out items in certain form and color."""
@@ -38,3 +292,89 @@ class Printer():
         fill_args = [fill for _ in items]
         format_str = " ".join("{: <" + str(f) + "}" for f in fill_args)
         return format_str.format(*items)
+
+    @staticmethod
+    def print_table(headers, rows, sort=False, output='table', stream=None,
+                    columns=None, lookahead=DEFAULT_LOOKAHEAD):
+        """Prints the headers and then every row as soon as it is obtained,
+        so rows of a paginated listing show up as each page arrives. The
+        output is flushed only while waiting for the next rows, not after
+        every one of them.
+        :param headers: The headers of the columns.
+        :param rows: Iterable of rows, each one a list of items.
+        :param sort: If True, all the rows are obtained first and printed
+            sorted by their columns, left to right.
+        :param output: One of OUTPUT_FORMATS.
+        :param stream: Where to write to. Defaults to stdout.
+        :param columns: Names of the columns to print, in order. Defaults
+            to all of them.
+        :param lookahead: Number of rows the widths of the columns of a
+            table are computed from. If None or 0, from all of them.
+        :return: Number of printed rows.
+        :raises UnknownColumns: If a selected column is not in the headers.
+        """
+        if columns:
+            indexes = select_columns(headers, columns)
+            headers = [headers[index] for index in indexes]
+            rows = ([row[index] for index in indexes] for row in rows)
+        if sort:
+            rows = sorted(rows, key=lambda row: [str(item) for item in row])
+            # All the rows are in memory already
+            lookahead = None
+        own_stream = stream is None
+        if own_stream:
+            stream = open_output_stream()
+        if not isinstance(rows, (list, tuple)):
+            # Rows arrive as the pages of listings do, e.g. a consumer of
+            # the pipe shouldn't wait for the last one
+            rows = read_ahead(rows, stream.flush)
+        if output == 'table':
+            writer = TableWriter(headers, stream, lookahead=lookahead)
+        else:
+            writer = WRITERS[output](headers, stream)
+        count = 0
+        try:
+            writer.open()
+            for row in rows:
+                writer.write_row(row)
+                count += 1
+            writer.close()
+        finally:
+            stream.flush()
+            if own_stream and stream is not sys.stdout:
+                stream.close()
+        return count
+
+    @staticmethod
+    def print_tree(roots, children, labels, stream=None):
+        """Prints trees of labeled nodes, e.g.
+        folders/1
+        ├── Engineering
+        │   └── Platform
+        └── Sales
+        :param roots: Keys of the root nodes, in order.
+        :param children: Keys of the children of every node, in order, by
+            the node's key. Leaves can be missing.
+        :param labels: Label of every node, by its key.
+        :param stream: Where to write to. Defaults to stdout.
+        """
+        stream = stream or sys.stdout
+        # Nodes left to print, with the prefix of their line and the one of
+        # their children's lines. Iterative, trees can be deep.
+        stack = []
+
+        def push(nodes, indent):
+            for index, node in reversed(list(enumerate(nodes))):
+                last = index == len(nodes) - 1
+                stack.append((node,
+                              indent + (TREE_LAST if last else TREE_BRANCH),
+                              indent + (TREE_SPACE if last else TREE_PIPE)))
+
+        for root in roots:
+            stream.write(f"{labels[root]}\n")
+            push(children.get(root, []), "")
+            while stack:
+                node, prefix, indent = stack.pop()
+                stream.write(f"{prefix}{labels[node]}\n")
+                push(children.get(node, []), indent)
+        stream.flush()
@@ -14,10 +14,7 @@
 #    under the License.
 import logging
 
-from google.cloud import resourcemanager_v3
-from google.api_core.exceptions import PermissionDenied
-
-from gcpctl.utils.colors import BCOLORS
+from gcpctl.discovery.backend import get_backend
 from gcpctl.printer import Printer
 
 LOG = logging.getLogger(__name__)
@@ -26,32 +23,38 @@ LOG = logging.getLogger(__name__)
 class ProjectManager():
     """Manages GCP operations related to projects."""
 
-    def __init__(self, folder_ids=None) -> None:
-        self.client = resourcemanager_v3.ProjectsClient()
+    def __init__(self, folder_ids=None, recursive=False,
+                 backend=None) -> None:
         self.folder_ids = folder_ids
+        self.recursive = recursive
+        self._backend = backend
         super().__init__()
 
+    @property
+    def backend(self):
+        """The discovery backend, created on first use."""
+        if self._backend is None:
+            self._backend = get_backend()
+        return self._backend
+
+    def iter_projects(self):
+        """Yields the projects of the folders as soon as they are found.
+        When recursive, projects of sub-folders (at any depth) are included.
+        """
+        yield from self.backend.get_projects(self.folder_ids,
+                                             recursive=self.recursive)
+
     def get_projects(self):
-        projects = []
-        for folder_id in self.folder_ids:
-            request = resourcemanager_v3.ListProjectsRequest(
-                parent=f"folders/{folder_id}")
-            try:
-                projects.extend([project for project in
-                                self.client.list_projects(request=request)])
-            except PermissionDenied:
-                if folder_id:
-                    msg = "folder %s" % folder_id
-                else:
-                    msg = "root project"
-                LOG.error("%sNo permissions to access %s%s",
-                          BCOLORS['RED'], msg, BCOLORS['ENDC'])
-        return projects
-
-    def list(self):
-        """List projects."""
-        projects = self.get_projects()
-        Printer.print_headers(["Project", "Parent", "Project ID"])
-        for project in projects:
-            print(Printer.get_row_str([project.display_name, project.parent,
-                                       project.project_id]))
+        """Returns the projects of the folders."""
+        return list(self.iter_projects())
+
+    def list(self, sort=False, **output_options):
+        """List projects.
+        :param sort: Print the projects sorted instead of as they arrive.
+        :param output_options: Passed to Printer.print_table, e.g. output.
+        """
+        Printer.print_table(
+            ["Project", "Parent", "Project ID"],
+            ([project.display_name, project.parent, project.project_id]
+             for project in self.iter_projects()),
+            sort=sort, **output_options)
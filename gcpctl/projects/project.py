@@ -0,0 +1,33 @@
+"""GCP Project Class."""
+# Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+from dataclasses import dataclass
+
+from gcpctl.printer import Printer
+
+
+@dataclass
+class GCPProject():
+    """Represents GCP project."""
+
+    display_name: str
+    parent: str
+    project_id: str
+    # Change the API reports on every update of the project
+    etag: str = ""
+    update_time: str = ""
+
+    def __str__(self):
+        return Printer.get_row_str([self.display_name, self.parent,
+                                    self.project_id])
@@ -0,0 +1,291 @@
+"""On-disk cache of API listings."""
+# Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import contextlib
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, Iterator, List, Optional
+
+LOG = logging.getLogger(__name__)
+
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache/gcpctl')
+
+# Time, in seconds, listings of each type of resource are considered fresh
+DEFAULT_TTLS = {
+    'folders': 6 * 60 * 60,
+    'projects': 60 * 60,
+    'clusters': 10 * 60,
+}
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+
+class MemoryLayer():
+    """Entries of listings caches kept in memory, up to max_size bytes,
+    evicting the least recently used ones. Every entry is kept along with
+    the version of its file, see get_version, so an entry rewritten since it
+    was read (e.g. by --refresh or another gcpctl process) is read again.
+    Caches of the same directory can share a layer.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE) -> None:
+        self.max_size = max_size
+        # Entry path -> (entry, size, version), least recently used first
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, path: str, version: tuple):
+        """Returns the entry of path as (entry, size) if its file wasn't
+        modified since, None otherwise.
+        :param version: Current version of the file.
+        """
+        with self._lock:
+            if path not in self._entries:
+                return None
+            entry, size, entry_version = self._entries[path]
+            if entry_version != version:
+                self._size -= size
+                del self._entries[path]
+                return None
+            self._entries.move_to_end(path)
+            return entry, size
+
+    def put(self, path: str, entry: dict, size: int,
+            version: tuple) -> None:
+        """Keeps the entry of path, read from or written to the given
+        version of its file."""
+        with self._lock:
+            if path in self._entries:
+                self._size -= self._entries.pop(path)[1]
+            self._entries[path] = (entry, size, version)
+            self._size += size
+            while self._size > self.max_size:
+                self._size -= self._entries.popitem(last=False)[1][1]
+
+    def discard(self, path: str) -> None:
+        """Forgets the entry of path, if any."""
+        with self._lock:
+            if path in self._entries:
+                self._size -= self._entries.pop(path)[1]
+
+
+def get_version(path: str) -> tuple:
+    """Returns what identifies the current content of a file: entries are
+    replaced by new files and touched when used, so its inode number and
+    modification time."""
+    stat = os.stat(path)
+    return stat.st_ino, stat.st_mtime_ns
+
+
+class ListingCache():
+    """Persistent cache of API listings, keyed by account, API method and
+    parent.
+    Every entry is stored in its own file under the cache directory. Entries
+    expire based on the TTL of their resource type and, once the directory
+    grows beyond max_size, the least recently used entries are evicted.
+    Entries read or written are also kept in a MemoryLayer, so a long
+    running process (gcpctl shell or serve) reads every entry from disk only
+    once.
+    """
+
+    def __init__(self, path: str = CACHE_DIR, ttls: Optional[dict] = None,
+                 max_size: int = DEFAULT_MAX_SIZE, enabled: bool = True,
+                 refresh: bool = False, memory: Optional[MemoryLayer] = None,
+                 account: str = '') -> None:
+        """Constructor.
+        :param path: Directory where entries are stored.
+        :param ttls: Time to live, in seconds, per resource type. Merged
+            with DEFAULT_TTLS.
+        :param max_size: Maximum size, in bytes, of the cache directory.
+        :param enabled: When False, nothing is read from or written to disk.
+        :param refresh: When True, existing entries are ignored but new
+            results are still written.
+        :param memory: MemoryLayer shared with other caches of path.
+            Defaults to one of up to max_size.
+        :param account: The account listing the resources, as what it can
+            see differs from what other accounts can.
+        """
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.max_size = max_size
+        self.enabled = enabled
+        self.refresh = refresh
+        self.account = account
+        # Approximate size of the cache directory, so it doesn't have to be
+        # scanned after every write
+        self._size = None
+        self.memory = memory or MemoryLayer(max_size)
+        self._lock = threading.Lock()
+
+    def _entry_path(self, method: str, parent: str) -> str:
+        key = f"{self.account}:{method}:{parent}".encode('utf-8')
+        return os.path.join(self.path, hashlib.sha256(key).hexdigest())
+
+    def get(self, resource: str, method: str, parent: str):
+        """Returns the cached items of method+parent, or None if there is
+        no fresh entry.
+        """
+        if not self.enabled or self.refresh:
+            return None
+        path = self._entry_path(method, parent)
+        try:
+            remembered = self.memory.get(path, get_version(path))
+        except OSError:
+            self.memory.discard(path)
+            return None
+        if remembered is None:
+            try:
+                with open(path, 'rb') as buffer:
+                    entry = pickle.load(buffer)
+                    size = buffer.tell()
+            except FileNotFoundError:
+                return None
+            except (OSError, pickle.UnpicklingError, EOFError) as ex:
+                LOG.debug("Ignoring unreadable cache entry %s: %s", path,
+                          ex)
+                return None
+        else:
+            entry, size = remembered
+        if time.time() - entry['created'] > self.ttls[resource]:
+            LOG.debug("Cache entry of %s %s expired", method, parent)
+            self.memory.discard(path)
+            return None
+        try:
+            # Access time is not reliable (noatime mounts), so the
+            # modification time is used to track the last use of an entry
+            os.utime(path)
+            self.memory.put(path, entry, size, get_version(path))
+        except FileNotFoundError:
+            self.memory.discard(path)
+        return entry['items']
+
+    def set(self, method: str, parent: str, items: List) -> None:
+        """Stores the items of method+parent. An entry which can't be
+        written, e.g. to a read-only or full disk, is only logged, as the
+        items were listed anyway."""
+        if not self.enabled:
+            return
+        entry = {'method': method, 'parent': parent,
+                 'created': time.time(), 'items': items}
+        path = self._entry_path(method, parent)
+        tmp_path = None
+        try:
+            os.makedirs(self.path, mode=0o700, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=self.path, delete=False,
+                                             suffix='.tmp') as buffer:
+                tmp_path = buffer.name
+                pickle.dump(entry, buffer, protocol=pickle.HIGHEST_PROTOCOL)
+                size = buffer.tell()
+            try:
+                replaced_size = os.stat(path).st_size
+            except FileNotFoundError:
+                replaced_size = 0
+            os.replace(tmp_path, path)
+            tmp_path = None
+            self.memory.put(path, entry, size, get_version(path))
+            with self._lock:
+                if self._size is None:
+                    self._size = self._scan()[1]
+                else:
+                    self._size += size - replaced_size
+                if self._size > self.max_size:
+                    self.evict()
+        except OSError as ex:
+            LOG.debug("Failed to cache %s of %s: %s", method, parent, ex)
+            if tmp_path is not None:
+                with contextlib.suppress(OSError):
+                    os.remove(tmp_path)
+
+    def fetch_pages(self, resource: str, method: str, parent: str,
+                    func: Callable[[], Iterable[List]],
+                    message_class=None) -> Iterator[List]:
+        """Yields the pages of items of method+parent. When there is no
+        fresh cached entry, func is called to obtain the pages, which are
+        yielded as soon as they arrive and cached once all of them did.
+        :param resource: Type of the listed resource, used to pick the TTL.
+        :param method: Name of the API method.
+        :param parent: The parent the resources are listed under.
+        :param func: Called with no arguments to obtain the pages.
+        :param message_class: If the items are protobuf messages, their
+            class. They are stored in their serialized form.
+        :return: Iterator over pages (lists) of items. A cached entry is a
+            single page.
+        """
+        if not self.enabled:
+            yield from func()
+            return
+        items = self.get(resource, method, parent)
+        if items is not None:
+            LOG.debug("Using cached %s of %s", method, parent)
+            if message_class:
+                items = [message_class.deserialize(item) for item in items]
+            yield items
+            return
+        items = []
+        for page in func():
+            page = list(page)
+            items.extend(page)
+            yield page
+        if message_class:
+            items = [message_class.serialize(item) for item in items]
+        self.set(method, parent, items)
+
+    def fetch(self, resource: str, method: str, parent: str,
+              func: Callable[[], Iterable], message_class=None) -> List:
+        """Returns the items of method+parent, calling func to obtain them
+        if there is no fresh cached entry. See fetch_pages.
+        """
+        return [item for page in self.fetch_pages(
+            resource, method, parent, lambda: [func()],
+            message_class=message_class) for item in page]
+
+    def _scan(self):
+        """Returns the entries of the cache directory as (mtime, size, path)
+        tuples along with their total size.
+        """
+        entries = []
+        total_size = 0
+        with os.scandir(self.path) as scan:
+            for dir_entry in scan:
+                try:
+                    stat = dir_entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, dir_entry.path))
+                total_size += stat.st_size
+        return entries, total_size
+
+    def evict(self) -> None:
+        """Removes the least recently used entries until the size of the
+        cache directory is within max_size.
+        """
+        entries, total_size = self._scan()
+        self._size = total_size
+        if total_size <= self.max_size:
+            return
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+            self._size = total_size
+            if total_size <= self.max_size:
+                break
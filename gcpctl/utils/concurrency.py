@@ -0,0 +1,136 @@
+"""Concurrency related utils."""
+# Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+DEFAULT_PARALLELISM = 16
+
+
+@dataclass
+class FanOutResult():
+    """The outcome of calling a function with a single item."""
+
+    item: Any
+    value: Any = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        """Whether the call completed without raising an exception."""
+        return self.error is None
+
+
+def _call(func: Callable, item: Any) -> FanOutResult:
+    """Calls func with item, capturing the exception if one is raised
+    so a single failure doesn't abort the whole fan-out.
+    """
+    try:
+        return FanOutResult(item=item, value=func(item))
+    except Exception as ex:  # pylint: disable=broad-except
+        return FanOutResult(item=item, error=ex)
+
+
+def fan_out(func: Callable, items: Iterable,
+            parallelism: int = DEFAULT_PARALLELISM) -> Iterator[FanOutResult]:
+    """Calls func with each one of the items using a bounded pool of
+    threads. Results are yielded in the same order as the items, as soon
+    as each of them (and all the ones before it) is ready.
+    The items are consumed by a thread of their own, so when they come from
+    a listing still in progress (e.g. the projects of a folders walk), func
+    is called with every item as soon as it arrives.
+    :param func: Function accepting a single item.
+    :param items: The items to call the function with.
+    :param parallelism: Maximum number of concurrent calls.
+    :return: Iterator over the results, in input order. An exception raised
+        by the items is raised after the results of the items before it.
+    """
+    futures = queue.Queue()
+    stop = threading.Event()
+    done = object()
+    executor = ThreadPoolExecutor(max_workers=max(1, parallelism))
+
+    def feed():
+        try:
+            for item in items:
+                if stop.is_set():
+                    return
+                futures.put(executor.submit(_call, func, item))
+        except Exception as ex:  # pylint: disable=broad-except
+            futures.put(ex)
+        futures.put(done)
+
+    threading.Thread(target=feed, daemon=True).start()
+    try:
+        while True:
+            future = futures.get()
+            if future is done:
+                return
+            if isinstance(future, Exception):
+                raise future
+            yield future.result()
+    finally:
+        # The caller may stop consuming early, don't wait for calls
+        # nobody is interested in anymore
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def fan_out_pages(func: Callable, items: Iterable,
+                  parallelism: int = DEFAULT_PARALLELISM,
+                  ) -> Iterator[FanOutResult]:
+    """Like fan_out, but func returns an iterable of pages (e.g. of an API
+    listing) and every page is yielded as its own result as soon as it
+    arrives, regardless of the item it belongs to. A failure is yielded as a
+    result with the error set, after the pages obtained before it.
+    :param func: Function accepting a single item and returning pages.
+    :param items: The items to call the function with.
+    :param parallelism: Maximum number of concurrent calls.
+    :return: Iterator over the results, in order of arrival.
+    """
+    items = list(items)
+    if not items:
+        return
+    results = queue.Queue()
+    stop = threading.Event()
+    done = object()
+
+    def produce(item):
+        try:
+            for page in func(item):
+                if stop.is_set():
+                    break
+                results.put(FanOutResult(item=item, value=page))
+        except Exception as ex:  # pylint: disable=broad-except
+            results.put(FanOutResult(item=item, error=ex))
+        results.put(done)
+
+    executor = ThreadPoolExecutor(
+        max_workers=max(1, min(parallelism, len(items))))
+    try:
+        for item in items:
+            executor.submit(produce, item)
+        pending = len(items)
+        while pending:
+            result = results.get()
+            if result is done:
+                pending -= 1
+                continue
+            yield result
+    finally:
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,204 @@
+"""Concurrent execution of commands with streamed output."""
+# Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+import logging
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import chain, zip_longest
+from typing import Callable, List, Optional
+
+from gcpctl.printer import Printer
+from gcpctl.utils.colors import BCOLORS
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_EXEC_PARALLELISM = 32
+DEFAULT_GROUP_PARALLELISM = 8
+
+STDOUT = 'stdout'
+STDERR = 'stderr'
+
+
+@dataclass
+class ExecTask():
+    """A single command to execute.
+    func is called with an output callback, accepting the stream name
+    (STDOUT or STDERR) and a line, and returns the exit code.
+    """
+
+    prefix: str
+    group: str
+    func: Callable[[Callable[[str, str], None]], int]
+
+
+@dataclass
+class ExecResult():
+    """The outcome of executing a task."""
+
+    prefix: str
+    exit_code: Optional[int]
+    duration: float
+    error: Optional[Exception] = None
+    # Bytes written to stdout and stderr, when known
+    output_bytes: Optional[int] = None
+
+    @property
+    def ok(self) -> bool:
+        """Whether the task completed successfully."""
+        return self.error is None and self.exit_code == 0
+
+    @property
+    def status(self) -> str:
+        """The exit code, or why there is none."""
+        if isinstance(self.error, subprocess.TimeoutExpired):
+            return "timeout"
+        if isinstance(self.error, CancelledError):
+            return "cancelled"
+        if self.error is not None:
+            return "error"
+        return str(self.exit_code)
+
+
+class PrefixedOutput():
+    """Writes output lines of many tasks, prefixed with the task they belong
+    to. Safe to use from multiple threads."""
+
+    def __init__(self, stdout=None, stderr=None) -> None:
+        self.stdout = stdout or sys.stdout
+        self.stderr = stderr or sys.stderr
+        self._lock = threading.Lock()
+
+    def write(self, prefix, stream, line) -> None:
+        """Writes a single line of a task."""
+        self.write_lines(prefix, [(stream, line)])
+
+    def write_lines(self, prefix, lines) -> None:
+        """Writes (stream, line) tuples of a task, with no lines of other
+        tasks in between."""
+        with self._lock:
+            for stream, line in lines:
+                line = line.rstrip('\n')
+                if stream == STDERR:
+                    self.stderr.write(f"{BCOLORS['RED']}{prefix}\
+{BCOLORS['ENDC']} | {line}\n")
+                else:
+                    self.stdout.write(f"{BCOLORS['OKCYAN']}{prefix}\
+{BCOLORS['ENDC']} | {line}\n")
+            self.stderr.flush()
+            self.stdout.flush()
+
+
+def print_summary(results: List[ExecResult], wall_time: float) -> None:
+    """Prints a table with the exit code and duration of every task, and
+    how long all of them took.
+    :param results: The results of the tasks.
+    :param wall_time: Seconds it took to execute all the tasks.
+    """
+    headers = ["Target", "Exit Code", "Duration"]
+    with_output = any(result.output_bytes is not None for result in results)
+    if with_output:
+        headers.append("Output")
+    rows = []
+    for result in results:
+        row = [result.prefix, result.status, f"{result.duration:.2f}s"]
+        if with_output:
+            row.append(f"{result.output_bytes or 0}B")
+        rows.append(row)
+    Printer.print_table(headers, rows, lookahead=None)
+    failed = len([result for result in results if not result.ok])
+    # How much running the tasks concurrently saved
+    task_time = sum(result.duration for result in results)
+    speedup = task_time / wall_time if wall_time else 0.0
+    failed_str = f"{failed} failed"
+    if failed:
+        failed_str = f"{BCOLORS['RED']}{failed_str}{BCOLORS['ENDC']}"
+    print(f"\n{len(results) - failed} succeeded, {failed_str} \
+in {wall_time:.2f}s (sum of task durations: {task_time:.2f}s, \
+{speedup:.1f}x)")
+
+
+class ExecEngine():
+    """Executes tasks concurrently, limiting both the total number of running
+    tasks and the number of running tasks of every group (e.g. cluster).
+    The output of every task is streamed line by line, prefixed with the
+    task's prefix.
+    """
+
+    def __init__(self, parallelism=DEFAULT_EXEC_PARALLELISM,
+                 group_parallelism=DEFAULT_GROUP_PARALLELISM,
+                 stdout=None, stderr=None) -> None:
+        self.parallelism = parallelism
+        self.group_parallelism = group_parallelism
+        self.output = PrefixedOutput(stdout=stdout, stderr=stderr)
+        self._groups_lock = threading.Lock()
+        self._groups = {}
+        self.wall_time = 0.0
+
+    def _group_semaphore(self, group) -> threading.Semaphore:
+        with self._groups_lock:
+            if group not in self._groups:
+                self._groups[group] = threading.BoundedSemaphore(
+                    self.group_parallelism)
+            return self._groups[group]
+
+    def _run_task(self, task: ExecTask) -> ExecResult:
+        with self._group_semaphore(task.group):
+            def on_output(stream, line):
+                self.output.write(task.prefix, stream, line)
+            start = time.monotonic()
+            try:
+                result = ExecResult(prefix=task.prefix,
+                                    exit_code=task.func(on_output),
+                                    duration=time.monotonic() - start)
+            except Exception as ex:  # pylint: disable=broad-except
+                on_output(STDERR, f"Failed: {ex!r}")
+                result = ExecResult(prefix=task.prefix, exit_code=None,
+                                    duration=time.monotonic() - start,
+                                    error=ex)
+            return result
+
+    @staticmethod
+    def _interleave(tasks: List[ExecTask]) -> List[ExecTask]:
+        """Orders the tasks round-robin by group, so workers don't all end up
+        waiting for the same group's slots.
+        """
+        groups = defaultdict(list)
+        for task in tasks:
+            groups[task.group].append(task)
+        return [task for task in chain.from_iterable(
+            zip_longest(*groups.values())) if task is not None]
+
+    def run(self, tasks: List[ExecTask]) -> List[ExecResult]:
+        """Executes the tasks.
+        :return: The results, in the same order as the tasks.
+        """
+        if not tasks:
+            return []
+        start = time.monotonic()
+        workers = max(1, min(self.parallelism, len(tasks)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {id(task): executor.submit(self._run_task, task)
+                       for task in self._interleave(tasks)}
+            results = [futures[id(task)].result() for task in tasks]
+        self.wall_time = time.monotonic() - start
+        return results
+
+    def print_summary(self, results: List[ExecResult]) -> None:
+        """Prints the summary of the results of the last run."""
+        print_summary(results, self.wall_time)
@@ -12,8 +12,12 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import atexit
 import logging
 import os
+import shutil
+import tempfile
+import threading
 from dataclasses import dataclass, field
 from os import PathLike
 from pathlib import Path
@@ -21,6 +25,21 @@ from typing import Callable, Iterable, List, Optional, Union
 
 LOG = logging.getLogger(__name__)
 
+_TMP_DIR = None
+_TMP_DIR_LOCK = threading.Lock()
+
+
+def get_private_tmp_dir() -> str:
+    """Returns a directory, readable only by the user, that is removed when
+    the process exits. Created on first use.
+    """
+    global _TMP_DIR  # pylint: disable=global-statement
+    with _TMP_DIR_LOCK:
+        if _TMP_DIR is None:
+            _TMP_DIR = tempfile.mkdtemp(prefix='gcpctl-')
+            atexit.register(shutil.rmtree, _TMP_DIR, ignore_errors=True)
+        return _TMP_DIR
+
 
 class FileSearch:
     """Allows for complex search queries targeting files on the filesystem.
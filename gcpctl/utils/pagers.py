@@ -0,0 +1,47 @@
+"""API pagers related utils."""
+# Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+from gcpctl.api_caller import get_api_caller
+
+
+def _with_page_token(request, token):
+    """Returns a copy of a request, given either as a dict or a message,
+    asking for the page of token."""
+    if isinstance(request, dict):
+        return dict(request, page_token=token)
+    return type(request)(request, page_token=token)
+
+
+def iter_pages(method, request, field: str, caller=None):
+    """Yields the items of every page of a Google API list or search
+    method, one list per page, as soon as each page arrives. Every page is
+    requested through the API caller of the method's client, so a page
+    which failed is retried on its own rather than restarting the listing.
+    The client's own retries are disabled, the caller retries instead.
+    :param method: The bound list or search method of a client.
+    :param request: The request of the first page.
+    :param field: Name of the repeated field of the response holding the
+        items, e.g. 'projects'.
+    :param caller: ApiCaller to use instead of the client's one.
+    """
+    caller = caller or get_api_caller(method.__self__)
+    while True:
+        # The pager holds the response of the first page, further pages
+        # would be requested outside of the caller
+        page = caller.call(lambda request=request: next(iter(
+            method(request=request, retry=None).pages)))
+        yield list(getattr(page, field))
+        if not page.next_page_token:
+            return
+        request = _with_page_token(request, page.next_page_token)
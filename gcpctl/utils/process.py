@@ -13,15 +13,223 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 """
+import asyncio
+import codecs
+import logging
+import os
+import signal
 import subprocess
+import time
+from concurrent.futures import CancelledError
+from dataclasses import dataclass
+from typing import Dict, List, Optional
 
+from gcpctl.utils.executor import (DEFAULT_EXEC_PARALLELISM, STDERR, STDOUT,
+                                   ExecResult, PrefixedOutput)
 
-def local_exec(commands):
-    print(f"running: {commands}")
-    result = subprocess.run(
-        commands, capture_output=True, text=True,
-        shell=True)
-    if result.stdout:
-        print(f"output:\n{result.stdout}")
-    if result.stderr:
-        print(f"Damn...it failed:\n{result.stderr}")
+LOG = logging.getLogger(__name__)
+
+# Seconds a command gets to exit after SIGTERM, before it is sent SIGKILL
+DEFAULT_KILL_GRACE = 5.0
+# Output is read in chunks of up to this many bytes, and longer lines are
+# split, so a command's output never piles up in memory
+READ_SIZE = 1 << 16
+MAX_LINE = 1 << 16
+# Buffered output of a single command beyond this many characters is
+# written right away, and the rest of its output is streamed
+MAX_BUFFERED = 1 << 20
+
+
+@dataclass
+class Command():
+    """A single command to execute, without a shell."""
+
+    prefix: str
+    args: List[str]
+    # Environment variables of the command, defaults to the ones of
+    # this process
+    env: Optional[Dict[str, str]] = None
+
+
+class _Output():
+    """The output of a single command: streamed, or buffered and written
+    when the command completes."""
+
+    def __init__(self, writer: PrefixedOutput, prefix: str,
+                 buffered: bool) -> None:
+        self.writer = writer
+        self.prefix = prefix
+        self.buffered = buffered
+        self.lines = []
+        self.size = 0
+        self.bytes = 0
+
+    def write(self, stream, line) -> None:
+        """Writes a line of the command's output to stream."""
+        if not self.buffered:
+            self.writer.write(self.prefix, stream, line)
+            return
+        self.lines.append((stream, line))
+        self.size += len(line)
+        if self.size > MAX_BUFFERED:
+            self.flush()
+            self.buffered = False
+
+    def flush(self) -> None:
+        """Writes the buffered lines, if any."""
+        if self.lines:
+            self.writer.write_lines(self.prefix, self.lines)
+            self.lines = []
+            self.size = 0
+
+
+class AsyncExecutor():
+    """Executes local commands concurrently on an asyncio event loop, at
+    most parallelism of them at a time. The output of every command is
+    read incrementally and streamed line by line, prefixed with the
+    command's prefix, or, when buffered, written all at once when the
+    command completes.
+    Commands running for longer than timeout, or still running once another
+    one failed with fail_fast, are sent SIGTERM and, if they're still
+    running kill_grace seconds later, SIGKILL.
+    """
+
+    def __init__(self, parallelism=DEFAULT_EXEC_PARALLELISM, timeout=None,
+                 kill_grace=DEFAULT_KILL_GRACE, fail_fast=False,
+                 buffered=False, stdout=None, stderr=None) -> None:
+        self.parallelism = parallelism
+        self.timeout = timeout
+        self.kill_grace = kill_grace
+        self.fail_fast = fail_fast
+        self.buffered = buffered
+        self.output = PrefixedOutput(stdout=stdout, stderr=stderr)
+        self.wall_time = 0.0
+
+    def run(self, commands: List[Command]) -> List[ExecResult]:
+        """Executes the commands.
+        :return: The results, in the same order as the commands.
+        """
+        if not commands:
+            return []
+        start = time.monotonic()
+        results = asyncio.run(self._run_all(commands))
+        self.wall_time = time.monotonic() - start
+        return results
+
+    async def _run_all(self, commands: List[Command]) -> List[ExecResult]:
+        semaphore = asyncio.Semaphore(max(1, self.parallelism))
+        cancel = asyncio.Event()
+        return await asyncio.gather(
+            *(self._run_command(command, semaphore, cancel)
+              for command in commands))
+
+    async def _run_command(self, command: Command, semaphore,
+                           cancel) -> ExecResult:
+        async with semaphore:
+            if cancel.is_set():
+                return ExecResult(prefix=command.prefix, exit_code=None,
+                                  duration=0.0, error=CancelledError())
+            output = _Output(self.output, command.prefix, self.buffered)
+            start = time.monotonic()
+            try:
+                exit_code, error = await self._exec(command, output, cancel)
+            except OSError as ex:
+                # e.g. the command doesn't exist
+                output.write(STDERR, f"Failed: {ex!r}")
+                exit_code, error = None, ex
+            output.flush()
+            result = ExecResult(prefix=command.prefix, exit_code=exit_code,
+                                duration=time.monotonic() - start,
+                                error=error, output_bytes=output.bytes)
+            if self.fail_fast and not result.ok and not cancel.is_set():
+                LOG.debug("%s failed, cancelling the remaining commands",
+                          command.prefix)
+                cancel.set()
+            return result
+
+    async def _exec(self, command: Command, output: _Output, cancel):
+        """Executes a single command.
+        :return: (exit code, error) tuple. The error is TimeoutExpired or
+            CancelledError if the command was killed.
+        """
+        # In a process group of its own, so killing it kills its children
+        # too, which would otherwise keep the output pipes open
+        process = await asyncio.create_subprocess_exec(
+            *command.args, stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            env=command.env, start_new_session=True)
+        completion = asyncio.ensure_future(self._complete(process, output))
+        cancelled = asyncio.ensure_future(cancel.wait())
+        try:
+            done, _ = await asyncio.wait(
+                {completion, cancelled}, timeout=self.timeout,
+                return_when=asyncio.FIRST_COMPLETED)
+            if completion in done:
+                return completion.result(), None
+            if cancel.is_set():
+                error = CancelledError()
+            else:
+                error = subprocess.TimeoutExpired(command.args, self.timeout)
+            exit_code = await self._kill(process, completion)
+            return exit_code, error
+        except asyncio.CancelledError:
+            # The whole run was interrupted, e.g. by Ctrl-C, which doesn't
+            # reach commands in sessions of their own
+            self._signal(process, signal.SIGKILL)
+            raise
+        finally:
+            cancelled.cancel()
+            completion.cancel()
+
+    async def _complete(self, process, output: _Output) -> int:
+        """Reads all the output of the process and waits for it to exit.
+        :return: The exit code of the process.
+        """
+        await asyncio.gather(self._read(process.stdout, STDOUT, output),
+                             self._read(process.stderr, STDERR, output))
+        return await process.wait()
+
+    @staticmethod
+    async def _read(reader, stream, output: _Output) -> None:
+        """Passes every line of a stream of the process to output as soon as
+        it is read."""
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        pending = ''
+        while True:
+            chunk = await reader.read(READ_SIZE)
+            output.bytes += len(chunk)
+            pending += decoder.decode(chunk, final=not chunk)
+            *lines, pending = pending.split('\n')
+            for line in lines:
+                output.write(stream, line)
+            while len(pending) >= MAX_LINE:
+                output.write(stream, pending[:MAX_LINE])
+                pending = pending[MAX_LINE:]
+            if not chunk:
+                break
+        if pending:
+            output.write(stream, pending)
+
+    async def _kill(self, process, completion) -> Optional[int]:
+        """Sends SIGTERM to the process' group, and SIGKILL if it didn't
+        exit within kill_grace seconds.
+        :return: The exit code of the process.
+        """
+        self._signal(process, signal.SIGTERM)
+        done, _ = await asyncio.wait({completion}, timeout=self.kill_grace)
+        if completion in done:
+            return completion.result()
+        LOG.debug("Process %s ignored SIGTERM, killing it", process.pid)
+        self._signal(process, signal.SIGKILL)
+        # Don't wait for the output of processes which left the group
+        done, _ = await asyncio.wait({completion}, timeout=self.kill_grace)
+        if completion in done:
+            return completion.result()
+        return await process.wait()
+
+    @staticmethod
+    def _signal(process, sig) -> None:
+        try:
+            os.killpg(process.pid, sig)
+        except ProcessLookupError:
+            pass
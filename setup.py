@@ -21,7 +21,8 @@ setuptools.setup(
     packages=setuptools.find_packages(),
     python_requires='>3.0.0',
     include_package_data=True,
+    extras_require={'search': ['google-cloud-asset']},
     entry_points={
-        'console_scripts': ['gcpctl = gcpctl.cli.main:main',
-                            'gcp = gcpctl.cli.main:main']}
+        'console_scripts': ['gcpctl = gcpctl.cli.daemon:main',
+                            'gcp = gcpctl.cli.daemon:main']}
 )
@@ -0,0 +1,55 @@
+"""
+#    Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+from unittest import TestCase
+
+from gcpctl.benchmarks.fakes import (ORG_SIZES, FakeAPIError,
+                                     FakeCoreV1Api, FakeOrg,
+                                     FakeProjectsClient, make_pods)
+
+
+class TestFakes(TestCase):
+    """Tests the fake APIs the benchmarks run against"""
+
+    def test_org_sizes(self):
+        """Tests the organization sizes have about as many projects as
+        their name says"""
+        self.assertEqual(len(FakeOrg(**ORG_SIZES['10']).all_projects()), 10)
+        self.assertEqual(len(FakeOrg(**ORG_SIZES['1k']).all_projects()), 999)
+
+    def test_error_rate(self):
+        """Tests calls fail at the configured rate"""
+        client = FakeProjectsClient(FakeOrg(), error_rate=0.5, seed=0)
+        for _ in range(100):
+            try:
+                client.round_trip()
+            except FakeAPIError:
+                pass
+        self.assertEqual(client.calls, 100)
+        self.assertTrue(30 < client.errors < 70)
+
+    def test_list_pods(self):
+        """Tests pods are paginated and filtered by selectors"""
+        api = FakeCoreV1Api(make_pods(100))
+        response = api.list_pod_for_all_namespaces(limit=60)
+        self.assertEqual(len(response.items), 60)
+        response = api.list_pod_for_all_namespaces(
+            limit=60, _continue=response.metadata._continue)
+        self.assertEqual(len(response.items), 40)
+        self.assertIsNone(response.metadata._continue)
+        response = api.list_pod_for_all_namespaces(
+            label_selector='app=app-1', field_selector='status.phase!=Running')
+        self.assertEqual([pod.status.phase for pod in response.items],
+                         ['Pending', 'Succeeded'])
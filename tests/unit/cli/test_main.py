@@ -0,0 +1,56 @@
+"""
+#    Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+from unittest import TestCase, mock
+
+from gcpctl.api_caller import configure_api_callers, get_api_caller
+from gcpctl.cli.main import create_parser, create_session_parser, run_command
+from gcpctl.client_factory import (ClientFactory, get_client_factory,
+                                   set_client_factory)
+
+
+class TestRunCommand(TestCase):
+    """Tests the run_command function"""
+
+    def setUp(self):
+        self.addCleanup(set_client_factory, get_client_factory())
+        self.addCleanup(configure_api_callers)
+
+    def test_global_options(self):
+        """Tests the global options of a command apply while it runs, and
+        the ones it doesn't give are the session's"""
+        session = create_parser().parse_args(
+            ['--api-attempts', '3', 'shell'])
+        set_client_factory(ClientFactory())
+        configure_api_callers(max_attempts=3)
+        factory = get_client_factory()
+        caller = get_api_caller(self)
+        parser = create_session_parser(session)
+        used = []
+
+        def run(args):  # pylint: disable=unused-argument
+            used.append((get_client_factory(), get_api_caller(self)))
+
+        with mock.patch('gcpctl.cli.main.run', run):
+            self.assertEqual(run_command(parser, ['get', 'folders']), 0)
+            self.assertEqual(run_command(
+                parser, ['--api-attempts', '2', '--keepalive', '0', 'get',
+                         'folders']), 0)
+        self.assertEqual(used[0], (factory, caller))
+        self.assertIsNot(used[1][0], factory)
+        self.assertEqual(used[1][0].keepalive, 0)
+        self.assertEqual(used[1][1].max_attempts, 2)
+        self.assertIs(get_client_factory(), factory)
+        self.assertIs(get_api_caller(self), caller)
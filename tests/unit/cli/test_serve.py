@@ -0,0 +1,97 @@
+"""
+#    Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+import json
+import os
+import socket
+import sys
+import time
+from unittest import TestCase, mock
+
+from gcpctl.cli.daemon import (EXIT, LOCAL, REQUEST, STDERR,
+                               get_identity_env, recv_frame, send_frame)
+from gcpctl.cli.main import create_parser
+from gcpctl.cli.serve import CommandServer
+
+
+class TestCommandServer(TestCase):
+    """Tests the CommandServer class"""
+
+    def run_command(self, argv, env=None):
+        """Returns the frames the server answers a command with"""
+        server = CommandServer('unused', create_parser())
+        client, conn = socket.socketpair()
+        with client, conn:
+            send_frame(client, REQUEST, json.dumps(
+                {'argv': argv, 'cwd': os.getcwd(),
+                 'env': get_identity_env() if env is None else env}
+            ).encode('utf-8'))
+            server.handle(conn)
+            conn.shutdown(socket.SHUT_WR)
+            frames = []
+            while True:
+                try:
+                    frames.append(recv_frame(client))
+                except ConnectionError:
+                    return frames
+
+    def test_failed_command(self):
+        """Tests the output and the exit code are sent to the client and
+        the server's streams are restored"""
+        stderr = sys.stderr
+        frames = self.run_command(['get', 'folders', '--unknown'])
+        self.assertEqual(frames[-1], (EXIT, b'2'))
+        output = b''.join(payload for channel, payload in frames
+                          if channel == STDERR)
+        self.assertIn(b'unrecognized arguments: --unknown', output)
+        self.assertIs(sys.stderr, stderr)
+
+    def test_nested_session(self):
+        """Tests sessions can't be started from a session"""
+        frames = self.run_command(['shell'])
+        self.assertEqual(frames[-1], (EXIT, b'2'))
+
+    def test_other_identity(self):
+        """Tests commands of clients with other credentials or kubeconfig
+        are sent back to be run by the clients"""
+        env = dict(get_identity_env(), KUBECONFIG='/other/kubeconfig')
+        frames = self.run_command(['get', 'folders', '--unknown'], env=env)
+        self.assertEqual(frames, [(LOCAL, b'')])
+
+    def test_client_gone(self):
+        """Tests a running command is interrupted when its client goes
+        away"""
+        interrupted = []
+        client, conn = socket.socketpair()
+
+        def run_command(parser, argv):  # pylint: disable=unused-argument
+            try:
+                client.close()
+                time.sleep(10)
+            except KeyboardInterrupt:
+                interrupted.append(argv)
+                return 130
+            return 0
+
+        server = CommandServer('unused', create_parser())
+        with conn:
+            send_frame(client, REQUEST, json.dumps(
+                {'argv': ['get', 'clusters'], 'cwd': os.getcwd(),
+                 'env': get_identity_env()}).encode('utf-8'))
+            start = time.monotonic()
+            with mock.patch('gcpctl.cli.main.run_command', run_command):
+                server.handle(conn)
+        self.assertEqual(interrupted, [['get', 'clusters']])
+        self.assertLess(time.monotonic() - start, 5)
@@ -0,0 +1,52 @@
+"""
+#    Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+import os
+import subprocess
+import sys
+from unittest import TestCase
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__)))))
+# Microseconds importing the CLI and building its parser may take. Loading
+# the GCP or Kubernetes libraries alone takes several times more.
+IMPORT_TIME_BUDGET = 250000
+# Libraries only the sub-commands using them should load
+LAZY_MODULES = ('google', 'grpc', 'kubernetes', 'requests', 'rfc3987',
+                'yaml')
+
+
+class TestStartup(TestCase):
+    """Tests the cost of starting the CLI"""
+
+    def test_import_time(self):
+        """Tests the CLI starts within budget, without loading the
+        libraries of the sub-commands"""
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c',
+             'import gcpctl.cli.main; gcpctl.cli.main.create_parser()'],
+            cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+        # Lines look like "import time: self [us] | cumulative | module"
+        times = {}
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:'):
+                continue
+            _, cumulative, module = line.split('|')
+            if cumulative.strip().isdigit():
+                times[module.strip()] = int(cumulative)
+        loaded = [module for module in times
+                  if module.split('.')[0] in LAZY_MODULES]
+        self.assertEqual(loaded, [])
+        self.assertLess(times['gcpctl.cli.main'], IMPORT_TIME_BUDGET)
@@ -0,0 +1,81 @@
+"""
+#    Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+from unittest import TestCase
+
+from gcpctl.benchmarks.fakes import FakeAssetServiceClient, FakeOrg
+from gcpctl.discovery.search import SearchBackend
+
+
+class TestSearchBackend(TestCase):
+    """Tests the SearchBackend class against a fake asset service"""
+
+    def setUp(self):
+        self.org = FakeOrg(depth=2, folders_per_folder=2,
+                           projects_per_folder=3, clusters_per_project=2)
+        self.client = FakeAssetServiceClient(self.org)
+        self.backend = SearchBackend(client=self.client, page_size=10)
+
+    def test_get_projects_recursive(self):
+        """Tests all the projects under the folder are found"""
+        projects = list(self.backend.get_projects(
+            [self.org.root_folder_id], recursive=True))
+        self.assertEqual(
+            sorted(project.project_id for project in projects),
+            sorted(project.project_id
+                   for project in self.org.all_projects()))
+        # 21 projects in pages of 10
+        self.assertEqual(self.client.calls, 3)
+
+    def test_get_projects_direct_children(self):
+        """Tests only the projects directly under the folder are found"""
+        projects = list(self.backend.get_projects(
+            [self.org.root_folder_id]))
+        root = f"folders/{self.org.root_folder_id}"
+        self.assertEqual(
+            [project.project_id for project in projects],
+            [project.project_id for project in self.org.projects[root]])
+        self.assertTrue(all(project.parent == root for project in projects))
+
+    def test_get_clusters_of_folder(self):
+        """Tests the clusters under a folder are found in a single query"""
+        self.backend.page_size = 100
+        clusters = list(self.backend.get_clusters(
+            folder_ids=[self.org.root_folder_id], recursive=True))
+        self.assertEqual(len(clusters), len(self.org.all_projects()) * 2)
+        self.assertEqual(self.client.calls, 1)
+        self.assertEqual(clusters[0].project_id,
+                         self.org.all_projects()[0].project_id)
+        self.assertEqual(clusters[0].name, "cluster-0")
+        self.assertEqual(clusters[0].zone, "us-central1-a")
+
+    def test_cluster_credentials(self):
+        """Tests the endpoint and CA certificate of clusters are found, so
+        their kubeconfigs don't need gcloud"""
+        project_id = self.org.all_projects()[0].project_id
+        fake_cluster = self.org.clusters[project_id][0]
+        fake_cluster.endpoint = "10.0.0.1"
+        fake_cluster.master_auth.cluster_ca_certificate = "Q0E="
+        cluster = next(self.backend.get_clusters(project_ids=[project_id]))
+        self.assertEqual(cluster.endpoint, "10.0.0.1")
+        self.assertEqual(cluster.ca_certificate, "Q0E=")
+
+    def test_get_clusters_of_project(self):
+        """Tests the clusters of a single project are found"""
+        project_id = self.org.all_projects()[-1].project_id
+        clusters = list(self.backend.get_clusters(project_ids=[project_id]))
+        self.assertEqual({cluster.project_id for cluster in clusters},
+                         {project_id})
+        self.assertEqual(len(clusters), 2)
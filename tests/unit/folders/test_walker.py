@@ -0,0 +1,115 @@
+"""
+#    Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+from unittest import TestCase
+
+from google.api_core.exceptions import PermissionDenied
+
+from gcpctl.benchmarks.fakes import (FakeFoldersClient, FakeOrg,
+                                     FakeProjectsClient)
+from gcpctl.folders.walker import FOLDER, PROJECT, FolderWalker
+
+
+class DeniedProjectsClient(FakeProjectsClient):
+    """Projects client denying the listing of the projects of a folder"""
+
+    def __init__(self, org, denied) -> None:
+        super().__init__(org)
+        self.denied = denied
+
+    def list_projects(self, request, retry=None):
+        if request.parent == self.denied:
+            raise PermissionDenied(f"Permission denied on {self.denied}")
+        return super().list_projects(request, retry=retry)
+
+
+class BrokenFoldersClient(FakeFoldersClient):
+    """Folders client failing to list the sub-folders of any folder"""
+
+    def list_folders(self, request, retry=None):
+        raise ValueError(f"Broken listing of {request.parent}")
+
+
+class TestFolderWalker(TestCase):
+    """Tests the FolderWalker class against a fake organization"""
+
+    def setUp(self):
+        self.org = FakeOrg(depth=2, folders_per_folder=2,
+                           projects_per_folder=3)
+        self.root = f"folders/{self.org.root_folder_id}"
+        self.folders_client = FakeFoldersClient(self.org)
+        self.projects_client = FakeProjectsClient(self.org)
+
+    def _walker(self, **kwargs):
+        return FolderWalker(**dict(dict(
+            folders_client=self.folders_client,
+            projects_client=self.projects_client, parallelism=4), **kwargs))
+
+    def test_walk(self):
+        """Tests all the folders and projects are found, with the depth of
+        the folder holding them"""
+        entries = list(self._walker().walk([self.org.root_folder_id]))
+        projects = [entry for entry in entries if entry.kind == PROJECT]
+        self.assertEqual(
+            sorted(entry.resource.project_id for entry in projects),
+            sorted(project.project_id
+                   for project in self.org.all_projects()))
+        self.assertEqual(
+            len([entry for entry in entries if entry.kind == FOLDER]), 6)
+        self.assertEqual({entry.depth for entry in projects}, {0, 1, 2})
+
+    def test_max_depth(self):
+        """Tests only the direct projects are found with max_depth 0, with
+        no sub-folders listed"""
+        entries = list(self._walker().walk([self.org.root_folder_id],
+                                           max_depth=0))
+        self.assertEqual(
+            [entry.resource.name for entry in entries],
+            [project.name for project in self.org.projects[self.root]])
+        self.assertEqual(self.folders_client.calls, 0)
+
+    def test_permission_denied(self):
+        """Tests a folder which can't be accessed is recorded and skipped,
+        and the rest of the tree is still walked"""
+        denied = self.org.folders[self.root][0].name
+        errors = {}
+        walker = self._walker(
+            projects_client=DeniedProjectsClient(self.org, denied),
+            errors=errors)
+        with self.assertLogs('gcpctl.folders.walker', 'ERROR'):
+            entries = list(walker.walk([self.org.root_folder_id]))
+        parents = {entry.resource.parent for entry in entries
+                   if entry.kind == PROJECT}
+        self.assertNotIn(denied, parents)
+        self.assertEqual(len(parents), 6)
+        self.assertEqual(list(errors), [denied])
+        self.assertIsInstance(errors[denied], PermissionDenied)
+
+    def test_error(self):
+        """Tests other errors are raised"""
+        walker = self._walker(
+            folders_client=BrokenFoldersClient(self.org))
+        with self.assertRaises(ValueError):
+            list(walker.walk([self.org.root_folder_id]))
+
+    def test_early_exit(self):
+        """Tests the folders nobody consumes anymore aren't listed"""
+        walker = self._walker(parallelism=1)
+        walk = walker.walk([self.org.root_folder_id])
+        next(walk)
+        walk.close()
+        # All of the tree takes 14 calls
+        self.assertLess(self.folders_client.calls +
+                        self.projects_client.calls, 14)
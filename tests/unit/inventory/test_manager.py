@@ -0,0 +1,104 @@
+"""
+#    Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from gcpctl.gke_clusters.cluster import GKECluster
+from gcpctl.inventory.manager import InventoryManager
+from gcpctl.inventory.snapshot import InventorySnapshot
+from gcpctl.projects.project import GCPProject
+
+
+class Backend():
+    """Discovery backend returning the given projects and clusters, and
+    recording the projects whose clusters were listed"""
+
+    def __init__(self, projects, clusters):
+        self.projects = projects
+        self.clusters = clusters
+        self.listed = []
+        self.errors = {}
+
+    def get_projects(self, folder_ids, recursive=False):
+        """Returns the projects, whatever the folders"""
+        return iter(self.projects)
+
+    def get_clusters(self, project_ids=None):
+        """Returns the clusters of the projects"""
+        self.listed.append(sorted(project_ids))
+        return iter([cluster for cluster in self.clusters
+                     if cluster.project_id in project_ids])
+
+
+class TestInventoryManager(TestCase):
+    """Tests the InventoryManager class"""
+
+    def setUp(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        self.backend = Backend(
+            [GCPProject(display_name=name, parent='folders/1',
+                        project_id=name, etag='1') for name in 'abc'],
+            [GKECluster(name=f"{name}-1", project_id=name, zone='zone',
+                        etag='1') for name in 'abc'])
+        self.manager = InventoryManager(
+            env_folder_ids={'prod': ['1']}, backend=self.backend,
+            snapshot=InventorySnapshot(
+                os.path.join(tmp_dir, 'inventory.sqlite3')))
+
+    def _sync(self, ok=True, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()) as stdout:
+            self.assertEqual(self.manager.sync(output='csv', **kwargs), ok)
+        return stdout.getvalue().splitlines()[1:]
+
+    def test_sync(self):
+        """Tests only the clusters of changed projects are listed again,
+        and the changes are printed"""
+        self.assertEqual(len(self._sync()), 6)
+        self.assertEqual(self._sync(), [])
+        projects = self.backend.projects
+        projects[0] = GCPProject(display_name='a', parent='folders/1',
+                                 project_id='a', etag='2')
+        del projects[2]
+        self.backend.clusters[0].etag = '2'
+        self.assertEqual(self._sync(), [
+            'prod,changed,project,a,a,', 'prod,removed,project,c,c,',
+            'prod,changed,cluster,a,a-1,zone',
+            'prod,removed,cluster,c,c-1,zone'])
+        self.backend.clusters[1].etag = '2'
+        self.assertEqual(self._sync(clusters_max_age=0), [
+            'prod,changed,cluster,b,b-1,zone'])
+        self.assertEqual(self.backend.listed,
+                         [['a', 'b', 'c'], [], ['a'], ['a', 'b']])
+
+    def test_denied_folder(self):
+        """Tests the projects of a folder which can't be accessed aren't
+        reported as removed"""
+        self._sync()
+        del self.backend.projects[2]
+        get_projects = self.backend.get_projects
+
+        def get_denied_projects(folder_ids, recursive=False):
+            self.backend.errors['folders/2'] = PermissionError('denied')
+            return get_projects(folder_ids, recursive=recursive)
+
+        self.backend.get_projects = get_denied_projects
+        with self.assertLogs('gcpctl.inventory.manager', 'ERROR'):
+            self.assertEqual(self._sync(ok=False), [])
@@ -0,0 +1,87 @@
+"""
+#    Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from gcpctl.gke_clusters.cluster import GKECluster
+from gcpctl.inventory.snapshot import InventorySnapshot
+from gcpctl.projects.project import GCPProject
+
+
+class TestInventorySnapshot(TestCase):
+    """Tests the InventorySnapshot class"""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()  # noqa: SIM115
+        self.addCleanup(tmp_dir.cleanup)
+        self.snapshot = InventorySnapshot(
+            os.path.join(tmp_dir.name, 'inventory.sqlite3'))
+        self.projects = [GCPProject(display_name=name, parent='folders/1',
+                                    project_id=name) for name in ('a', 'b')]
+        self.clusters = [GKECluster(name=f"{project.project_id}-1",
+                                    project_id=project.project_id,
+                                    zone='zone')
+                         for project in self.projects]
+
+    def test_fresh(self):
+        """Tests an env is used only if refreshed recently, with the same
+        folders"""
+        self.assertFalse(self.snapshot.is_fresh('prod', ['1'], False))
+        self.snapshot.store('prod', ['1'], False, self.projects,
+                            self.clusters)
+        self.assertTrue(self.snapshot.is_fresh('prod', ['1'], False))
+        self.assertFalse(self.snapshot.is_fresh('prod', ['1', '2'], False))
+        self.assertFalse(self.snapshot.is_fresh('prod', ['1'], True))
+        self.assertFalse(self.snapshot.is_fresh('prod', ['1'], False,
+                                                max_age=-1))
+        self.assertEqual(self.snapshot.get_clusters('prod'), self.clusters)
+
+    def test_clusters_of_several_zones(self):
+        """Tests clusters with the same name in several zones of a project
+        are all stored"""
+        clusters = [GKECluster(name='a-1', project_id='a', zone=zone)
+                    for zone in ('zone-1', 'zone-2')]
+        self.snapshot.store('prod', ['1'], False, self.projects, clusters)
+        self.assertEqual(self.snapshot.get_clusters('prod'), clusters)
+
+    def test_partial_listing(self):
+        """Tests an env is only as fresh as the least recently listed
+        clusters of its projects"""
+        with mock.patch('time.time', return_value=100):
+            self.snapshot.store('prod', ['1'], False, self.projects,
+                                self.clusters)
+        with mock.patch('time.time', return_value=200):
+            self.snapshot.store('prod', ['1'], False, self.projects,
+                                self.clusters[:1], cluster_project_ids=['a'])
+        self.assertEqual(self.snapshot.get_env('prod').refreshed, 100)
+        self.assertCountEqual(self.snapshot.get_clusters('prod'),
+                              self.clusters)
+
+    def test_failed_scopes_are_kept(self):
+        """Tests clusters of projects which failed to be listed are kept,
+        and the ones of projects which are gone are removed"""
+        self.snapshot.store('prod', ['1'], False, self.projects,
+                            self.clusters)
+        self.snapshot.store('prod', ['1'], False, self.projects,
+                            self.clusters[1:], errors=['projects/a'])
+        self.assertEqual(self.snapshot.get_clusters('prod'), self.clusters)
+        self.snapshot.store('prod', ['1'], False, self.projects[:1],
+                            self.clusters[:1])
+        self.assertEqual(self.snapshot.get_clusters('prod'),
+                         self.clusters[:1])
+        self.assertEqual(self.snapshot.get_projects('prod'),
+                         self.projects[:1])
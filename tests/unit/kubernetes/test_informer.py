@@ -0,0 +1,72 @@
+"""
+#    Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+import dataclasses
+import time
+from unittest import TestCase
+
+from gcpctl.benchmarks.fakes import (FakeAPIError, FakeCoreV1Api, FakePod,
+                                     FakePodStatus, FakeWatch, make_pods)
+from gcpctl.kubernetes.informer import GONE, PodInformer
+from gcpctl.kubernetes.pods import PodSelector
+
+
+class TestPodInformer(TestCase):
+    """Tests the PodInformer class"""
+
+    def setUp(self):
+        self.pods = make_pods(20)
+        self.watch = FakeWatch()
+        self.informer = PodInformer(FakeCoreV1Api(self.pods),
+                                    watch_factory=lambda: self.watch)
+        self.addCleanup(self.informer.stop)
+
+    def _wait(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def _event(self, kind, pod):
+        self.watch.events.put({'type': kind, 'object': pod})
+
+    def test_watch(self):
+        """Tests pods are listed once and then kept up to date"""
+        self.assertEqual(len(self.informer.get_index()), 20)
+        stopped = FakePod(
+            metadata=dataclasses.replace(self.pods[0].metadata,
+                                         resource_version="21"),
+            status=FakePodStatus(phase="Succeeded"))
+        self._event('MODIFIED', stopped)
+        self._event('DELETED', self.pods[1])
+        self._event('BOOKMARK', FakePod(metadata=dataclasses.replace(
+            self.pods[2].metadata, resource_version="30")))
+        self._wait(lambda: self.informer.resource_version == "30")
+        index = self.informer.get_index()
+        self.assertEqual(len(index), 19)
+        running = index.select(PodSelector(phases=["Running"]))
+        self.assertNotIn(self.pods[0].metadata.name,
+                         [pod.name for pod in running])
+        self.assertEqual(self.informer.lists, 1)
+        self.assertEqual(self.watch.calls[0]['resource_version'], "1")
+        self.assertTrue(self.watch.calls[0]['allow_watch_bookmarks'])
+
+    def test_expired(self):
+        """Tests pods are listed again once the watch expired"""
+        self.informer.get_index()
+        self.watch.events.put(FakeAPIError("Expired", code=GONE))
+        self._wait(lambda: not self.informer.records)
+        self.assertEqual(len(self.informer.get_index()), 20)
+        self.assertEqual(self.informer.lists, 2)
@@ -0,0 +1,64 @@
+"""
+#    Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+import dataclasses
+import json
+import os
+import stat
+from unittest import TestCase
+
+from gcpctl.gke_clusters.cluster import GKECluster
+from gcpctl.kubernetes.kubeconfig import get_cluster_kubeconfig
+
+
+class TestClusterKubeconfig(TestCase):
+    """Tests the get_cluster_kubeconfig function"""
+
+    def setUp(self):
+        self.cluster = GKECluster(name='cluster', project_id='project',
+                                  zone='zone', endpoint='10.0.0.1',
+                                  ca_certificate='Q0E=')
+
+    def test_minimal_kubeconfig(self):
+        """Tests the kubeconfig holds only the cluster, as current context,
+        and is private to the user"""
+        path = get_cluster_kubeconfig(self.cluster)
+        with open(path, encoding='utf-8') as buffer:
+            kubeconfig = json.load(buffer)
+        self.assertEqual(kubeconfig['current-context'],
+                         'gke_project_zone_cluster')
+        self.assertEqual(len(kubeconfig['clusters']), 1)
+        self.assertEqual(kubeconfig['clusters'][0]['cluster']['server'],
+                         'https://10.0.0.1')
+        directory_mode = os.stat(os.path.dirname(path)).st_mode
+        self.assertEqual(stat.S_IMODE(directory_mode), 0o700)
+
+    def test_reused(self):
+        """Tests the kubeconfig is written only once"""
+        path = get_cluster_kubeconfig(self.cluster)
+        mtime = os.stat(path).st_mtime_ns
+        self.assertEqual(get_cluster_kubeconfig(self.cluster), path)
+        self.assertEqual(os.stat(path).st_mtime_ns, mtime)
+
+    def test_recreated_cluster(self):
+        """Tests a cluster whose endpoint changed gets a new kubeconfig"""
+        path = get_cluster_kubeconfig(self.cluster)
+        recreated = dataclasses.replace(self.cluster, endpoint='10.0.0.2')
+        new_path = get_cluster_kubeconfig(recreated)
+        self.assertNotEqual(new_path, path)
+        with open(new_path, encoding='utf-8') as buffer:
+            kubeconfig = json.load(buffer)
+        self.assertEqual(kubeconfig['clusters'][0]['cluster']['server'],
+                         'https://10.0.0.2')
@@ -0,0 +1,81 @@
+"""
+#    Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+from unittest import TestCase
+
+from gcpctl.benchmarks.fakes import (FakeObjectMeta, FakeOwnerReference,
+                                     FakePod, FakePodStatus, make_pods)
+from gcpctl.exceptions.kubernetes import InvalidSelector
+from gcpctl.kubernetes.pods import (PodIndex, PodRecord, PodSelector,
+                                    get_owner, parse_label_selector)
+
+
+class TestPodIndex(TestCase):
+    """Tests the PodIndex class"""
+
+    def setUp(self):
+        # 10 apps of 2 ReplicaSets of 5 pods, in 10 namespaces
+        self.index = PodIndex(map(PodRecord.from_pod,
+                                  make_pods(100, apps=10)))
+
+    def _select(self, **kwargs):
+        return self.index.select(PodSelector(**kwargs))
+
+    def test_filters(self):
+        """Tests pods have to meet all the criteria"""
+        pods = self._select(label_selector='app in (app-1, app-2)',
+                            phases=['Running'], namespaces=['ns-1'])
+        self.assertEqual([pod.name for pod in pods],
+                         ['app-1-1-0', 'app-1-1-1', 'app-1-1-2',
+                          'app-1-11-0', 'app-1-11-1', 'app-1-11-2'])
+        self.assertEqual(len(self._select(label_selector='app!=app-1')), 90)
+        self.assertEqual(len(self._select(label_selector='!app')), 0)
+        self.assertEqual(len(self._select(name_regex='app-1-')), 10)
+
+    def test_one_per_owner(self):
+        """Tests a single pod, a Running one, is kept of every owner"""
+        pods = self._select(one_per_owner=True)
+        self.assertEqual(len(pods), 20)
+        self.assertTrue(all(pod.phase == 'Running' for pod in pods))
+
+    def test_sample(self):
+        """Tests samples are spread over the owners and reproducible"""
+        pods = self._select(sample=20, seed=1)
+        self.assertEqual(len({pod.owner for pod in pods}), 20)
+        self.assertEqual(pods, self._select(sample=20, seed=1))
+
+
+class TestPods(TestCase):
+    """Tests the label selector parsing and the owners of pods"""
+
+    def test_parse_label_selector(self):
+        """Tests equality, set-based and existence requirements"""
+        requirements = parse_label_selector(
+            'app=api, tier notin (cache,db),release,!canary')
+        labels = {'app': 'api', 'tier': 'web', 'release': '1'}
+        self.assertTrue(all(requirement.matches(labels)
+                            for requirement in requirements))
+        with self.assertRaises(InvalidSelector):
+            parse_label_selector('app=(api')
+
+    def test_deployment_owner(self):
+        """Tests pods of a Deployment's ReplicaSet belong to it"""
+        pod = FakePod(metadata=FakeObjectMeta(
+            name='api-5d8f7-x2x', namespace='default',
+            labels={'pod-template-hash': '5d8f7'},
+            owner_references=[FakeOwnerReference(
+                kind='ReplicaSet', name='api-5d8f7', uid='1')]),
+            status=FakePodStatus(phase='Running'))
+        self.assertEqual(get_owner(pod), ('Deployment', 'api'))
@@ -0,0 +1,74 @@
+"""
+#    Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+from unittest import TestCase
+
+from gcpctl.api_caller import AdaptiveLimiter, ApiCaller
+
+
+class APIError(Exception):
+    """Error with an HTTP status, like google.api_core's"""
+
+    def __init__(self, code):
+        super().__init__(f"Status {code}")
+        self.code = code
+
+
+class TestApiCaller(TestCase):
+    """Tests the ApiCaller class"""
+
+    def setUp(self):
+        self.caller = ApiCaller('test', rate=0, max_attempts=3,
+                                base_delay=0.001)
+
+    def _failing(self, *codes):
+        errors = [APIError(code) for code in codes]
+
+        def func(value):
+            if errors:
+                raise errors.pop(0)
+            return value
+        return func
+
+    def test_retries(self):
+        """Tests throttled and transient errors are retried"""
+        self.assertEqual(self.caller.call(self._failing(429, 503), 'ok'), 'ok')
+        self.assertEqual(self.caller.retries, 2)
+        self.assertEqual(self.caller.throttled, 1)
+        limiter = self.caller.limiter
+        self.assertLess(limiter.limit, limiter.max_limit)
+
+    def test_errors(self):
+        """Tests other errors and the last attempt's error are raised"""
+        with self.assertRaises(APIError):
+            self.caller.call(self._failing(403), 'ok')
+        self.assertEqual(self.caller.retries, 0)
+        with self.assertRaises(APIError):
+            self.caller.call(self._failing(503, 503, 503), 'ok')
+        self.assertEqual(self.caller.retries, 2)
+
+
+class TestAdaptiveLimiter(TestCase):
+    """Tests the AdaptiveLimiter class"""
+
+    def test_limit(self):
+        """Tests the limit is halved once per window and grows back"""
+        limiter = AdaptiveLimiter(8)
+        limiter.on_throttled(window=60)
+        limiter.on_throttled(window=60)
+        self.assertEqual(limiter.limit, 4)
+        for _ in range(100):
+            limiter.on_success()
+        self.assertEqual(limiter.limit, 8)
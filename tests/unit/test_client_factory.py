@@ -0,0 +1,91 @@
+"""
+#    Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+from types import SimpleNamespace
+from unittest import TestCase
+
+from gcpctl.client_factory import ClientFactory
+
+
+class FakeTransport():
+    """Stands for the gRPC transport of a GCP client"""
+    channels = []
+
+    def __init__(self, host, channel):
+        self.host = host
+        self.channel = channel
+
+    @classmethod
+    def create_channel(cls, host, credentials, options):
+        """Records the created channel"""
+        channel = (host, credentials, tuple(options), len(cls.channels))
+        cls.channels.append(channel)
+        return channel
+
+
+class FakeClient():
+    """Stands for a GCP client"""
+    DEFAULT_ENDPOINT = "cloudresourcemanager.googleapis.com"
+
+    def __init__(self, transport):
+        self.transport = transport
+
+    @staticmethod
+    def get_transport_class(_):
+        """Returns the fake transport"""
+        return FakeTransport
+
+
+class OtherFakeClient(FakeClient):
+    """Stands for another client of the same API"""
+
+
+class TestClientFactory(TestCase):
+    """Tests the ClientFactory class"""
+
+    def setUp(self):
+        FakeTransport.channels = []
+
+    def test_shared_channels(self):
+        """Tests clients of the same API share the channel and the
+        credentials"""
+        factory = ClientFactory(credentials='creds')
+        client = factory.get(FakeClient)
+        self.assertIs(factory.get(FakeClient), client)
+        other = factory.get(OtherFakeClient)
+        self.assertIsNot(other, client)
+        self.assertIs(other.transport.channel, client.transport.channel)
+        self.assertEqual(len(FakeTransport.channels), 1)
+        self.assertEqual(client.transport.channel[1], 'creds')
+
+    def test_pool(self):
+        """Tests clients are handed out round robin over the pool"""
+        factory = ClientFactory(credentials='creds', pool_size=2)
+        clients = [factory.get(FakeClient) for _ in range(4)]
+        self.assertIsNot(clients[0], clients[1])
+        self.assertEqual(clients[2:], clients[:2])
+        self.assertEqual(len(FakeTransport.channels), 2)
+        self.assertIn(('grpc.use_local_subchannel_pool', 1),
+                      FakeTransport.channels[0][2])
+
+    def test_account(self):
+        """Tests the account identifying the credentials"""
+        accounts = [ClientFactory(credentials=credentials).account
+                    for credentials in [
+                        SimpleNamespace(service_account_email='sa@p.iam'),
+                        SimpleNamespace(service_account_email='default'),
+                        SimpleNamespace(account='', refresh_token='token')]]
+        self.assertEqual(accounts[:2], ['sa@p.iam', ''])
+        self.assertEqual(len(accounts[2]), 64)
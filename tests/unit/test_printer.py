@@ -0,0 +1,121 @@
+"""
+#    Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+import io
+import json
+import time
+from unittest import TestCase
+
+from gcpctl.exceptions.cli import UnknownColumns
+from gcpctl.printer import Printer
+
+HEADERS = ["Cluster", "Project", "Zone"]
+ROWS = [["a", "project-1", "zone-1"],
+        ["a-longer-name", "p", "zone-2"],
+        ["b", "project-3", "zone-3"]]
+
+
+class TestPrintTable(TestCase):
+    """Tests the Printer.print_table method"""
+
+    def print_table(self, rows=ROWS, **kwargs):
+        """Returns the lines printed, without the headers' colors"""
+        stream = io.StringIO()
+        Printer.print_table(HEADERS, iter(rows), stream=stream, **kwargs)
+        return stream.getvalue().splitlines()
+
+    def test_lookahead(self):
+        """Tests columns are sized from the look-ahead window only"""
+        lines = self.print_table(lookahead=1)
+        self.assertEqual(lines[2], "a        project-1  zone-1")
+        self.assertEqual(lines[3], "a-longer-name  p          zone-2")
+
+    def test_full(self):
+        """Tests columns are sized from all the rows"""
+        lines = self.print_table(lookahead=None)
+        self.assertEqual(lines[2], "a              project-1  zone-1")
+        self.assertEqual(lines[3], "a-longer-name  p          zone-2")
+
+    def test_columns(self):
+        """Tests only the selected columns are printed, in order"""
+        lines = self.print_table(output='jsonl',
+                                 columns=['zone', 'cluster'])
+        self.assertEqual(json.loads(lines[0]),
+                         {'zone': 'zone-1', 'cluster': 'a'})
+        self.assertEqual(list(json.loads(lines[0])), ['zone', 'cluster'])
+
+    def test_streamed_rows(self):
+        """Tests the rows written are flushed while waiting for the next
+        ones, and rows already obtained only once they are all written"""
+        flushed = []
+
+        class Stream(io.StringIO):
+            """Records the number of lines written at every flush"""
+
+            def flush(self):
+                flushed.append(self.getvalue().count('\n'))
+
+        def iter_rows():
+            yield from ROWS[:2]
+            # Like a listing waiting for its next page
+            deadline = time.monotonic() + 5
+            while 3 not in flushed and time.monotonic() < deadline:
+                time.sleep(0.01)
+            yield ROWS[2]
+
+        Printer.print_table(HEADERS, iter_rows(), stream=Stream(),
+                            output='csv')
+        self.assertIn(3, flushed)
+        self.assertEqual(flushed[-1], 4)
+        flushed.clear()
+        Printer.print_table(HEADERS, ROWS, stream=Stream(), output='csv')
+        self.assertEqual(flushed, [4])
+
+    def test_failing_rows(self):
+        """Tests an error obtaining the rows is raised after the rows
+        before it are written"""
+        def iter_rows():
+            yield ROWS[0]
+            raise ValueError('denied')
+
+        stream = io.StringIO()
+        with self.assertRaises(ValueError):
+            Printer.print_table(HEADERS, iter_rows(), stream=stream,
+                                output='csv')
+        self.assertEqual(stream.getvalue().splitlines()[1], ','.join(ROWS[0]))
+
+    def test_unknown_columns(self):
+        """Tests selecting a column the table doesn't have fails"""
+        with self.assertRaises(UnknownColumns):
+            self.print_table(columns=['name'])
+
+
+class TestPrintTree(TestCase):
+    """Tests the Printer.print_tree method"""
+
+    def test_tree(self):
+        """Tests nodes are printed under their parents, in order"""
+        stream = io.StringIO()
+        Printer.print_tree(
+            ['root'], {'root': ['a', 'b'], 'a': ['c', 'd'], 'c': ['e']},
+            dict({key: key.upper() for key in 'abcde'}, root='folders/1'),
+            stream=stream)
+        self.assertEqual(stream.getvalue().splitlines(), [
+            "folders/1",
+            "├── A",
+            "│   ├── C",
+            "│   │   └── E",
+            "│   └── D",
+            "└── B"])
@@ -0,0 +1,121 @@
+"""
+#    Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+import os
+import shutil
+import tempfile
+from unittest import TestCase, mock
+
+from gcpctl.utils.cache import ListingCache, MemoryLayer
+
+
+class TestListingCache(TestCase):
+    """Tests the ListingCache class"""
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+
+    def fetch(self, cache, items, parent='p'):
+        """Returns the projects of parent, listing items on cache misses"""
+        return cache.fetch('projects', 'list', parent, lambda: items)
+
+    def test_ttl(self):
+        """Tests entries are listed again once they expired"""
+        cache = ListingCache(self.path, ttls={'projects': 60})
+        self.assertEqual(self.fetch(cache, ['old']), ['old'])
+        with mock.patch('time.time', return_value=os.stat(
+                cache._entry_path('list', 'p')).st_mtime + 30):
+            self.assertEqual(self.fetch(cache, ['new']), ['old'])
+        with mock.patch('time.time', return_value=os.stat(
+                cache._entry_path('list', 'p')).st_mtime + 90):
+            self.assertEqual(self.fetch(cache, ['new']), ['new'])
+
+    def test_refresh(self):
+        """Tests refresh lists again and stores the new listing"""
+        self.fetch(ListingCache(self.path), ['old'])
+        self.assertEqual(
+            self.fetch(ListingCache(self.path, refresh=True), ['new']),
+            ['new'])
+        self.assertEqual(self.fetch(ListingCache(self.path), ['unused']),
+                         ['new'])
+
+    def test_unwritable(self):
+        """Tests failing to write an entry doesn't fail the listing"""
+        blocker = os.path.join(self.path, 'file')
+        with open(blocker, 'w', encoding='utf-8'):
+            pass
+        cache = ListingCache(os.path.join(blocker, 'cache'))
+        self.assertEqual(self.fetch(cache, ['new']), ['new'])
+        cache = ListingCache(self.path)
+        with mock.patch('os.replace', side_effect=OSError('No space')):
+            self.assertEqual(self.fetch(cache, ['new']), ['new'])
+        self.assertEqual(os.listdir(self.path), ['file'])
+
+    def test_disabled(self):
+        """Tests a disabled cache neither reads nor writes entries"""
+        cache = ListingCache(self.path, enabled=False)
+        self.assertEqual(self.fetch(cache, ['old']), ['old'])
+        self.assertEqual(self.fetch(cache, ['new']), ['new'])
+        self.assertEqual(os.listdir(self.path), [])
+
+    def test_account(self):
+        """Tests the listings of an account aren't served to another"""
+        self.fetch(ListingCache(self.path, account='a@example.com'), ['a'])
+        self.assertEqual(
+            self.fetch(ListingCache(self.path, account='b@example.com'),
+                       ['b']), ['b'])
+
+    def test_size(self):
+        """Tests overwritten entries aren't counted twice"""
+        cache = ListingCache(self.path)
+        for _ in range(3):
+            cache.set('list', 'p', ['x'] * 100)
+        cache.set('list', 'q', ['x'])
+        self.assertEqual(cache._size, cache._scan()[1])
+
+    def test_eviction(self):
+        """Tests the least recently used entries are evicted beyond
+        max_size"""
+        cache = ListingCache(self.path)
+        for index, parent in enumerate(['a', 'b', 'c']):
+            cache.set('list', parent, ['x'] * 100)
+            # Entries are ordered by modification time
+            os.utime(cache._entry_path('list', parent), (index, index))
+        # Using 'a' makes 'b' the least recently used entry
+        self.assertEqual(self.fetch(cache, [], parent='a'), ['x'] * 100)
+        cache.max_size = cache._scan()[1] - 1
+        cache.set('list', 'c', ['x'] * 100)
+        self.assertEqual(
+            sorted(os.listdir(self.path)),
+            sorted(os.path.basename(cache._entry_path('list', parent))
+                   for parent in ['a', 'c']))
+
+    def test_memory_layer(self):
+        """Tests entries rewritten by --refresh, or by another process, are
+        read again rather than served from memory"""
+        memory = MemoryLayer()
+        cache = ListingCache(self.path, memory=memory)
+        refresh = ListingCache(self.path, memory=memory, refresh=True)
+        other = ListingCache(self.path)
+        results = [
+            cache.fetch('projects', 'list', 'p', lambda: ['old']),
+            refresh.fetch('projects', 'list', 'p', lambda: ['new']),
+            cache.fetch('projects', 'list', 'p', lambda: ['unused']),
+            other.fetch('projects', 'list', 'p', lambda: ['unused'])]
+        other.set('list', 'p', ['newer'])
+        results.append(cache.fetch('projects', 'list', 'p', lambda: []))
+        self.assertEqual(results, [['old'], ['new'], ['new'], ['new'],
+                                   ['newer']])
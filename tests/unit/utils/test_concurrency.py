@@ -0,0 +1,131 @@
+"""
+#    Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+import threading
+import time
+from unittest import TestCase
+
+from gcpctl.utils.concurrency import fan_out, fan_out_pages
+
+
+def slow_square(item):
+    """Returns the square of item, later for smaller items"""
+    time.sleep((5 - item) * 0.01)
+    if item == 3:
+        raise ValueError(item)
+    return item * item
+
+
+class TestFanOut(TestCase):
+    """Tests the fan_out function"""
+
+    def test_order(self):
+        """Tests results are yielded in input order, with the errors of
+        the items which failed"""
+        results = list(fan_out(slow_square, range(5), parallelism=5))
+        self.assertEqual([result.item for result in results], [0, 1, 2, 3, 4])
+        self.assertEqual([result.value for result in results],
+                         [0, 1, 4, None, 16])
+        self.assertIsInstance(results[3].error, ValueError)
+        self.assertEqual([result.ok for result in results],
+                         [True, True, True, False, True])
+
+    def test_parallelism(self):
+        """Tests at most parallelism calls run at the same time"""
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def call(item):
+            with lock:
+                running.append(item)
+                peak.append(len(running))
+            time.sleep(0.01)
+            with lock:
+                running.remove(item)
+
+        list(fan_out(call, range(10), parallelism=3))
+        self.assertLessEqual(max(peak), 3)
+
+    def test_empty(self):
+        """Tests no items yield no results"""
+        self.assertEqual(list(fan_out(slow_square, [])), [])
+
+    def test_streamed_items(self):
+        """Tests items are called with as they arrive, and an error of
+        the items is raised after the results of the items before it"""
+        called = threading.Event()
+
+        def items():
+            yield 0
+            # Only the call with the first item lets the items go on
+            self.assertTrue(called.wait(5))
+            yield 1
+            raise ValueError("listing failed")
+
+        def call(item):
+            called.set()
+            return item
+
+        results = fan_out(call, items())
+        self.assertEqual([next(results).value, next(results).value], [0, 1])
+        with self.assertRaises(ValueError):
+            next(results)
+
+
+class TestFanOutPages(TestCase):
+    """Tests the fan_out_pages function"""
+
+    def test_pages(self):
+        """Tests every page is yielded, and a failure after the pages
+        obtained before it"""
+        def pages(item):
+            yield [item, 0]
+            if item == 2:
+                raise ValueError(item)
+            yield [item, 1]
+
+        results = list(fan_out_pages(pages, range(3)))
+        pages_of = {item: [result.value for result in results
+                           if result.item == item and result.ok]
+                    for item in range(3)}
+        self.assertEqual(pages_of, {0: [[0, 0], [0, 1]], 1: [[1, 0], [1, 1]],
+                                    2: [[2, 0]]})
+        errors = [result for result in results if not result.ok]
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0].item, 2)
+        self.assertIsInstance(errors[0].error, ValueError)
+
+    def test_arrival_order(self):
+        """Tests pages are yielded as they arrive, regardless of the
+        order of the items"""
+        results = list(fan_out_pages(lambda item: [slow_square(item)],
+                                     [0, 4], parallelism=2))
+        self.assertEqual([result.item for result in results], [4, 0])
+
+    def test_early_exit(self):
+        """Tests the items nobody consumes anymore aren't called with"""
+        called = []
+
+        def pages(item):
+            called.append(item)
+            time.sleep(0.01)
+            yield [item]
+
+        results = fan_out_pages(pages, range(10), parallelism=1)
+        self.assertEqual(next(results).value, [0])
+        results.close()
+        time.sleep(0.05)
+        self.assertLess(len(called), 10)
@@ -0,0 +1,67 @@
+"""
+#    Copyright 2023 Arie Bregman
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+import io
+import sys
+from unittest import TestCase
+
+from gcpctl.utils.process import AsyncExecutor, Command
+
+
+class TestAsyncExecutor(TestCase):
+    """Tests the AsyncExecutor class"""
+
+    def setUp(self):
+        self.stdout = io.StringIO()
+        self.stderr = io.StringIO()
+
+    def _run(self, *scripts, **kwargs):
+        executor = AsyncExecutor(stdout=self.stdout, stderr=self.stderr,
+                                 **kwargs)
+        return executor.run([
+            Command(prefix=f"c{index}",
+                    args=[sys.executable, '-c', script])
+            for index, script in enumerate(scripts)])
+
+    def test_results(self):
+        """Tests exit codes, output bytes and streamed lines"""
+        results = self._run(
+            "print('out')",
+            "import sys; sys.stderr.write('err\\n'); sys.exit(3)")
+        self.assertEqual([result.status for result in results], ['0', '3'])
+        self.assertEqual([result.output_bytes for result in results], [4, 4])
+        self.assertIn('c0\x1b[0m | out\n', self.stdout.getvalue())
+        self.assertIn('c1\x1b[0m | err\n', self.stderr.getvalue())
+
+    def test_timeout_escalates_to_kill(self):
+        """Tests a command ignoring SIGTERM is killed after the grace"""
+        results = self._run(
+            "import signal, time\n"
+            "signal.signal(signal.SIGTERM, signal.SIG_IGN)\n"
+            "print('ready', flush=True)\n"
+            "time.sleep(30)",
+            timeout=0.5, kill_grace=0.2)
+        self.assertEqual(results[0].status, 'timeout')
+        self.assertLess(results[0].duration, 5)
+
+    def test_fail_fast(self):
+        """Tests commands are cancelled once one failed"""
+        results = self._run("import sys; sys.exit(1)",
+                            "import time; time.sleep(30)",
+                            "print('skipped')",
+                            parallelism=2, fail_fast=True, kill_grace=0.2)
+        self.assertEqual([result.status for result in results],
+                         ['1', 'cancelled', 'cancelled'])
+        self.assertNotIn('skipped', self.stdout.getvalue())